@@ -0,0 +1,28 @@
+"""add query store plan summary
+
+Revision ID: c4e1d2a7b913
+Revises: b82f259a1047
+Create Date: 2025-06-20 09:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1d2a7b913'
+down_revision: Union[str, None] = 'b82f259a1047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('query_store', sa.Column('plan_summary', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('query_store', 'plan_summary')
@@ -0,0 +1,34 @@
+"""add chats (user_id, created_at, id) index
+
+Revision ID: d7a9f3c25e61
+Revises: c4e1d2a7b913
+Create Date: 2025-06-24 14:03:27.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a9f3c25e61'
+down_revision: Union[str, None] = 'c4e1d2a7b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so a large chats table stays writable while the index builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chats_user_id_created_at_id', 'chats', ['user_id', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_chats_user_id_created_at_id', table_name='chats', postgresql_concurrently=True)
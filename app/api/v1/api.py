@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, chat, preview
+from app.api.v1.endpoints import auth, chat, metrics, preview
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router = APIRouter()
 api_router.include_router(auth.router, tags=["Authentication"])
 api_router.include_router(preview.router, tags=["Preview"]) 
 api_router.include_router(chat.router, tags=["Chat"])
+api_router.include_router(metrics.router, tags=["Metrics"])
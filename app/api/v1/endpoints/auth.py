@@ -2,39 +2,42 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.password_hashing import AuthBusyError, password_hasher
 from app.core.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
-from app.repositories.user_repository import get_user_by_email, get_user_by_username, create_user, authenticate_user
+from app.repositories.user_repository import get_user_by_email, get_user_by_username, create_user
 from app.dependencies_auth import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_current_user
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
-    db_user = get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    db_user = get_user_by_username(db, username=user.username)
+    db_user = await run_in_threadpool(get_user_by_username, db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
         )
     
-    # Create new user
-    return create_user(db=db, user=user)
+    # Create new user, bcrypt runs on the password hashing pool
+    hashed_password = await hash_password(user.password)
+    return await run_in_threadpool(create_user, db=db, user=user, hashed_password=hashed_password)
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     print(form_data.username, form_data.password)
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    user = await run_in_threadpool(get_user_by_username, db, form_data.username)
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -46,6 +49,18 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except AuthBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except AuthBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
 @router.get("/me", response_model=UserResponse)
 def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
\ No newline at end of file
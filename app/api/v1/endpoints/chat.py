@@ -1,16 +1,19 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.dependencies_auth import get_current_user
 from app.models.user import User
-from app.schemas.chat import ChatResponse, ChatStreamInput
+from app.repositories.chat_repository import InvalidChatCursorError
+from app.schemas.chat import ChatListResponse, ChatStreamInput
 from app.services.agent_service import AgentService
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 @router.post("/stream")
 def stream_chat_agents_background(
+    request: Request,
     chat_input: ChatStreamInput,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -19,9 +22,16 @@ def stream_chat_agents_background(
     # Initialize service
     agent_service = AgentService(db, current_user)
     
-    # Use service to process streaming
+    # Use service to process streaming, the run is cancelled if the client disconnects
     return StreamingResponse(
-        agent_service.process_agent_streaming(chat_input.query), 
+        agent_service.process_agent_streaming(
+            chat_input.query,
+            request.is_disconnected,
+            coalesce=chat_input.coalesce,
+            coalesce_window_ms=chat_input.coalesce_window_ms,
+            coalesce_max_bytes=chat_input.coalesce_max_bytes,
+            inline_preview=chat_input.inline_preview
+        ), 
         media_type="application/x-ndjson",
         headers={
             "Cache-Control": "no-cache",
@@ -30,14 +40,20 @@ def stream_chat_agents_background(
         }
     )
 
-@router.get("/list", response_model=list[ChatResponse])
+@router.get("/list", response_model=ChatListResponse)
 def list_chats(
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None, max_length=256),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    # Newest first, follow next_before for older messages
     agent_service = AgentService(db, current_user)
-    chats = agent_service.get_all_chats_by_user(current_user.id)
-    return chats
+    try:
+        chats, next_before = agent_service.get_chats_page_by_user(current_user.id, limit, before)
+    except InvalidChatCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"chats": chats, "next_before": next_before}
 
 @router.post("/clear-chat")
 def clear_chat(
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from app.core.metrics import metrics
+from app.dependencies_auth import get_current_user
+from app.models.user import User
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("")
+def get_metrics(current_user: User = Depends(get_current_user)):
+    # Internal state (pool hosts, cache sizes), not for anonymous widget visitors
+    return metrics.snapshot()
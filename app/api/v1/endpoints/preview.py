@@ -1,49 +1,37 @@
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 from app.core.database import get_db
+from app.core.mysql_pool import PoolTimeoutError
+from app.dependencies_auth import get_current_user
 from app.models.query_store import QueryStore
-from db_connection import DatabaseConnection
-import re
+from app.models.user import User
+from app.services.export_service import EXPORT_MAX_ROWS, QueryExport
+from app.services.prefetch_service import preview_prefetcher
+from app.services.query_guard import QueryQueueTimeoutError, QueryRejectedError, query_guard
+from app.services.preview_service import (
+    PAGED_RESPONSE_TYPES,
+    PREVIEW_COUNT_STRATEGY,
+    InvalidCursorError,
+    PreviewService,
+    fill_template,
+)
+from db_connection import DatabaseConnection, QueryTimeoutError
 
 router = APIRouter(prefix="/preview", tags=["preview"])
 
-def fill_template(template: str, data: dict) -> str:
-    """Fill template with data values using regex to handle single or double braces"""
-    if not template:
-        return ""
-        
-    def replace(match):
-        key = match.group(1)
-        value = data.get(key)
-        if value is None:
-            return ''
-        # Format numbers with thousand separator
-        if isinstance(value, (int, float)):
-            return f"{value:,}"
-        return str(value)
-
-    # Support {key} or {{key}}
-    pattern = r"{+([\w]+)}+"
-    try:
-        return re.sub(pattern, replace, template)
-    except Exception as e:
-        print(f"Error in fill_template: {str(e)}")
-        return template  # Return original template if error occurs
-
-def inject_limit_offset(sql: str, limit: int, offset: int) -> str:
-    """Remove existing LIMIT and add new LIMIT/OFFSET"""
-    cleaned_sql = sql.strip().rstrip(';')
-
-    # Remove existing LIMIT ... OFFSET ... (jika ada)
-    cleaned_sql = re.sub(r"\s+LIMIT\s+\d+(\s+OFFSET\s+\d+)?", "", cleaned_sql, flags=re.IGNORECASE)
-
-    return f"{cleaned_sql} LIMIT {limit} OFFSET {offset}"
-
 @router.get("/data/{query_id}")
 def preview_data(
     query_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
+    count: str = Query(PREVIEW_COUNT_STRATEGY, pattern="^(auto|window|cached|skip)$"),
+    paging: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(None, max_length=4096),
+    format: str = Query("rows", pattern="^(rows|columnar)$"),
     db: Session = Depends(get_db)
 ):
     # Get query details from SQLAlchemy
@@ -52,56 +40,147 @@ def preview_data(
         raise HTTPException(status_code=404, detail="Query not found")
 
     # Initialize database connection for executing the query
-    db_conn = DatabaseConnection()
+    db_conn = DatabaseConnection(use_replica=True)
     try:
-        # Execute the stored query
-        results = db_conn.execute_query(query_store.generated_sql)
-        
-        if not results:
-            return {
-                "response_type": query_store.response_type,
-                "display_type": query_store.display_type,
-                "data": []
-            }
+        previewer = PreviewService(db_conn, query_store.response_type)
+
+        if query_guard.enabled:
+            # Record the plan estimate on the stored query (EXPLAIN results are cached per SQL)
+            summary = query_guard.plan_summary(db_conn, query_store.generated_sql)
+            if summary is not None and query_store.plan_summary != summary:
+                query_store.plan_summary = summary
+                db.commit()
 
         if query_store.response_type == "sentence":
+            # Only the first row is used, fetch just that (or take the one prefetched after the insert)
+            prefetched, row = preview_prefetcher.join(
+                query_store.id, query_store.generated_sql, preview_prefetcher.kind("sentence")
+            )
+            if not prefetched:
+                row = previewer.first_row(query_store.generated_sql)
+            if not row:
+                return {
+                    "response_type": query_store.response_type,
+                    "display_type": query_store.display_type,
+                    "data": []
+                }
+
             # For sentence type, use the template
             print("Template:", query_store.answer_template)
-            print("Data:", results[0])
-            result = fill_template(query_store.answer_template, results[0])
+            print("Data:", row)
+            result = fill_template(query_store.answer_template, row)
             print("Result after template fill:", result)
             return {
                 "response_type": "sentence",
                 "display_type": query_store.display_type,
                 "output_text": result
             }
-        
-        elif query_store.response_type in ["table", "bar_chart", "line_chart", "pie_chart"]:
-            offset = (page - 1) * limit
-            paginated_sql = inject_limit_offset(query_store.generated_sql, limit, offset)
 
-            # Eksekusi query paginasi
-            results = db_conn.execute_query(paginated_sql)
+        elif query_store.response_type in PAGED_RESPONSE_TYPES and (paging == "cursor" or cursor):
+            # Cursor mode: follow next_cursor instead of page numbers
+            result = previewer.cursor_page(query_store.generated_sql, cursor, limit, count)
+            if not cursor and not result["rows"]:
+                return {
+                    "response_type": query_store.response_type,
+                    "display_type": query_store.display_type,
+                    "data": []
+                }
 
-            # Count total (optional, tergantung database)
-            count_sql = f"SELECT COUNT(*) as total_count FROM ({query_store.generated_sql.rstrip(';')}) as count_subquery"
-            count_result = db_conn.execute_query(count_sql)
-            total_count = count_result[0]["total_count"] if count_result else len(results)
+            return {
+                "response_type": query_store.response_type,
+                "display_type": query_store.display_type,
+                "limit": limit,
+                "total": result["total"],
+                "data": result["rows"].formatted(format),
+                "paging": result["paging"],
+                "next_cursor": result["next_cursor"]
+            }
+
+        elif query_store.response_type in PAGED_RESPONSE_TYPES:
+            # Page and total from a single data query where possible
+            prefetched, result = (False, None)
+            if page == 1:
+                prefetched, result = preview_prefetcher.join(
+                    query_store.id, query_store.generated_sql,
+                    preview_prefetcher.kind(query_store.response_type, limit, count),
+                )
+            if not prefetched:
+                result = previewer.page(query_store.generated_sql, page, limit, count)
+            if page == 1 and not result["rows"]:
+                return {
+                    "response_type": query_store.response_type,
+                    "display_type": query_store.display_type,
+                    "data": []
+                }
 
             return {
                 "response_type": query_store.response_type,
                 "display_type": query_store.display_type,
                 "page": page,
                 "limit": limit,
-                "total": total_count,
-                "data": results
+                "total": result["total"],
+                "data": result["rows"].formatted(format)
             }
-        
+
         else:
             raise HTTPException(status_code=400, detail="Unknown response type")
 
+    except HTTPException:
+        raise
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueryRejectedError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "plan_summary": e.summary})
+    except (PoolTimeoutError, QueryQueueTimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except QueryTimeoutError as e:
+        raise HTTPException(
+            status_code=504,
+            detail={"error": "query_timeout", "message": str(e), "timeout_seconds": e.timeout},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error executing query: {str(e)}")
-    
+
     finally:
-        db_conn.close()
\ No newline at end of file
+        db_conn.close()
+
+@router.get("/export/{query_id}")
+def export_data(
+    query_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Full result of the user's own stored query, streamed without buffering
+    query_store = db.query(QueryStore).filter(
+        QueryStore.id == query_id,
+        QueryStore.user_id == current_user.id
+    ).first()
+    if not query_store:
+        raise HTTPException(status_code=404, detail="Query not found")
+
+    export = QueryExport(query_store.generated_sql, format)
+    try:
+        export.start()
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except QueryTimeoutError as e:
+        raise HTTPException(
+            status_code=504,
+            detail={"error": "query_timeout", "message": str(e), "timeout_seconds": e.timeout},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error executing query: {str(e)}")
+
+    return StreamingResponse(
+        export,
+        media_type=export.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="query_{query_id}.{format}"',
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Export-Max-Rows": str(EXPORT_MAX_ROWS)
+        },
+        # Releases the MySQL connection even if the client disconnects mid-export
+        background=BackgroundTask(export.close)
+    )
@@ -0,0 +1,7 @@
+from dotenv import find_dotenv, load_dotenv
+
+# Every module reads its settings (MYSQL_*, QUERY_GUARD_*, ...) from os.environ at import
+# time, so .env has to be loaded before any of them is imported. Import this module first.
+# Variables already set in the process environment win over .env.
+ENV_PATH = find_dotenv(usecwd=True)
+load_dotenv(ENV_PATH)
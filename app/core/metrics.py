@@ -0,0 +1,54 @@
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class MetricsRegistry:
+    """Process-wide counters, timings and stats collectors exposed on /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timings = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        """Record a duration (count, total and max are kept)"""
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            if seconds > timing["max"]:
+                timing["max"] = seconds
+
+    def register(self, name: str, collector: Callable[[], Dict[str, Any]]):
+        """Register a callable returning a stats dict, evaluated on every snapshot"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: {
+                    **timing,
+                    "avg": timing["total"] / timing["count"] if timing["count"] else 0.0,
+                }
+                for name, timing in self._timings.items()
+            }
+            collectors = dict(self._collectors)
+
+        snapshot = {"counters": counters, "timings": timings}
+        for name, collector in collectors.items():
+            try:
+                snapshot[name] = collector()
+            except Exception as e:
+                snapshot[name] = {"error": str(e)}
+        return snapshot
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import mysql.connector
+from mysql.connector import Error
+
+from app.core.metrics import metrics
+
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+MYSQL_POOL_MAX_OVERFLOW = int(os.getenv("MYSQL_POOL_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before giving up
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "10"))
+# Max lifetime of a connection in seconds, 0 disables recycling
+MYSQL_POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", "1800"))
+MYSQL_POOL_PRE_PING = os.getenv("MYSQL_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+
+class MySQLConnectionPool:
+    """Thread-safe MySQL connection pool.
+
+    Keeps up to ``pool_size`` idle connections and opens up to ``max_overflow``
+    extra ones under load (closed again on return). Connections are recycled
+    after ``recycle`` seconds and pinged on checkout when ``pre_ping`` is set.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect_kwargs: Dict[str, Any],
+        pool_size: int = MYSQL_POOL_SIZE,
+        max_overflow: int = MYSQL_POOL_MAX_OVERFLOW,
+        timeout: float = MYSQL_POOL_TIMEOUT,
+        recycle: float = MYSQL_POOL_RECYCLE,
+        pre_ping: bool = MYSQL_POOL_PRE_PING,
+    ):
+        self.name = name
+        # For stats, logs and error messages: no MySQL user in it
+        self.label = f"{connect_kwargs.get('host')}:{connect_kwargs.get('port')}/{connect_kwargs.get('database')}"
+        self.connect_kwargs = connect_kwargs
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._created_at: Dict[int, float] = {}
+        self._open = 0
+        self._in_use = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+            "peak_in_use": 0,
+        }
+
+    def _create(self):
+        connection = mysql.connector.connect(autocommit=True, **self.connect_kwargs)
+        with self._cond:
+            self._created_at[id(connection)] = time.monotonic()
+            self._stats["created"] += 1
+        return connection
+
+    def _close_quietly(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _is_usable(self, connection) -> bool:
+        created_at = self._created_at.get(id(connection), 0)
+        if self.recycle > 0 and time.monotonic() - created_at >= self.recycle:
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if self.pre_ping:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a connection, waiting up to the pool timeout"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        connection = None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._open < self.pool_size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No MySQL connection available in pool '{self.label}' after {self.timeout}s"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+            wait_time = time.monotonic() - start
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait_time
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+
+        try:
+            if connection is not None and not self._is_usable(connection):
+                self._close_quietly(connection)
+                connection = None
+            if connection is None:
+                connection = self._create()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return connection
+
+    def release(self, connection, discard: bool = False):
+        """Return a connection; broken, dirty or overflow connections are closed"""
+        if not discard:
+            try:
+                discard = bool(connection.unread_result)
+            except Error:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or len(self._idle) >= self.pool_size:
+                self._open -= 1
+                if discard:
+                    self._stats["discarded"] += 1
+                self._close_quietly(connection)
+            else:
+                self._idle.append(connection)
+            self._cond.notify()
+
+    @property
+    def in_use(self) -> int:
+        """Connections currently checked out"""
+        return self._in_use
+
+    def close_idle(self):
+        with self._cond:
+            while self._idle:
+                self._open -= 1
+                self._close_quietly(self._idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            capacity = self.pool_size + self.max_overflow
+            stats.update({
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "utilization": round(self._in_use / capacity, 3) if capacity else 0.0,
+                "wait_time_avg": stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0,
+            })
+        return stats
+
+
+_pools: Dict[str, MySQLConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: str, port: int, user: str, password: str, database: str) -> MySQLConnectionPool:
+    """Process-wide pool per MySQL endpoint"""
+    name = f"{user}@{host}:{port}/{database}"
+    pool: Optional[MySQLConnectionPool] = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = MySQLConnectionPool(
+                    name,
+                    {"host": host, "port": port, "user": user, "password": password, "database": database},
+                )
+                _pools[name] = pool
+    return pool
+
+
+def close_all_pools():
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+metrics.register("mysql_pool", lambda: {pool.label: pool.stats() for pool in list(_pools.values())})
@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import metrics
+
+# Processes doing bcrypt for login/register, 0 hashes in the request threadpool (previous behaviour)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hash/verify calls admitted at once (running plus waiting for a worker), the rest wait up to the timeout
+AUTH_MAX_CONCURRENCY = int(os.getenv("AUTH_MAX_CONCURRENCY", str(max(PASSWORD_HASH_WORKERS, 1) * 2)))
+# Seconds a login/register waits for admission before it gets a 503
+AUTH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AUTH_QUEUE_TIMEOUT_SECONDS", "2"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class AuthBusyError(Exception):
+    """Too many logins/registrations in flight, the request waited longer than the queue timeout"""
+
+
+# Run inside the worker processes (module level so they pickle)
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated process pool, with admission control.
+
+    A login burst then queues here instead of holding Starlette threadpool
+    slots (shared with chat streams and previews) for ~200 ms of CPU each,
+    and past ``max_concurrency`` plus ``queue_timeout`` it is rejected.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_concurrency: int = AUTH_MAX_CONCURRENCY,
+        queue_timeout: float = AUTH_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.max_concurrency = max(max_concurrency, 1)
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads (pools, schema refresher) is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, name: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("password_hash.rejected")
+            raise AuthBusyError("Authentication is busy, retry shortly")
+        self._in_flight += 1
+        try:
+            metrics.observe("password_hash.queue_wait", time.perf_counter() - start)
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM kill...), start a fresh pool for the next call
+                with self._executor_lock:
+                    self._executor = None
+                raise
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+            metrics.observe(f"password_hash.{name}", time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        return {"workers": self.workers, "in_flight": self._in_flight, "max_concurrency": self.max_concurrency}
+
+
+password_hasher = PasswordHasher()
+metrics.register("password_hasher", password_hasher.stats)
@@ -0,0 +1,229 @@
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mysql.connector import Error
+
+from app.core.metrics import metrics
+from app.core.mysql_pool import MySQLConnectionPool, get_pool
+
+# Read replicas for analytics reads, "host:port,host:port" (same user, password and database as the primary)
+MYSQL_REPLICAS = os.getenv("MYSQL_REPLICAS", "")
+# round_robin or least_connections (fewest checked-out connections in our pool)
+MYSQL_REPLICA_BALANCE = os.getenv("MYSQL_REPLICA_BALANCE", "round_robin")
+# Replicas further behind than this (or with replication stopped) are skipped
+MYSQL_REPLICA_MAX_LAG_SECONDS = float(os.getenv("MYSQL_REPLICA_MAX_LAG_SECONDS", "30"))
+# How often each replica's lag is re-checked
+MYSQL_REPLICA_CHECK_SECONDS = float(os.getenv("MYSQL_REPLICA_CHECK_SECONDS", "10"))
+# Consecutive connection failures before a replica is ejected, and for how long
+MYSQL_REPLICA_MAX_FAILURES = int(os.getenv("MYSQL_REPLICA_MAX_FAILURES", "3"))
+MYSQL_REPLICA_EJECT_SECONDS = float(os.getenv("MYSQL_REPLICA_EJECT_SECONDS", "30"))
+
+BALANCE_STRATEGIES = ("round_robin", "least_connections")
+
+
+def parse_endpoints(value: str) -> List[Tuple[str, int]]:
+    endpoints = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        endpoints.append((host, int(port or 3306)))
+    return endpoints
+
+
+def replica_lag(pool: MySQLConnectionPool) -> Optional[float]:
+    """Seconds the replica is behind, 0 for a server that isn't replicating, None when replication is stopped"""
+    connection = pool.acquire()
+    discard = False
+    try:
+        cursor = connection.cursor(dictionary=True)
+        row, error = None, None
+        # SHOW REPLICA STATUS needs MySQL 8.0.22+, older servers and MariaDB know the SLAVE form
+        for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+            try:
+                cursor.execute(statement)
+                row = cursor.fetchone()
+                cursor.fetchall()
+                error = None
+                break
+            except Error as e:
+                error = e
+        cursor.close()
+        if error is not None:
+            raise error
+        if row is None:
+            return 0.0
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+    except Error:
+        discard = True
+        raise
+    finally:
+        pool.release(connection, discard=discard)
+
+
+class ReplicaState:
+    def __init__(self, pool):
+        self.pool = pool
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.checking = False
+        self.failures = 0
+        self.ejected_until = 0.0
+
+
+class ReplicaRouter:
+    """Picks the MySQL pool for analytics reads: a healthy replica, else the primary.
+
+    A replica is used while its last lag check is within ``max_lag``; the
+    first check of a replica runs inline, later ones (every
+    ``check_interval``) in a background thread while requests keep using the
+    previous result. ``max_failures`` consecutive connection failures (from
+    checks or reported by DatabaseConnection) eject it for ``eject_seconds``.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Any],
+        balance: str = MYSQL_REPLICA_BALANCE,
+        max_lag: float = MYSQL_REPLICA_MAX_LAG_SECONDS,
+        check_interval: float = MYSQL_REPLICA_CHECK_SECONDS,
+        max_failures: int = MYSQL_REPLICA_MAX_FAILURES,
+        eject_seconds: float = MYSQL_REPLICA_EJECT_SECONDS,
+        lag_fn: Callable[[Any], Optional[float]] = replica_lag,
+    ):
+        self.replicas = [ReplicaState(pool) for pool in replicas]
+        self.balance = balance if balance in BALANCE_STRATEGIES else "round_robin"
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.max_failures = max(max_failures, 1)
+        self.eject_seconds = eject_seconds
+        self.lag_fn = lag_fn
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def _failed(self, replica: ReplicaState):
+        """Count a failure, caller holds the lock"""
+        replica.failures += 1
+        if replica.failures >= self.max_failures and replica.ejected_until <= time.monotonic():
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+            replica.checked_at = None
+            metrics.incr("replica.ejected")
+            print(f"MySQL replica {replica.pool.label} ejected for {self.eject_seconds:g}s")
+
+    def check(self, replica: ReplicaState):
+        """Measure the replica's lag and update its health"""
+        try:
+            lag = self.lag_fn(replica.pool)
+            error = None
+        except Exception as e:
+            lag, error = None, e
+        with self._lock:
+            replica.checking = False
+            replica.checked_at = time.monotonic()
+            if error is not None:
+                print(f"MySQL replica {replica.pool.label} check failed: {error}")
+                replica.lag = None
+                self._failed(replica)
+                return
+            replica.lag = lag
+            replica.failures = 0
+
+    def _usable(self, replica: ReplicaState) -> bool:
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def choose(self, primary):
+        """Pool for the next read"""
+        if not self.replicas:
+            return primary
+        now = time.monotonic()
+        inline, background = [], []
+        with self._lock:
+            for replica in self.replicas:
+                if replica.ejected_until > now or replica.checking:
+                    continue
+                if replica.checked_at is None:
+                    replica.checking = True
+                    inline.append(replica)
+                elif now - replica.checked_at >= self.check_interval:
+                    replica.checking = True
+                    background.append(replica)
+        for replica in background:
+            threading.Thread(target=self.check, args=(replica,), daemon=True).start()
+        for replica in inline:
+            self.check(replica)
+
+        with self._lock:
+            now = time.monotonic()
+            healthy = [r for r in self.replicas if r.ejected_until <= now and self._usable(r)]
+            if not healthy:
+                metrics.incr("replica.primary_fallback")
+                return primary
+            if self.balance == "least_connections":
+                start = next(self._counter) % len(healthy)
+                rotated = healthy[start:] + healthy[:start]
+                chosen = min(rotated, key=lambda r: r.pool.in_use)
+            else:
+                chosen = healthy[next(self._counter) % len(healthy)]
+        metrics.incr("replica.reads")
+        return chosen.pool
+
+    def report_failure(self, pool):
+        """A connection to ``pool`` could not be opened"""
+        with self._lock:
+            for replica in self.replicas:
+                if replica.pool is pool:
+                    self._failed(replica)
+
+    def report_success(self, pool):
+        with self._lock:
+            for replica in self.replicas:
+                if replica.pool is pool:
+                    replica.failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                replica.pool.label: {
+                    "lag": replica.lag,
+                    "healthy": replica.ejected_until <= now and self._usable(replica),
+                    "ejected": replica.ejected_until > now,
+                    "failures": replica.failures,
+                    "in_use": replica.pool.in_use,
+                }
+                for replica in self.replicas
+            }
+
+
+_routers: Dict[str, ReplicaRouter] = {}
+# Primary pool label per router, the metrics key (pool names contain the MySQL user)
+_router_labels: Dict[str, str] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(primary: MySQLConnectionPool) -> ReplicaRouter:
+    """Router for reads against ``primary``, replicas from MYSQL_REPLICAS"""
+    router = _routers.get(primary.name)
+    if router is None:
+        with _routers_lock:
+            router = _routers.get(primary.name)
+            if router is None:
+                kwargs = primary.connect_kwargs
+                replicas = [
+                    get_pool(host, port, kwargs["user"], kwargs["password"], kwargs["database"])
+                    for host, port in parse_endpoints(MYSQL_REPLICAS)
+                ]
+                router = ReplicaRouter(replicas)
+                _router_labels[primary.name] = primary.label
+                _routers[primary.name] = router
+    return router
+
+
+metrics.register(
+    "mysql_replicas", lambda: {_router_labels[name]: router.stats() for name, router in list(_routers.items())}
+)
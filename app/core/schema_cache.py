@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.metrics import metrics
+from db_connection import DatabaseConnection, format_schema_text
+
+# Interval of the background fingerprint check, 0 disables the refresher thread
+SCHEMA_CACHE_REFRESH_SECONDS = float(os.getenv("SCHEMA_CACHE_REFRESH_SECONDS", "60"))
+# Full reload even when the fingerprint is unchanged (catches in-place DDL), 0 disables it
+SCHEMA_CACHE_MAX_AGE_SECONDS = float(os.getenv("SCHEMA_CACHE_MAX_AGE_SECONDS", "3600"))
+
+
+class SchemaCache:
+    """Process-wide cache of the analytics database schema.
+
+    Keeps the structured ``schema_info`` dict and the rendered schema text.
+    Requests only read the in-memory snapshot; a background thread compares a
+    cheap information_schema fingerprint and reloads when it changes. The
+    returned dict is shared, callers must not mutate it.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = SCHEMA_CACHE_REFRESH_SECONDS,
+        max_age: float = SCHEMA_CACHE_MAX_AGE_SECONDS,
+    ):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._state: Optional[Dict[str, Any]] = None
+        self._version = 0
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "checks": 0, "errors": 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _snapshot(self) -> Optional[Dict[str, Any]]:
+        state = self._state
+        if state is not None:
+            self._count("hits")
+            return state
+
+        self._count("misses")
+        with self._load_lock:
+            # Another request may have loaded it while we waited
+            if self._state is None:
+                db = DatabaseConnection(use_replica=True)
+                try:
+                    self._reload(db, db.get_schema_fingerprint())
+                finally:
+                    db.close()
+            return self._state
+
+    def _reload(self, db: DatabaseConnection, fingerprint: Optional[str]):
+        schema_info = db.get_schema()
+        if schema_info is None:
+            self._count("errors")
+            return
+
+        schema_hash = hashlib.sha1(
+            json.dumps(schema_info, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        previous = self._state
+        if previous is None or previous["schema_hash"] != schema_hash:
+            self._version += 1
+
+        self._state = {
+            "schema_info": schema_info,
+            "schema_text": format_schema_text(schema_info),
+            "fingerprint": fingerprint,
+            "schema_hash": schema_hash,
+            "version": self._version,
+            "loaded_at": time.time(),
+        }
+        self._count("refreshes")
+
+    def get_schema(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        state = self._snapshot()
+        return state["schema_info"] if state else None
+
+    def get_schema_text(self) -> Optional[str]:
+        state = self._snapshot()
+        return state["schema_text"] if state else None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def schema_hash(self) -> Optional[str]:
+        """Hash of the schema content, stable across reloads that changed nothing"""
+        state = self._state
+        return state["schema_hash"] if state else None
+
+    def check(self, db: Optional[DatabaseConnection] = None):
+        """Reload the schema if the fingerprint changed or the snapshot is too old"""
+        self._count("checks")
+        owns_connection = db is None
+        db = db or DatabaseConnection(use_replica=True)
+        try:
+            fingerprint = db.get_schema_fingerprint()
+            if fingerprint is None:
+                self._count("errors")
+                return
+
+            state = self._state
+            expired = (
+                state is not None
+                and self.max_age > 0
+                and time.time() - state["loaded_at"] >= self.max_age
+            )
+            if state is None or state["fingerprint"] != fingerprint or expired:
+                with self._load_lock:
+                    self._reload(db, fingerprint)
+        finally:
+            if owns_connection:
+                db.close()
+
+    def invalidate(self):
+        self._state = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.check()
+            except Exception as e:
+                self._count("errors")
+                print(f"Schema cache refresh error: {e}")
+
+    def start(self):
+        """Start the background fingerprint checker (no-op if disabled or running)"""
+        if self.refresh_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="schema-cache-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        state = self._state
+        stats.update({
+            "version": self._version,
+            "tables": len(state["schema_info"]) if state else 0,
+            "age_seconds": round(time.time() - state["loaded_at"], 1) if state else None,
+        })
+        return stats
+
+
+schema_cache = SchemaCache()
+metrics.register("schema_cache", schema_cache.stats)
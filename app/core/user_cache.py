@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.core.metrics import metrics
+from app.models.user import User
+
+# How long an authenticated username maps to its cached user, 0 disables the cache
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+# How long an unknown username is remembered as unknown
+USER_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "10"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+_MISSING = object()
+
+
+class UserSnapshot:
+    """Detached, read-only copy of the User columns requests need"""
+
+    __slots__ = ("id", "username", "full_name", "email", "is_active", "created_at", "updated_at")
+
+    def __init__(self, user: User):
+        for name in self.__slots__:
+            object.__setattr__(self, name, getattr(user, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserSnapshot is read-only")
+
+    def __repr__(self):
+        return f"UserSnapshot(id={self.id}, username={self.username!r})"
+
+
+class UserCache:
+    """TTL cache from token subject (username) to UserSnapshot, including misses.
+
+    ORM inserts, updates and deletes of User drop the affected usernames once
+    the session commits. Changes made with bulk query.update()/delete() or by
+    other processes are only picked up when the entry expires.
+    """
+
+    def __init__(
+        self,
+        ttl: float = USER_CACHE_TTL_SECONDS,
+        negative_ttl: float = USER_CACHE_NEGATIVE_TTL_SECONDS,
+        max_entries: int = USER_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # username -> (expires_at, UserSnapshot or None)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped by every invalidation, a load that started before one is not stored
+        self._generation = 0
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, username: str, load: Callable[[], Optional[User]]) -> Optional[UserSnapshot]:
+        if self.ttl <= 0:
+            user = load()
+            return UserSnapshot(user) if user is not None else None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(username)
+                self._stats["hits" if entry[1] is not None else "negative_hits"] += 1
+                return entry[1]
+            generation = self._generation
+            self._stats["misses"] += 1
+
+        user = load()
+        snapshot = UserSnapshot(user) if user is not None else None
+        ttl = self.ttl if snapshot is not None else self.negative_ttl
+        if ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[username] = (time.monotonic() + ttl, snapshot)
+                    self._entries.move_to_end(username)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, *usernames: str):
+        with self._lock:
+            self._generation += 1
+            for username in usernames:
+                self._entries.pop(username, None)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["negative_hits"] + self._stats["misses"]
+            hit_rate = (self._stats["hits"] + self._stats["negative_hits"]) / lookups if lookups else 0.0
+            return {"entries": len(self._entries), **self._stats, "hit_rate": round(hit_rate, 4)}
+
+
+user_cache = UserCache()
+metrics.register("user_cache", user_cache.stats)
+
+
+def _pending(target: User) -> Optional[Set[str]]:
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault("user_cache_invalidate", set())
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    usernames = {target.username}
+    # A rename leaves the old username cached too
+    usernames.update(name for name in inspect(target).attrs.username.history.deleted or () if name)
+    # Drop now, and again after commit: a request between the flush and the commit still reads the old row
+    user_cache.invalidate(*usernames)
+    pending = _pending(target)
+    if pending is not None:
+        pending.update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    usernames = session.info.pop("user_cache_invalidate", None)
+    if usernames:
+        user_cache.invalidate(*usernames)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("user_cache_invalidate", None)
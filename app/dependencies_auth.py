@@ -1,11 +1,12 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.password_hashing import pwd_context
+from app.core.user_cache import UserSnapshot, user_cache
 from app.repositories.user_repository import get_user_by_username
 from app.schemas.user import TokenData
 
@@ -14,7 +15,6 @@ SECRET_KEY = "your-secret-key-here"  # Ganti dengan secret key yang aman
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 def verify_password(plain_password, hashed_password):
@@ -44,14 +44,15 @@ def verify_token(token: str, credentials_exception):
         raise credentials_exception
     return token_data
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserSnapshot:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     token_data = verify_token(token, credentials_exception)
-    user = get_user_by_username(db, username=token_data.username)
+    # Cached snapshot, not a session-bound User: only Postgres on a miss
+    user = user_cache.get(token_data.username, lambda: get_user_by_username(db, username=token_data.username))
     if user is None:
         raise credentials_exception
     return user
\ No newline at end of file
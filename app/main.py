@@ -1,18 +1,43 @@
+# Load .env before any module reads its settings
+from app.core import config  # noqa: F401
+from contextlib import asynccontextmanager
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.dependencies_auth import get_current_user
 from app.api.v1.api import api_router
 from app.core.database import engine
 from app.core.database import Base
+from app.core.mysql_pool import close_all_pools
+from app.core.password_hashing import password_hasher
+from app.core.schema_cache import schema_cache
+from app.services.chat_persister import chat_persister
+from app.services.intent_router import intent_router
+from app.services.prefetch_service import preview_prefetcher
 from app.models.user import User
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the analytics schema fresh in the background instead of per request
+    schema_cache.start()
+    # Train the intent classifier now, not inside the first chat request
+    if intent_router.mode in ("classifier", "hybrid"):
+        intent_router.start_training()
+    yield
+    schema_cache.stop()
+    preview_prefetcher.shutdown()
+    # Write queued chat messages before the process exits (CHAT_PERSIST_MODE=batched)
+    chat_persister.shutdown()
+    password_hasher.shutdown()
+    close_all_pools()
+
 app = FastAPI(
     title="AI SQL Assistant",
     description="AI SQL Assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import JSON, Column, ForeignKey, Integer, String, DateTime
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -12,5 +12,7 @@ class QueryStore(Base):
     response_type = Column(String, nullable=True, default="")
     answer_template = Column(String, nullable=True, default="")
     display_type = Column(String, nullable=True, default="")
+    # EXPLAIN estimates recorded by the query guard (rows, cost, full_scans, tables)
+    plan_summary = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
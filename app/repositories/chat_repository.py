@@ -1,3 +1,8 @@
+import base64
+import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 
 from app.models.chat import Chat
@@ -32,6 +37,43 @@ def get_all_chats_by_user(db: Session, user_id: int):
         .all()
     )
 
+class InvalidChatCursorError(ValueError):
+    pass
+
+
+def encode_chat_cursor(chat: Chat) -> str:
+    """Opaque `before` cursor pointing just past ``chat`` in newest-first order"""
+    raw = f"{chat.created_at.isoformat()}|{chat.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_chat_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode("ascii")).decode("utf-8")
+        created_at, chat_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(chat_id)
+    except (ValueError, UnicodeError):
+        raise InvalidChatCursorError("Invalid cursor")
+
+
+def get_chats_page_by_user(
+    db: Session, user_id: int, limit: int = 50, before: Optional[str] = None
+) -> Tuple[List[Chat], Optional[str]]:
+    """Newest-first page of a user's chats and the cursor for the next (older) page.
+
+    Keyset on (created_at, id) so every page is a range scan of
+    ix_chats_user_id_created_at_id, however deep.
+    """
+    query = db.query(Chat).filter(Chat.user_id == user_id)
+    if before:
+        created_at, chat_id = decode_chat_cursor(before)
+        query = query.filter(tuple_(Chat.created_at, Chat.id) < tuple_(created_at, chat_id))
+    chats = query.order_by(Chat.created_at.desc(), Chat.id.desc()).limit(limit + 1).all()
+    if len(chats) <= limit:
+        return chats, None
+    chats = chats[:limit]
+    return chats, encode_chat_cursor(chats[-1])
+
 def delete_all_chats_by_user(db: Session, user_id: int):
     db.query(Chat).filter(Chat.user_id == user_id).delete()
     db.commit()
\ No newline at end of file
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 
 from app import dependencies_auth
@@ -11,8 +13,9 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = dependencies_auth.get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    # Callers on the event loop hash with password_hasher first and pass the result
+    hashed_password = hashed_password or dependencies_auth.get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class ChatCreate(BaseModel):
@@ -10,12 +12,25 @@ class ChatResponse(BaseModel):
     type: str
     content: str
     user_id: int
+    created_at: Optional[datetime.datetime] = None
 
     class Config:
         orm_mode = True
 
+class ChatListResponse(BaseModel):
+    chats: List[ChatResponse]
+    # Pass as `before` to get the next (older) page, None on the last page
+    next_before: Optional[str] = None
+
 class TestChat(BaseModel):
     query: str
 
 class ChatStreamInput(BaseModel):
-    query: str
\ No newline at end of file
+    query: str
+    # Per-stream text delta coalescing, server defaults when omitted
+    coalesce: Optional[bool] = None
+    # Bounded so a client can't hold back all text or stand in for the idle timeout
+    coalesce_window_ms: Optional[float] = Field(None, ge=1, le=1000)
+    coalesce_max_bytes: Optional[int] = Field(None, ge=1, le=65536)
+    # Embed the first preview page in tool_call_result events, server default when omitted
+    inline_preview: Optional[bool] = None
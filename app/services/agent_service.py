@@ -1,20 +1,71 @@
 import asyncio
 import json
+import os
 import time
-import queue
-from typing import Generator, Dict, Any, Optional
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Any, NamedTuple, Optional, Set
 from sqlalchemy.orm import Session
-from agents import Agent, Runner, function_tool
+from starlette.concurrency import run_in_threadpool
+from agents import Agent, RunConfig, Runner, function_tool
+from agents.models.openai_provider import OpenAIProvider
 from openai.types.responses import ResponseTextDeltaEvent
-from concurrent.futures import ThreadPoolExecutor
 
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.core.schema_cache import schema_cache
 from app.models.query_store import QueryStore
 from app.models.user import User
-from app.schemas.chat import ChatCreate
-from app.repositories.chat_repository import create_chat, delete_all_chats_by_user, get_all_chats_by_user, get_last_chats_by_user
-from app.utils.generate_sql import generate_sql_from_natural_language
+from app.services.chat_persister import chat_persister
+from app.services.intent_router import intent_router
+from app.services.prefetch_service import build_inline_preview, preview_prefetcher
+from app.repositories.chat_repository import (
+    delete_all_chats_by_user,
+    get_all_chats_by_user,
+    get_chats_page_by_user,
+    get_last_chats_by_user,
+)
+from app.utils.conversation_cache import conversation_cache
+from app.utils.generate_sql import agenerate_sql_from_natural_language
+from app.utils.openai import get_async_openai_client
 from app.utils.templates.chat_system_prompt import chat_system_prompt_template
-from db_connection import DatabaseConnection
+
+# Seconds without any agent event before the stream gives up with a TIMEOUT error
+STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv("STREAM_IDLE_TIMEOUT_SECONDS", "60"))
+# Max events buffered between the agent run and the response writer
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+# How often the stream checks whether the client is still connected
+STREAM_DISCONNECT_POLL_SECONDS = float(os.getenv("STREAM_DISCONNECT_POLL_SECONDS", "0.5"))
+# What to do with the partial answer when the client disconnects: partial, marked or discard
+STREAM_DISCONNECT_PERSIST = os.getenv("STREAM_DISCONNECT_PERSIST", "partial")
+DISCONNECT_MARKER = "\n\n[jawaban terputus]"
+# Merge consecutive text_delta events into one NDJSON line (overridable per stream)
+STREAM_COALESCE_ENABLED = os.getenv("STREAM_COALESCE_ENABLED", "false").lower() in ("1", "true", "yes")
+STREAM_COALESCE_WINDOW_MS = float(os.getenv("STREAM_COALESCE_WINDOW_MS", "30"))
+STREAM_COALESCE_MAX_BYTES = int(os.getenv("STREAM_COALESCE_MAX_BYTES", "512"))
+# End the run as soon as show_query_store returns instead of letting gpt-4o echo the result
+AGENT_DIRECT_TOOL_RESULT = os.getenv("AGENT_DIRECT_TOOL_RESULT", "false").lower() in ("1", "true", "yes")
+# Embed the first preview page in tool_call_result events (overridable per stream), above the cap only query_id is sent
+STREAM_INLINE_PREVIEW = os.getenv("STREAM_INLINE_PREVIEW", "false").lower() in ("1", "true", "yes")
+STREAM_INLINE_PREVIEW_MAX_BYTES = int(os.getenv("STREAM_INLINE_PREVIEW_MAX_BYTES", "32768"))
+
+
+class StoredQuery(NamedTuple):
+    """Plain copy of a QueryStore row: inline previews read it on worker threads, away from any Session"""
+    id: int
+    generated_sql: str
+    response_type: str
+    display_type: str
+    answer_template: str
+
+
+# Partial answers of interrupted streams being saved, referenced until done
+_interrupted_saves: Set[asyncio.Task] = set()
+
+
+def _interrupted_save_done(task: asyncio.Task):
+    _interrupted_saves.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        metrics.incr("chat_stream.disconnect_persist_failed")
+        print(f"Saving interrupted answer failed: {task.exception()}")
 
 
 class AgentService:
@@ -25,12 +76,23 @@ class AgentService:
         self.user = user
         self._current_db = db
         self._current_user = user
+        # QueryStore rows created during this stream, by id, for inline previews
+        self._stored_queries: Dict[int, StoredQuery] = {}
     
     def get_all_chats_by_user(self, user_id: int):
+        chat_persister.flush()
         return get_all_chats_by_user(self.db, user_id)
     
+    def get_chats_page_by_user(self, user_id: int, limit: int, before: Optional[str] = None):
+        chat_persister.flush()
+        return get_chats_page_by_user(self.db, user_id, limit, before)
+
     def delete_all_chats_by_user(self, user_id: int):
-        return delete_all_chats_by_user(self.db, user_id)
+        # Queued messages would otherwise be inserted after the delete
+        chat_persister.flush()
+        result = delete_all_chats_by_user(self.db, user_id)
+        conversation_cache.invalidate(user_id)
+        return result
 
     def create_stream_event(self, event_type: str, content: Any = None, **kwargs) -> str:
         """Helper function untuk membuat NDJSON event"""
@@ -53,21 +115,25 @@ class AgentService:
         
         return json.dumps(event, ensure_ascii=False) + "\n"
     
+    def load_conversation_window(self):
+        chat_persister.flush()
+        last_chats = get_last_chats_by_user(self.db, self.user.id, limit=conversation_cache.window)
+        return [(chat.type, chat.content) for chat in reversed(last_chats)]
+
     def generate_system_prompt(self) -> str:
         """Generate system prompt with user context and schema"""
-        schema_db = DatabaseConnection()
-        schema_text = schema_db.get_schema_text()
+        schema_text = schema_cache.get_schema_text()
         
-        # Get recent conversation context
-        last_chats = get_last_chats_by_user(self.db, self.user.id, limit=8)
-        is_first_interaction = len(last_chats) == 0
+        # Get recent conversation context (oldest first), from memory unless this worker hasn't seen the user yet
+        window = conversation_cache.get(self.user.id, self.load_conversation_window)
+        is_first_interaction = len(window) == 0
         chat_context = ""
         
-        if last_chats and not is_first_interaction:
+        if window and not is_first_interaction:
             chat_entries = []
-            for chat in last_chats[-8:]:
-                role = "User" if chat.type == "user" else "Assistant"
-                chat_entries.append(f"{role}: {chat.content[:150]}") 
+            for chat_type, content in reversed(window):
+                role = "User" if chat_type == "user" else "Assistant"
+                chat_entries.append(f"{role}: {content[:150]}") 
             chat_context = "RECENT CONVERSATION HISTORY:\n" + "\n".join(chat_entries)
 
         # Generate system prompt dengan template
@@ -84,190 +150,362 @@ class AgentService:
         
         return template
     
+    def insert_query_store(self, question: str, sql_result: Dict[str, Any]) -> QueryStore:
+        """Create new QueryStore entry.
+
+        Uses its own session: the agent runs the tool calls of one turn
+        concurrently, each on a worker thread, and ``self.db`` is not thread-safe.
+        """
+        query_store = QueryStore(
+            user_id=self.user.id,
+            question=question,
+            generated_sql=sql_result.get("generated_sql", ""),
+            response_type=sql_result.get("response_type", ""),
+            answer_template=sql_result.get("answer_template", ""),
+            display_type=sql_result.get("response_type", "")
+        )
+        
+        db = SessionLocal()
+        try:
+            db.add(query_store)
+            db.commit()
+            db.refresh(query_store)
+        finally:
+            db.close()
+        return query_store
+
+    async def store_query(self, question: str) -> str:
+        """Generate SQL from natural language, store it in QueryStore and return the tool JSON.
+
+        Cancelling the caller aborts the OpenAI request and skips the insert.
+        """
+        try:
+            print(f"show_query_store: {question}")
+            
+            # Generate SQL from natural language
+            sql_result = await agenerate_sql_from_natural_language(question, self.user.id)
+            
+            # The insert is blocking, keep it off the event loop
+            query_store = await run_in_threadpool(self.insert_query_store, question, sql_result)
+            self._stored_queries[query_store.id] = StoredQuery(
+                query_store.id,
+                query_store.generated_sql,
+                query_store.response_type,
+                query_store.display_type,
+                query_store.answer_template,
+            )
+            # Start on the first preview page while the result travels to the frontend
+            preview_prefetcher.schedule(query_store.id, query_store.generated_sql, query_store.response_type)
+
+            # Return JSON format
+            json_format = {
+                "type": "tool_call_result",
+                "tool_name": "show_query_store",
+                "content": {
+                    "query_id": query_store.id,
+                },
+                "status": "success"
+            }
+            
+            return json.dumps(json_format, ensure_ascii=False)
+            
+        except Exception as e:
+            print(f"Error in show_query_store: {str(e)}")
+            error_format = {
+                "type": "tool_call_result",
+                "tool_name": "show_query_store",
+                "content": {"error": str(e)},
+                "status": "error"
+            }
+            return json.dumps(error_format, ensure_ascii=False)
+
     def create_function_tools(self):
         """Create function tools with proper context"""
         
         @function_tool
-        def show_query_store(question: str):
+        async def show_query_store(question: str):
             """Generate SQL from natural language and store in QueryStore - ONLY return JSON format"""
-            try:
-                print(f"show_query_store: {question}")
-                
-                # Generate SQL from natural language
-                sql_result = generate_sql_from_natural_language(question, self.user.id)
-                
-                # Create new QueryStore entry
-                query_store = QueryStore(
-                    user_id=self.user.id,
-                    question=question,
-                    generated_sql=sql_result.get("generated_sql", ""),
-                    response_type=sql_result.get("response_type", ""),
-                    answer_template=sql_result.get("answer_template", ""),
-                    display_type=sql_result.get("response_type", "")
-                )
-                
-                self.db.add(query_store)
-                self.db.commit()
-                self.db.refresh(query_store)
-
-                # Return JSON format
-                json_format = {
-                    "type": "tool_call_result",
-                    "tool_name": "show_query_store",
-                    "content": {
-                        "query_id": query_store.id,
-                    },
-                    "status": "success"
-                }
-                
-                return json.dumps(json_format, ensure_ascii=False)
-                
-            except Exception as e:
-                print(f"Error in show_query_store: {str(e)}")
-                error_format = {
-                    "type": "tool_call_result",
-                    "tool_name": "show_query_store",
-                    "content": {"error": str(e)},
-                    "status": "error"
-                }
-                return json.dumps(error_format, ensure_ascii=False)
+            return await self.store_query(question)
         
         return [show_query_store]
     
     def save_user_message(self, content: str):
         """Save user message to database"""
-        create_chat(
-            db=self.db,
-            chat=ChatCreate(type="user", content=content),
-            user_id=self.user.id
-        )
+        chat_persister.save(self.db, self.user.id, "user", content)
+        conversation_cache.append(self.user.id, "user", content)
     
-    def save_assistant_message(self, content: str):
+    def save_assistant_message(self, content: str, db: Optional[Session] = None):
         """Save assistant message to database"""
         if content.strip():
-            create_chat(
-                db=self.db,
-                chat=ChatCreate(type="assistant", content=content),
-                user_id=self.user.id
-            )
+            chat_persister.save(db or self.db, self.user.id, "assistant", content)
+            conversation_cache.append(self.user.id, "assistant", content)
+    
+    async def direct_sql_events(self, query: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run show_query_store without the agent, emitting the same stream events"""
+        yield {
+            "type": "tool_call_start",
+            "tool_name": "show_query_store",
+            "tool_id": None,
+            "arguments": json.dumps({"question": query}, ensure_ascii=False),
+        }
+        yield {
+            "type": "tool_call_result",
+            "content": await self.store_query(query)
+        }
     
-    def process_agent_streaming(self, query: str) -> Generator[str, None, None]:
-        """Main method for processing agent streaming with proper separation of concerns"""
+    async def routed_events(self, query: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Send confident data questions straight to SQL generation, the rest to the agent"""
+        route = "agent"
+        if intent_router.enabled:
+            decision = await run_in_threadpool(intent_router.route, query, self.user.id)
+            route = decision.route
+        
+        events = self.direct_sql_events(query) if route == "sql" else self.agent_events(query)
+        async for event in events:
+            yield event
+    
+    async def agent_events(self, query: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run the agent on the current event loop and yield stream events as dicts"""
+        # Generate system prompt (reads chat history from the database)
+        system_prompt = await run_in_threadpool(self.generate_system_prompt)
+        
+        # Create function tools
+        function_tools = self.create_function_tools()
+        
+        # Run agent; in direct mode the tool output becomes the final answer
+        # and the second model turn (which only copies it) is skipped
+        agent = Agent(
+            name="Assistant",
+            instructions=system_prompt,
+            model="gpt-4o",
+            tools=function_tools,
+            tool_use_behavior="stop_on_first_tool" if AGENT_DIRECT_TOOL_RESULT else "run_llm_again"
+        )
+        
+        # Reuse the shared keep-alive client instead of the SDK's own default one
+        run_config = RunConfig(model_provider=OpenAIProvider(openai_client=get_async_openai_client()))
+        result = Runner.run_streamed(agent, input=query, run_config=run_config)
+        tool_used = False
+        
+        try:
+            async for event in result.stream_events():
+                # Handle text delta
+                if (event.type == "raw_response_event" and 
+                    isinstance(event.data, ResponseTextDeltaEvent) and 
+                    event.data.delta and
+                    not tool_used):
+                    
+                    yield {
+                        "type": "text_delta",
+                        "content": event.data.delta
+                    }
+
+                elif event.type == "run_item_stream_event":
+                    if event.item.type == "tool_call_item":
+                        tool_used = True
+                        
+                        yield {
+                            "type": "tool_call_start",
+                            "tool_name": getattr(event.item, "name", "unknown"),
+                            "tool_id": getattr(event.item, "id", None),
+                            "arguments": getattr(event.item, "arguments", {}),
+                        }
+                        
+                    elif event.item.type == "tool_call_output_item":
+                        yield {
+                            "type": "tool_call_result", 
+                            "content": event.item.output
+                        }
+        finally:
+            # Stops the background run task if the consumer went away early
+            result.cancel()
+    
+    def inline_preview(self, tool_output: str, max_bytes: int) -> Optional[Dict[str, Any]]:
+        """First page for the query a show_query_store result points at, None to send the id only"""
+        try:
+            query_id = json.loads(tool_output)["content"]["query_id"]
+        except (TypeError, ValueError, KeyError):
+            return None
+        query_store = self._stored_queries.get(query_id)
+        if query_store is None:
+            return None
+        return build_inline_preview(query_store, max_bytes)
+
+    def text_delta_line(self, content: str) -> str:
+        return json.dumps({"type": "text_delta", "content": content}, ensure_ascii=False) + "\n"
+    
+    def save_interrupted_message(self, content: str):
+        """Persist (or drop) a partial answer according to STREAM_DISCONNECT_PERSIST"""
+        if STREAM_DISCONNECT_PERSIST == "discard" or not content.strip():
+            metrics.incr("chat_stream.disconnect_discarded")
+            return
+        if STREAM_DISCONNECT_PERSIST == "marked":
+            content += DISCONNECT_MARKER
+        # The request session is being closed by get_db once the response ends
+        db = SessionLocal()
+        try:
+            self.save_assistant_message(content, db=db)
+        finally:
+            db.close()
+        metrics.incr("chat_stream.disconnect_persisted")
+
+    async def finish_interrupted(self, producer: asyncio.Task, content: str):
+        """Save a partial answer once the cancelled agent run has stopped.
+
+        A cancelled producer may still be reading ``self.db`` on a worker
+        thread (system prompt history); waiting for it keeps it the only user.
+        """
+        await asyncio.gather(producer, return_exceptions=True)
+        await run_in_threadpool(self.save_interrupted_message, content)
+    
+    async def process_agent_streaming(
+        self,
+        query: str,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        coalesce: Optional[bool] = None,
+        coalesce_window_ms: Optional[float] = None,
+        coalesce_max_bytes: Optional[int] = None,
+        inline_preview: Optional[bool] = None
+    ) -> AsyncGenerator[str, None]:
+        """Main method for processing agent streaming with proper separation of concerns.
+
+        When the client goes away (``is_disconnected`` turns true or the response
+        is cancelled/closed) the agent run, its OpenAI requests and any pending
+        SQL generation are cancelled.
+
+        With ``coalesce`` consecutive text deltas are merged until the window
+        or byte budget is reached; other events are never delayed and flush
+        the buffered text first.
+
+        With ``inline_preview`` each show_query_store result also carries the
+        first /preview/data page as ``preview`` (omitted when it is larger
+        than STREAM_INLINE_PREVIEW_MAX_BYTES); the saved message keeps only
+        the tool output.
+        """
+        coalesce = STREAM_COALESCE_ENABLED if coalesce is None else coalesce
+        inline_preview = STREAM_INLINE_PREVIEW if inline_preview is None else inline_preview
+        coalesce_window = (STREAM_COALESCE_WINDOW_MS if coalesce_window_ms is None else coalesce_window_ms) / 1000
+        coalesce_max_bytes = STREAM_COALESCE_MAX_BYTES if coalesce_max_bytes is None else coalesce_max_bytes
+
         try:
             yield self.create_stream_event("start", {"message": "Starting chat processing"})
             
             # Save user message
-            self.save_user_message(query)
+            await run_in_threadpool(self.save_user_message, query)
             
-            # Setup untuk streaming
-            result_queue = queue.Queue()
-            ai_content_container = {"content": ""}
-            tool_used = {"used": False}
+            # The agent runs in its own task so a slow client only fills the bounded queue
+            event_queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+            ai_content = ""
+            state = {"finished": False, "disconnected": False}
             
-            def async_stream_task():
+            async def produce():
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    async def do_streaming():
-                        # Generate system prompt
-                        system_prompt = self.generate_system_prompt()
-                        
-                        # Create function tools
-                        function_tools = self.create_function_tools()
-                        
-                        # Run agent
-                        agent = Agent(
-                            name="Assistant",
-                            instructions=system_prompt,
-                            model="gpt-4o",
-                            tools=function_tools
-                        )
-                        
-                        result = Runner.run_streamed(agent, input=query)
-                        
-                        async for event in result.stream_events():
-                            # Handle text delta
-                            if (event.type == "raw_response_event" and 
-                                isinstance(event.data, ResponseTextDeltaEvent) and 
-                                event.data.delta and
-                                not tool_used["used"]):
-                                
-                                ai_content_container["content"] += event.data.delta
-                                result_queue.put({
-                                    "type": "text_delta",
-                                    "content": event.data.delta
-                                })
-
-                            elif event.type == "run_item_stream_event":
-                                if event.item.type == "tool_call_item":
-                                    tool_used["used"] = True
-                                    ai_content_container["content"] = ""
-                                    
-                                    result_queue.put({
-                                        "type": "tool_call_start",
-                                        "tool_name": getattr(event.item, "name", "unknown"),
-                                        "tool_id": getattr(event.item, "id", None),
-                                        "arguments": getattr(event.item, "arguments", {}),
-                                    })
-                                    
-                                elif event.item.type == "tool_call_output_item":
-                                    tool_output = event.item.output
-                                    ai_content_container["content"] = tool_output
-                                    
-                                    result_queue.put({
-                                        "type": "tool_call_result", 
-                                        "content": tool_output
-                                    })
-                        
-                        # Send completion
-                        result_queue.put({
-                            "type": "completion",
-                            "content": ai_content_container["content"]
-                        })
-                        result_queue.put(None)  # End signal
-                    
-                    loop.run_until_complete(do_streaming())
+                    async for event in self.routed_events(query):
+                        await event_queue.put(event)
                     
+                    # Send completion (content is filled in by the writer below)
+                    await event_queue.put({"type": "completion"})
                 except Exception as e:
                     print(f"Streaming error: {str(e)}")
-                    result_queue.put({
+                    await event_queue.put({
                         "type": "error",
                         "content": str(e),
                         "error_code": "STREAMING_ERROR"
                     })
-                    result_queue.put(None)
-                finally:
-                    loop.close()
+                await event_queue.put(None)  # End signal
             
-            # Jalankan streaming di background
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(async_stream_task)
-                
-                # Stream hasil
+            async def watch_disconnect():
+                while not await is_disconnected():
+                    await asyncio.sleep(STREAM_DISCONNECT_POLL_SECONDS)
+                state["disconnected"] = True
+                producer.cancel()
+                # Wake the writer up with the end signal
+                while not event_queue.empty():
+                    event_queue.get_nowait()
+                event_queue.put_nowait(None)
+            
+            producer = asyncio.create_task(produce())
+            watcher = asyncio.create_task(watch_disconnect()) if is_disconnected else None
+            loop = asyncio.get_running_loop()
+            # Coalesced text not written yet
+            pending = []
+            pending_bytes = 0
+            flush_at = 0.0
+            try:
                 while True:
                     try:
-                        chunk = result_queue.get(timeout=60)
-                        if chunk is None:
-                            break
-                        
-                        if isinstance(chunk, dict):
-                            yield json.dumps(chunk, ensure_ascii=False) + "\n"
+                        if not event_queue.empty():
+                            chunk = event_queue.get_nowait()
                         else:
-                            yield self.create_stream_event("text", chunk)
-                            
-                    except queue.Empty:
+                            timeout = max(flush_at - loop.time(), 0) if pending else STREAM_IDLE_TIMEOUT_SECONDS
+                            chunk = await asyncio.wait_for(event_queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        if pending:
+                            yield self.text_delta_line("".join(pending))
+                            pending, pending_bytes = [], 0
+                            continue
                         yield self.create_stream_event("error", "Connection timeout", error_code="TIMEOUT")
                         break
-                
-                # Tunggu task selesai
-                try:
-                    future.result(timeout=5)
-                except Exception as e:
-                    print(f"Future result error: {str(e)}")
+                    if chunk is None:
+                        break
                     
-                # Save assistant response
-                self.save_assistant_message(ai_content_container["content"])
+                    if chunk["type"] == "text_delta":
+                        ai_content += chunk["content"]
+                        if coalesce:
+                            if not pending:
+                                flush_at = loop.time() + coalesce_window
+                            pending.append(chunk["content"])
+                            pending_bytes += len(chunk["content"].encode("utf-8"))
+                            if pending_bytes >= coalesce_max_bytes or loop.time() >= flush_at:
+                                yield self.text_delta_line("".join(pending))
+                                pending, pending_bytes = [], 0
+                            continue
+                    elif pending:
+                        # Never hold back tool/completion events behind buffered text
+                        yield self.text_delta_line("".join(pending))
+                        pending, pending_bytes = [], 0
+                    
+                    if chunk["type"] == "tool_call_start":
+                        ai_content = ""
+                    elif chunk["type"] == "tool_call_result":
+                        ai_content = chunk["content"]
+                        if inline_preview:
+                            preview = await run_in_threadpool(
+                                self.inline_preview, chunk["content"], STREAM_INLINE_PREVIEW_MAX_BYTES
+                            )
+                            if preview is not None:
+                                chunk["preview"] = preview
+                    elif chunk["type"] == "completion":
+                        chunk["content"] = ai_content
+                    
+                    yield json.dumps(chunk, ensure_ascii=False) + "\n"
+                
+                if pending and not state["disconnected"]:
+                    yield self.text_delta_line("".join(pending))
+                state["finished"] = not state["disconnected"]
+            finally:
+                if watcher:
+                    watcher.cancel()
+                if not producer.done():
+                    producer.cancel()
+                if not state["finished"]:
+                    # Disconnect detected by the watcher, or the response task was
+                    # cancelled/closed by the server: we can't await here anymore,
+                    # a separate task waits for the producer and saves the answer
+                    metrics.incr("chat_stream.disconnect_cancelled")
+                    print("Client disconnected, agent run cancelled")
+                    task = asyncio.get_running_loop().create_task(self.finish_interrupted(producer, ai_content))
+                    _interrupted_saves.add(task)
+                    task.add_done_callback(_interrupted_save_done)
+                else:
+                    # Idle timeout: the producer may still be inside a threadpool call using self.db
+                    await asyncio.gather(producer, return_exceptions=True)
+            
+            if state["disconnected"]:
+                return
+                
+            # Save assistant response
+            await run_in_threadpool(self.save_assistant_message, ai_content)
             
             # Send final end event
             yield self.create_stream_event("end", {"message": "Stream completed"})
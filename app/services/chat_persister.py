@@ -0,0 +1,154 @@
+import datetime
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.models.chat import Chat
+from app.repositories.chat_repository import create_chat
+from app.schemas.chat import ChatCreate
+
+# sync: every message is its own transaction on the request path (durable once the turn returns)
+# batched: messages are queued and bulk inserted in the background (lost if the process dies before a flush)
+CHAT_PERSIST_MODE = os.getenv("CHAT_PERSIST_MODE", "sync")
+# A batch is written when it reaches this many messages or its oldest message is this old
+CHAT_PERSIST_BATCH_SIZE = int(os.getenv("CHAT_PERSIST_BATCH_SIZE", "100"))
+CHAT_PERSIST_FLUSH_MS = float(os.getenv("CHAT_PERSIST_FLUSH_MS", "200"))
+# Queued messages above this are written synchronously instead
+CHAT_PERSIST_MAX_QUEUE = int(os.getenv("CHAT_PERSIST_MAX_QUEUE", "10000"))
+# Attempts per batch before its messages are dropped (and logged)
+CHAT_PERSIST_RETRIES = 3
+
+_STOP = object()
+
+
+class ChatPersister:
+    """Saves chat messages either inline (sync) or through a write-behind queue (batched).
+
+    In batched mode a daemon thread, started on the first message, drains
+    the queue into multi-row INSERTs. ``flush()`` blocks until everything
+    queued before it is in the database; readers of chat history call it
+    first so a user always sees their own messages.
+    """
+
+    def __init__(
+        self,
+        mode: str = CHAT_PERSIST_MODE,
+        batch_size: int = CHAT_PERSIST_BATCH_SIZE,
+        flush_interval: float = CHAT_PERSIST_FLUSH_MS / 1000,
+        max_queue: int = CHAT_PERSIST_MAX_QUEUE,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.mode = mode if mode in ("sync", "batched") else "sync"
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(max_queue, 1))
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def batched(self) -> bool:
+        return self.mode == "batched" and not self._closed
+
+    def save(self, db: Session, user_id: int, chat_type: str, content: str):
+        if not self.batched:
+            create_chat(db=db, chat=ChatCreate(type=chat_type, content=content), user_id=user_id)
+            return
+        self._ensure_thread()
+        row = {
+            "type": chat_type,
+            "content": content,
+            "user_id": user_id,
+            # Stamped now: the batch is inserted later, server now() would reorder the conversation
+            "created_at": datetime.datetime.now(datetime.timezone.utc),
+        }
+        try:
+            self._queue.put_nowait(row)
+            metrics.incr("chat_persist.queued")
+        except queue.Full:
+            metrics.incr("chat_persist.sync_fallback")
+            create_chat(db=db, chat=ChatCreate(type=chat_type, content=content), user_id=user_id)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until messages queued so far are written, False on timeout"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chat-persister", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        first_at = 0.0
+        while True:
+            timeout = None if not batch else max(first_at + self.flush_interval - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                if not batch:
+                    first_at = time.monotonic()
+                batch.append(item)
+                if len(batch) < self.batch_size and time.monotonic() - first_at < self.flush_interval:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        for attempt in range(1, CHAT_PERSIST_RETRIES + 1):
+            db = self.session_factory()
+            try:
+                db.execute(insert(Chat), batch)
+                db.commit()
+                metrics.incr("chat_persist.written", len(batch))
+                metrics.observe("chat_persist.flush", time.perf_counter() - start)
+                return
+            except Exception as e:
+                db.rollback()
+                print(f"Chat persist flush failed (attempt {attempt}/{CHAT_PERSIST_RETRIES}): {e}")
+                if attempt < CHAT_PERSIST_RETRIES:
+                    time.sleep(0.5 * attempt)
+            finally:
+                db.close()
+        metrics.incr("chat_persist.dropped", len(batch))
+
+    def shutdown(self, timeout: float = 30.0):
+        """Write everything still queued; later messages are saved synchronously"""
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "queue_depth": self._queue.qsize()}
+
+
+chat_persister = ChatPersister()
+metrics.register("chat_persister", chat_persister.stats)
@@ -0,0 +1,169 @@
+import csv
+import datetime
+import io
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional
+
+from mysql.connector import Error
+
+from app.core.metrics import metrics
+from db_connection import TIMEOUT_ERRNOS, DatabaseConnection, QueryTimeoutError
+
+EXPORT_FORMATS = ("ndjson", "csv")
+# Rows per fetchmany call, i.e. per chunk written to the response
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Stop an export after this many rows / seconds, 0 disables the limit. The seconds are also the
+# statement's server-side limit (plus QUERY_KILL_GRACE_SECONDS before KILL QUERY), like preview queries
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "1000000"))
+EXPORT_MAX_SECONDS = float(os.getenv("EXPORT_MAX_SECONDS", "300"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _json_default(value: Any):
+    """Same conversions FastAPI applies to /preview/data rows"""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    if isinstance(value, set):
+        return list(value)
+    return str(value)
+
+
+class QueryExport:
+    """Streams the full result of a stored query as NDJSON or CSV.
+
+    ``start()`` executes the query on an unbuffered cursor (SQL errors surface
+    before any byte is sent); iterating yields one encoded chunk per
+    ``fetchmany`` batch. It is a plain generator driven by the response
+    writer, so the next batch is only read from MySQL once the previous one
+    has been sent: memory stays at one batch and a slow client slows the
+    export down instead of filling buffers. NDJSON ends with an
+    ``{"__export__": {...}}`` line saying whether the export is complete.
+    ``max_seconds`` is enforced by MySQL too, so a fetch stuck on a slow
+    query is interrupted instead of only being checked between batches.
+    """
+
+    def __init__(
+        self,
+        sql: str,
+        format: str = "ndjson",
+        batch_size: int = EXPORT_BATCH_SIZE,
+        max_rows: int = EXPORT_MAX_ROWS,
+        max_seconds: float = EXPORT_MAX_SECONDS,
+        db_conn: Optional[DatabaseConnection] = None,
+    ):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        self.sql = sql
+        self.format = format
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.db_conn = db_conn or DatabaseConnection(use_replica=True)
+        self.media_type = MEDIA_TYPES[format]
+        self.rows = 0
+        self.finished = False
+        self._cursor = None
+        self._columns: List[str] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> "QueryExport":
+        try:
+            self._cursor = self.db_conn.execute_unbuffered(self.sql, timeout=self.max_seconds or None)
+        except Error as e:
+            self.close()
+            if self.max_seconds and e.errno in TIMEOUT_ERRNOS:
+                raise QueryTimeoutError(self.max_seconds, killed=e.errno == 1317) from e
+            raise
+        except Exception:
+            self.close()
+            raise
+        self._columns = [column[0] for column in self._cursor.description or []]
+        metrics.incr("export.started")
+        return self
+
+    def _encode(self, rows: List[tuple]) -> bytes:
+        if self.format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            return buffer.getvalue().encode("utf-8")
+        columns = self._columns
+        return "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+    def _trailer(self, reason: Optional[str]) -> bytes:
+        if self.format != "ndjson":
+            return b""
+        status = {"rows": self.rows, "complete": reason is None}
+        if reason:
+            status["reason"] = reason
+        return (json.dumps({"__export__": status}) + "\n").encode("utf-8")
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._cursor is None:
+            self.start()
+        started = time.monotonic()
+        reason = None
+        try:
+            if self.format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerow(self._columns)
+                yield buffer.getvalue().encode("utf-8")
+
+            while True:
+                batch_size = self.batch_size
+                if self.max_rows:
+                    batch_size = min(batch_size, self.max_rows - self.rows)
+                    if batch_size <= 0:
+                        reason = "max_rows"
+                        break
+                if self.max_seconds and time.monotonic() - started > self.max_seconds:
+                    reason = "max_seconds"
+                    break
+
+                try:
+                    rows = self._cursor.fetchmany(batch_size)
+                except Error as e:
+                    print(f"Error during export: {e}")
+                    reason = "max_seconds" if e.errno in TIMEOUT_ERRNOS else "error"
+                    break
+                if not rows:
+                    self.finished = True
+                    break
+                self.rows += len(rows)
+                yield self._encode(rows)
+
+            if reason is not None:
+                print(f"Export stopped after {self.rows} rows: {reason}")
+                metrics.incr(f"export.stopped.{reason}")
+            yield self._trailer(reason)
+        finally:
+            metrics.incr("export.rows", self.rows)
+            metrics.observe("export.duration", time.monotonic() - started)
+            self.close()
+
+    def close(self):
+        """Release the connection (idempotent); an unfinished result gets the connection discarded"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._cursor is not None:
+            try:
+                self._cursor.close()
+            except Error:
+                pass
+        self.db_conn.close(discard=not self.finished)
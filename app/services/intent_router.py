@@ -0,0 +1,290 @@
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.core.schema_cache import schema_cache
+from app.models.chat import Chat
+from app.models.query_store import QueryStore
+
+# off, rules, classifier or hybrid (rules first, classifier for the rest)
+INTENT_ROUTER_MODE = os.getenv("INTENT_ROUTER_MODE", "off")
+# Minimum confidence to skip the agent and go straight to SQL generation
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.85"))
+# JSONL file receiving every routing decision for offline evaluation, empty disables it
+INTENT_ROUTER_LOG_PATH = os.getenv("INTENT_ROUTER_LOG_PATH", "")
+INTENT_ROUTER_RETRAIN_SECONDS = float(os.getenv("INTENT_ROUTER_RETRAIN_SECONDS", "3600"))
+INTENT_ROUTER_TRAINING_ROWS = int(os.getenv("INTENT_ROUTER_TRAINING_ROWS", "5000"))
+# A user message counts as a data question if a QueryStore row follows it within this window
+INTENT_ROUTER_LABEL_WINDOW_SECONDS = float(os.getenv("INTENT_ROUTER_LABEL_WINDOW_SECONDS", "120"))
+
+DATA_VERBS = {
+    "berapa", "tampilkan", "tunjukkan", "tampilin", "lihat", "lihatkan", "cari", "carikan",
+    "daftar", "list", "hitung", "total", "jumlah", "rata", "ratarata", "top", "termahal",
+    "termurah", "terbanyak", "tertinggi", "terendah", "terbaru", "terlaris", "show", "count",
+}
+DATA_NOUNS = {
+    "produk", "product", "stok", "stock", "kategori", "category", "transaksi", "harga",
+    "price", "penjualan", "sales", "customer", "pelanggan", "order", "pesanan", "laporan",
+}
+SMALL_TALK = re.compile(
+    r"^(halo|hallo|hai|hi|hello|hey|pagi|siang|sore|malam|selamat \w+|terima ?kasih|makasih|thanks?|"
+    r"thank you|ok(e|ay)?|sip|mantap|bye|dah)\b"
+)
+META_QUESTIONS = re.compile(r"\b(bisa (nanya|tanya|bantu) apa|kamu siapa|siapa kamu|cara pakai|help|bantuan)\b")
+# Follow-ups need the conversation history, which only the agent has
+FOLLOW_UPS = re.compile(
+    r"\b(itu|tadi|barusan|tersebut|sebelumnya|yang (kedua|ketiga|terakhir|kemarin|sama|lain)|lagi|"
+    r"bagaimana dengan|kalau yang)\b|\b(bagaimana|gimana)\s*\?*$"
+)
+
+SEED_NEGATIVES = [
+    "halo", "hai apa kabar", "terima kasih", "makasih ya", "kamu siapa", "saya bisa nanya apa aja",
+    "bisa bantu apa", "selamat pagi", "oke sip", "jelaskan maksudnya", "kenapa begitu",
+]
+
+
+def tokenize(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class RouteDecision:
+    """Where a question should go: "sql" (direct SQL generation) or "agent" """
+
+    def __init__(self, route: str, confidence: float, source: str, details: Optional[Dict] = None):
+        self.route = route
+        self.confidence = confidence
+        self.source = source
+        self.details = details or {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "route": self.route,
+            "confidence": round(self.confidence, 4),
+            "source": self.source,
+            **self.details,
+        }
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word unigrams and bigrams, labels "sql"/"agent" """
+
+    def __init__(self):
+        self.token_counts = {"sql": Counter(), "agent": Counter()}
+        self.doc_counts = {"sql": 0, "agent": 0}
+        self.vocabulary = set()
+
+    def fit(self, samples: Iterable[Tuple[str, str]]):
+        for text, label in samples:
+            tokens = tokenize(text)
+            self.token_counts[label].update(tokens)
+            self.doc_counts[label] += 1
+            self.vocabulary.update(tokens)
+        return self
+
+    @property
+    def trained(self) -> bool:
+        return self.doc_counts["sql"] > 0 and self.doc_counts["agent"] > 0
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that text is a data question"""
+        tokens = tokenize(text)
+        total_docs = self.doc_counts["sql"] + self.doc_counts["agent"]
+        vocabulary_size = len(self.vocabulary) + 1
+        log_scores = {}
+        for label in ("sql", "agent"):
+            counts = self.token_counts[label]
+            denominator = sum(counts.values()) + vocabulary_size
+            score = math.log(self.doc_counts[label] / total_docs)
+            for token in tokens:
+                score += math.log((counts[token] + 1) / denominator)
+            log_scores[label] = score
+        top = max(log_scores.values())
+        sql_score = math.exp(log_scores["sql"] - top)
+        agent_score = math.exp(log_scores["agent"] - top)
+        return sql_score / (sql_score + agent_score)
+
+
+def load_training_samples(limit: int = INTENT_ROUTER_TRAINING_ROWS) -> List[Tuple[str, str]]:
+    """Label past user messages by whether a QueryStore row followed them"""
+    db = SessionLocal()
+    try:
+        questions = (
+            db.query(QueryStore.user_id, QueryStore.question, QueryStore.created_at)
+            .order_by(QueryStore.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        messages = (
+            db.query(Chat.user_id, Chat.content, Chat.created_at)
+            .filter(Chat.type == "user")
+            .order_by(Chat.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+    query_times = defaultdict(list)
+    samples = []
+    for user_id, question, created_at in questions:
+        if created_at:
+            query_times[user_id].append(created_at.timestamp())
+        if question:
+            samples.append((question, "sql"))
+    for times in query_times.values():
+        times.sort()
+
+    for user_id, content, created_at in messages:
+        if not content or not created_at:
+            continue
+        sent_at = created_at.timestamp()
+        times = query_times.get(user_id, [])
+        index = bisect.bisect_left(times, sent_at)
+        followed = index < len(times) and times[index] - sent_at <= INTENT_ROUTER_LABEL_WINDOW_SECONDS
+        samples.append((content, "sql" if followed else "agent"))
+
+    samples.extend((text, "agent") for text in SEED_NEGATIVES)
+    return samples
+
+
+class IntentRouter:
+    """Decides whether a question can skip the gpt-4o agent.
+
+    Small talk and follow-ups always go to the agent, whatever the mode:
+    they need the conversation history that only the agent has. Rules catch
+    the obvious data questions ("berapa/tampilkan" plus a known table,
+    column or business noun). The classifier, trained on past questions,
+    scores the rest. Anything below the threshold goes to the agent.
+    """
+
+    def __init__(self, mode: str = INTENT_ROUTER_MODE, threshold: float = INTENT_ROUTER_THRESHOLD):
+        self.mode = mode
+        self.threshold = threshold
+        self._classifier: Optional[NaiveBayesClassifier] = None
+        self._trained_at = 0.0
+        self._training = threading.Lock()
+        self._training_thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._schema_terms = (None, set())
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("rules", "classifier", "hybrid")
+
+    def schema_terms(self) -> set:
+        version = schema_cache.version
+        if self._schema_terms[0] != version:
+            terms = set()
+            for table_name, columns in (schema_cache.get_schema() or {}).items():
+                terms.update(table_name.lower().split("_"))
+                for column in columns:
+                    terms.update(column["Field"].lower().split("_"))
+            # "id" and friends match too much to be useful
+            terms -= {"id", "at", "is", "by", "created", "updated", "name", "type"}
+            self._schema_terms = (version, terms)
+        return self._schema_terms[1]
+
+    def veto(self, question: str) -> Optional[RouteDecision]:
+        """Agent-only questions: small talk, meta questions and follow-ups"""
+        text = question.lower().strip()
+        if not re.search(r"[a-z0-9]", text) or SMALL_TALK.match(text) or META_QUESTIONS.search(text):
+            return RouteDecision("agent", 0.95, "rules", {"rule": "small_talk"})
+        if FOLLOW_UPS.search(text):
+            return RouteDecision("agent", 0.9, "rules", {"rule": "follow_up"})
+        return None
+
+    def route_by_rules(self, question: str) -> RouteDecision:
+        veto = self.veto(question)
+        if veto is not None:
+            return veto
+        words = set(re.findall(r"[a-z0-9]+", question.lower()))
+
+        has_verb = bool(words & DATA_VERBS)
+        has_noun = bool(words & DATA_NOUNS) or bool(words & self.schema_terms())
+        if has_verb and has_noun:
+            return RouteDecision("sql", 0.95, "rules", {"rule": "verb_and_noun"})
+        if has_verb or has_noun:
+            return RouteDecision("sql", 0.6, "rules", {"rule": "verb_or_noun"})
+        return RouteDecision("agent", 0.6, "rules", {"rule": "no_data_terms"})
+
+    def classifier(self) -> Optional[NaiveBayesClassifier]:
+        """Current classifier, None (route to the agent) until the first training finishes"""
+        if time.time() - self._trained_at >= INTENT_ROUTER_RETRAIN_SECONDS:
+            self.start_training()
+        return self._classifier
+
+    def start_training(self):
+        """Train on a background thread, unless a training is already running"""
+        with self._start_lock:
+            if self._training_thread is not None and self._training_thread.is_alive():
+                return
+            self._training_thread = threading.Thread(target=self.train, name="intent-router-train", daemon=True)
+            self._training_thread.start()
+
+    def train(self):
+        with self._training:
+            try:
+                classifier = NaiveBayesClassifier().fit(load_training_samples())
+                self._classifier = classifier if classifier.trained else None
+                metrics.incr("intent_router.trainings")
+            except Exception as e:
+                print(f"Intent router training error: {e}")
+            finally:
+                self._trained_at = time.time()
+
+    def route(self, question: str, user_id: Optional[int] = None) -> RouteDecision:
+        if not self.enabled:
+            return RouteDecision("agent", 1.0, "disabled")
+
+        # Never overridden by the threshold or the classifier
+        decision = self.veto(question)
+        if decision is not None:
+            metrics.incr("intent_router.agent")
+            self.log_decision(question, user_id, decision)
+            return decision
+
+        if self.mode in ("rules", "hybrid"):
+            decision = self.route_by_rules(question)
+            if self.mode == "hybrid" and decision.confidence < self.threshold:
+                decision = None
+
+        if decision is None:
+            classifier = self.classifier()
+            if classifier is not None:
+                probability = classifier.predict_proba(question)
+                route = "sql" if probability >= 0.5 else "agent"
+                confidence = probability if route == "sql" else 1 - probability
+                decision = RouteDecision(route, confidence, "classifier")
+            else:
+                decision = RouteDecision("agent", 0.0, "untrained")
+
+        # Only confident data questions skip the agent
+        if decision.route == "sql" and decision.confidence < self.threshold:
+            decision = RouteDecision("agent", decision.confidence, decision.source, {
+                **decision.details, "fallback": True
+            })
+
+        metrics.incr(f"intent_router.{decision.route}")
+        self.log_decision(question, user_id, decision)
+        return decision
+
+    def log_decision(self, question: str, user_id: Optional[int], decision: RouteDecision):
+        if not INTENT_ROUTER_LOG_PATH:
+            return
+        record = {"ts": time.time(), "user_id": user_id, "question": question, **decision.to_dict()}
+        with self._log_lock:
+            with open(INTENT_ROUTER_LOG_PATH, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.metrics import metrics
+from app.services.preview_service import PAGED_RESPONSE_TYPES, PREVIEW_COUNT_STRATEGY, PreviewService, fill_template
+from db_connection import DatabaseConnection
+
+# Run the first /preview/data page in the background as soon as show_query_store stores a query
+PREVIEW_PREFETCH_ENABLED = os.getenv("PREVIEW_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+# Page size prefetched, requests with another limit run their own query
+PREVIEW_PREFETCH_LIMIT = int(os.getenv("PREVIEW_PREFETCH_LIMIT", "10"))
+PREVIEW_PREFETCH_WORKERS = int(os.getenv("PREVIEW_PREFETCH_WORKERS", "4"))
+# Prefetches queued or running at once, more are skipped (each holds a MySQL connection while running)
+PREVIEW_PREFETCH_MAX_PENDING = int(os.getenv("PREVIEW_PREFETCH_MAX_PENDING", "32"))
+# How long an unclaimed result is kept, and how long /preview/data waits for one still running
+PREVIEW_PREFETCH_TTL_SECONDS = float(os.getenv("PREVIEW_PREFETCH_TTL_SECONDS", "120"))
+PREVIEW_PREFETCH_WAIT_SECONDS = float(os.getenv("PREVIEW_PREFETCH_WAIT_SECONDS", "30"))
+PREVIEW_PREFETCH_MAX_ENTRIES = 1000
+
+
+class PreviewPrefetcher:
+    """Runs the first preview page of freshly stored queries on a bounded thread pool.
+
+    ``schedule()`` is called right after the QueryStore insert; /preview/data
+    then ``join()``s the in-flight or finished result instead of starting
+    the same query again. A result is handed out once (later views go
+    through the result cache) and only for the default first page:
+    sentence queries get the first row, paged ones ``page(sql, 1, limit,
+    count)`` with the prefetch limit and the default count strategy.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = PREVIEW_PREFETCH_ENABLED,
+        limit: int = PREVIEW_PREFETCH_LIMIT,
+        workers: int = PREVIEW_PREFETCH_WORKERS,
+        max_pending: int = PREVIEW_PREFETCH_MAX_PENDING,
+        ttl: float = PREVIEW_PREFETCH_TTL_SECONDS,
+        wait: float = PREVIEW_PREFETCH_WAIT_SECONDS,
+        count: str = PREVIEW_COUNT_STRATEGY,
+    ):
+        self.enabled = enabled
+        self.limit = limit
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.wait = wait
+        self.count = count
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._pending = 0
+
+    def kind(self, response_type: str, limit: Optional[int] = None, count: Optional[str] = None) -> Optional[tuple]:
+        """What a first-page request fetches; schedule() and join() must agree on it"""
+        if response_type == "sentence":
+            return ("sentence",)
+        if response_type in PAGED_RESPONSE_TYPES:
+            return ("page", limit or self.limit, count or self.count)
+        return None
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, sql: str, kind: tuple, response_type: str):
+        start = time.perf_counter()
+        db_conn = DatabaseConnection(use_replica=True)
+        try:
+            previewer = PreviewService(db_conn, response_type)
+            if kind[0] == "sentence":
+                return previewer.first_row(sql)
+            return previewer.page(sql, 1, kind[1], kind[2])
+        except Exception as e:
+            print(f"Preview prefetch failed: {e}")
+            metrics.incr("preview.prefetch.failed")
+            raise
+        finally:
+            db_conn.close()
+            metrics.observe("preview.prefetch.query", time.perf_counter() - start)
+
+    def schedule(self, query_id: int, sql: str, response_type: str) -> bool:
+        """Start fetching the first page of a stored query, False when disabled, unsupported or busy"""
+        kind = self.kind(response_type)
+        if not self.enabled or kind is None or not sql:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if oldest["expires_at"] > now and len(self._entries) < PREVIEW_PREFETCH_MAX_ENTRIES:
+                    break
+                self._entries.popitem(last=False)
+            if self._pending >= self.max_pending:
+                metrics.incr("preview.prefetch.skipped")
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preview-prefetch")
+            try:
+                future = self._executor.submit(self._run, sql, kind, response_type)
+            except RuntimeError:
+                # Executor already shut down
+                return False
+            self._pending += 1
+            self._entries[query_id] = {"sql": sql, "kind": kind, "future": future, "expires_at": now + self.ttl}
+        future.add_done_callback(self._done)
+
+        metrics.incr("preview.prefetch.scheduled")
+        return True
+
+    def join(self, query_id: int, sql: str, kind: tuple) -> Tuple[bool, Any]:
+        """(True, result) when a prefetch for this exact request exists and succeeds, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(query_id)
+            if entry is None or entry["sql"] != sql or entry["kind"] != kind or entry["expires_at"] <= time.monotonic():
+                return False, None
+            del self._entries[query_id]
+
+        future: Future = entry["future"]
+        was_done = future.done()
+        start = time.perf_counter()
+        try:
+            result = future.result(timeout=self.wait)
+        except FutureTimeoutError:
+            metrics.incr("preview.prefetch.wait_timeout")
+            return False, None
+        except Exception:
+            # Already counted as failed, the caller runs the query itself and reports the error
+            return False, None
+        metrics.observe("preview.prefetch.wait", time.perf_counter() - start)
+        metrics.incr("preview.prefetch.hit_done" if was_done else "preview.prefetch.hit_inflight")
+        return True, result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._entries.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": self.enabled, "pending": self._pending, "entries": len(self._entries)}
+
+
+preview_prefetcher = PreviewPrefetcher()
+metrics.register("preview_prefetch", preview_prefetcher.stats)
+
+
+def build_inline_preview(query_store, max_bytes: int) -> Optional[Dict[str, Any]]:
+    """First-page /preview/data response for a stored query, to embed in the tool_call_result event.
+
+    Takes the prefetched result when there is one. Returns None (the widget
+    then calls /preview/data itself) when the encoded payload is larger than
+    ``max_bytes`` or the query fails.
+    """
+    kind = preview_prefetcher.kind(query_store.response_type)
+    if kind is None:
+        return None
+    try:
+        prefetched, result = preview_prefetcher.join(query_store.id, query_store.generated_sql, kind)
+        if not prefetched:
+            db_conn = DatabaseConnection(use_replica=True)
+            try:
+                previewer = PreviewService(db_conn, query_store.response_type)
+                if kind[0] == "sentence":
+                    result = previewer.first_row(query_store.generated_sql)
+                else:
+                    result = previewer.page(query_store.generated_sql, 1, kind[1], kind[2])
+            finally:
+                db_conn.close()
+    except Exception as e:
+        print(f"Inline preview failed: {e}")
+        metrics.incr("preview.inline.failed")
+        return None
+
+    # Same shapes as the first page of /preview/data
+    payload = {"response_type": query_store.response_type, "display_type": query_store.display_type}
+    if kind[0] == "sentence":
+        if result:
+            payload["output_text"] = fill_template(query_store.answer_template, result)
+        else:
+            payload["data"] = []
+    elif not result["rows"]:
+        payload["data"] = []
+    else:
+        payload.update(page=1, limit=kind[1], total=result["total"], data=result["rows"].as_dicts())
+
+    payload = jsonable_encoder(payload)
+    size = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    if size > max_bytes:
+        metrics.incr("preview.inline.too_large")
+        return None
+    metrics.incr("preview.inline.sent")
+    return payload
@@ -0,0 +1,442 @@
+import base64
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from mysql.connector import Error
+from mysql.connector.constants import FieldType
+
+from app.core.metrics import metrics
+from app.core.schema_cache import schema_cache
+from app.services.query_guard import Admission, query_guard
+from app.utils.result_cache import result_cache
+from app.utils.sql_utils import KeysetPlan, SelectShape
+from db_connection import DatabaseConnection, QueryTimeoutError
+
+# auto, window, cached or skip (per-request override via ?count=)
+PREVIEW_COUNT_STRATEGY = os.getenv("PREVIEW_COUNT_STRATEGY", "auto")
+# How long a total row count is reused for later pages, 0 disables the count cache
+PREVIEW_COUNT_CACHE_TTL_SECONDS = float(os.getenv("PREVIEW_COUNT_CACHE_TTL_SECONDS", "300"))
+PREVIEW_COUNT_CACHE_MAX_ENTRIES = int(os.getenv("PREVIEW_COUNT_CACHE_MAX_ENTRIES", "5000"))
+
+# Time budget per preview query in seconds, per response type with QUERY_TIMEOUT_BUDGETS ("table=30,sentence=10"), 0 disables it
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
+QUERY_TIMEOUT_BUDGETS = {
+    name.strip(): float(seconds)
+    for name, _, seconds in (
+        item.partition("=") for item in os.getenv("QUERY_TIMEOUT_BUDGETS", "").split(",") if "=" in item
+    )
+}
+
+COUNT_STRATEGIES = ("auto", "window", "cached", "skip")
+DATA_FORMATS = ("rows", "columnar")
+TOTAL_COUNT_COLUMN = "__total_count"
+PAGED_RESPONSE_TYPES = ("table", "bar_chart", "line_chart", "pie_chart")
+
+# Window function support per pool, looked up once from the server version
+_window_support: Dict[str, bool] = {}
+
+
+def fill_template(template: str, data: dict) -> str:
+    """Fill template with data values using regex to handle single or double braces"""
+    if not template:
+        return ""
+
+    def replace(match):
+        key = match.group(1)
+        value = data.get(key)
+        if value is None:
+            return ''
+        # Format numbers with thousand separator
+        if isinstance(value, (int, float)):
+            return f"{value:,}"
+        return str(value)
+
+    # Support {key} or {{key}}
+    pattern = r"{+([\w]+)}+"
+    try:
+        return re.sub(pattern, replace, template)
+    except Exception as e:
+        print(f"Error in fill_template: {str(e)}")
+        return template  # Return original template if error occurs
+
+
+def query_timeout(response_type: Optional[str]) -> float:
+    """Seconds a single preview query of this response type may run"""
+    return QUERY_TIMEOUT_BUDGETS.get(response_type or "", QUERY_TIMEOUT_SECONDS)
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor_value(value: Any) -> Any:
+    """JSON-safe form of a sort key value that decodes back to the same type"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return {"$": "dec", "v": str(value)}
+    if isinstance(value, datetime.datetime):
+        return {"$": "dt", "v": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$": "d", "v": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"$": "td", "v": value.total_seconds()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$": "b", "v": base64.b64encode(bytes(value)).decode("ascii")}
+    raise ValueError(f"Unsupported cursor value type: {type(value).__name__}")
+
+
+def decode_cursor_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    kind, raw = value.get("$"), value.get("v")
+    if kind == "dec":
+        return Decimal(raw)
+    if kind == "dt":
+        return datetime.datetime.fromisoformat(raw)
+    if kind == "d":
+        return datetime.date.fromisoformat(raw)
+    if kind == "td":
+        return datetime.timedelta(seconds=float(raw))
+    if kind == "b":
+        return base64.b64decode(raw)
+    raise ValueError(f"Unknown cursor value type: {kind}")
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    payload = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+    if not isinstance(state, dict) or not isinstance(state.get("o", 0), int) or state.get("o", 0) < 0:
+        raise InvalidCursorError("Invalid cursor")
+    if "k" in state and not isinstance(state["k"], list):
+        raise InvalidCursorError("Invalid cursor")
+    return state
+
+
+def primary_key(table: str) -> List[str]:
+    """Primary key columns of an analytics table, from the schema cache"""
+    for name, columns in (schema_cache.get_schema() or {}).items():
+        if name.lower() == table.lower():
+            return [column["Field"] for column in columns if column.get("Key") == "PRI"]
+    return []
+
+
+DTYPE_HINTS = {
+    FieldType.TINY: "int", FieldType.SHORT: "int", FieldType.LONG: "int", FieldType.LONGLONG: "int",
+    FieldType.INT24: "int", FieldType.YEAR: "int", FieldType.BIT: "int",
+    FieldType.FLOAT: "float", FieldType.DOUBLE: "float",
+    FieldType.DECIMAL: "decimal", FieldType.NEWDECIMAL: "decimal",
+    FieldType.DATE: "date", FieldType.NEWDATE: "date", FieldType.TIME: "time",
+    FieldType.DATETIME: "datetime", FieldType.TIMESTAMP: "datetime",
+    FieldType.JSON: "json", FieldType.NULL: "null",
+}
+
+
+class QueryRows:
+    """Query result as column descriptions plus row tuples.
+
+    Rows stay tuples until the response is built: ``as_dicts()`` gives the
+    classic list of row objects, ``as_columnar()`` the column names once with
+    one value list per column.
+    """
+
+    def __init__(self, description: List[tuple], rows: List[tuple]):
+        self.description = list(description)
+        self.rows = rows
+
+    @property
+    def columns(self) -> List[str]:
+        return [column[0] for column in self.description]
+
+    @property
+    def dtypes(self) -> List[str]:
+        return [DTYPE_HINTS.get(column[1], "string") for column in self.description]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def value(self, row: int, column: str) -> Any:
+        return self.rows[row][self.columns.index(column)]
+
+    def drop(self, names: List[str]):
+        """Remove helper columns (total count, hidden sort keys)"""
+        keep = [index for index, column in enumerate(self.columns) if column not in names]
+        if len(keep) == len(self.description):
+            return
+        self.description = [self.description[index] for index in keep]
+        self.rows = [tuple(row[index] for index in keep) for row in self.rows]
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+    def as_columnar(self) -> Dict[str, Any]:
+        values = [list(column) for column in zip(*self.rows)] if self.rows else [[] for _ in self.description]
+        return {"columns": self.columns, "dtypes": self.dtypes, "values": values}
+
+    def formatted(self, format: str = "rows"):
+        return self.as_columnar() if format == "columnar" else self.as_dicts()
+
+
+class CountCache:
+    """LRU of total row counts keyed by SQL text, so later pages skip the count"""
+
+    def __init__(self, ttl: float = PREVIEW_COUNT_CACHE_TTL_SECONDS, max_entries: int = PREVIEW_COUNT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(sql: str) -> str:
+        return hashlib.sha1(sql.encode("utf-8")).hexdigest()
+
+    def get(self, sql: str) -> Optional[int]:
+        if self.ttl <= 0:
+            return None
+        key = self._key(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                self._entries.pop(key, None)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, sql: str, total: int):
+        if self.ttl <= 0:
+            return
+        key = self._key(sql)
+        with self._lock:
+            self._entries[key] = (total, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+count_cache = CountCache()
+metrics.register("preview_count_cache", count_cache.stats)
+
+
+class PreviewService:
+    """Runs stored queries for /preview/data with at most one data query per page.
+
+    The total row count comes from one of:
+      - window: ``COUNT(*) OVER()`` added to the page query itself (single
+        query blocks on MySQL 8+/MariaDB 10.2+)
+      - cached: a separate ``COUNT(*)`` whose result is reused for later pages
+      - skip: no count, ``total`` is None unless the page shows where the end is
+    ``auto`` uses a cached count when there is one, else window when the query
+    shape allows it, else cached.
+    """
+
+    def __init__(self, db_conn: DatabaseConnection, response_type: Optional[str] = None):
+        self.db_conn = db_conn
+        self.response_type = response_type
+        self.timeout = query_timeout(response_type)
+        # Guard decision for the statement being previewed (plan summary, rewritten SQL, queue slot)
+        self.admission: Optional[Admission] = None
+
+    def _admit(self, sql: str) -> str:
+        """Run the stored statement through the query guard, returns the SQL to page over"""
+        self.admission = query_guard.admit(self.db_conn, sql)
+        return self.admission.sql
+
+    def _execute(self, sql: str, timing: str) -> QueryRows:
+        """Run a page/count query, answered from the result cache while its tables are unchanged"""
+        cached, versions = result_cache.get(sql, self.db_conn)
+        if cached is not None:
+            return QueryRows(*cached)
+
+        start = time.perf_counter()
+        try:
+            with self.admission.slot() if self.admission else contextlib.nullcontext():
+                description, rows = self.db_conn.execute_query_rows(sql, raise_errors=True, timeout=self.timeout)
+        except QueryTimeoutError as e:
+            metrics.incr(f"preview.timeout.{self.response_type or 'unknown'}")
+            metrics.incr("preview.timeout.killed" if e.killed else "preview.timeout.server")
+            raise
+        finally:
+            metrics.observe(timing, time.perf_counter() - start)
+        result_cache.put(sql, self.db_conn, description, rows, versions)
+        return QueryRows(description, rows)
+
+    def window_functions_supported(self) -> bool:
+        self.db_conn.connect()
+        key = self.db_conn.pool.name
+        if key not in _window_support:
+            try:
+                version = self.db_conn.connection.get_server_version() or (0,)
+                if "mariadb" in (self.db_conn.connection.get_server_info() or "").lower():
+                    _window_support[key] = tuple(version) >= (10, 2)
+                else:
+                    _window_support[key] = tuple(version) >= (8, 0)
+            except Exception as e:
+                print(f"Could not read MySQL server version: {e}")
+                _window_support[key] = False
+        return _window_support[key]
+
+    def first_row(self, sql: str) -> Optional[Dict[str, Any]]:
+        """First row of the query, fetched with LIMIT 1"""
+        page_sql = SelectShape(self._admit(sql)).paginate(1, 0)
+        if page_sql is None:
+            return None
+        rows = self._execute(page_sql, "preview.page_query")
+        return rows.as_dicts()[0] if rows else None
+
+    def _count_strategy(self, shape: SelectShape, count: str, windowable: bool = True):
+        """Resolve ``count`` to window/cached/skip, returns (strategy, cached total)"""
+        strategy = count if count in COUNT_STRATEGIES else "auto"
+        cached_total = count_cache.get(shape.sql) if strategy in ("auto", "cached") else None
+        if strategy == "auto":
+            strategy = "cached" if cached_total is not None else "window"
+        if strategy == "window" and not (windowable and shape.simple and self.window_functions_supported()):
+            strategy = "cached"
+        metrics.incr(f"preview.count.{strategy}")
+        return strategy, cached_total
+
+    def _total(self, shape: SelectShape, strategy: str, rows: QueryRows, offset: int, cached_total: Optional[int], at_end: bool) -> Optional[int]:
+        """Total row count for a fetched page, running a COUNT only when needed"""
+        if strategy == "window" and rows:
+            total = shape.clamp_total(rows.value(0, TOTAL_COUNT_COLUMN))
+            rows.drop([TOTAL_COUNT_COLUMN])
+        elif at_end:
+            # The page shows where the result ends, no count needed
+            total = offset + len(rows)
+        elif cached_total is not None:
+            return cached_total
+        elif strategy == "skip":
+            return None
+        else:
+            count_rows = self._execute(shape.count_sql(), "preview.count_query")
+            total = count_rows.rows[0][0] if count_rows else offset + len(rows)
+        count_cache.put(shape.sql, total)
+        return total
+
+    def page(self, sql: str, page: int, limit: int, count: str = PREVIEW_COUNT_STRATEGY) -> Dict[str, Any]:
+        """One page of rows plus the total row count.
+
+        Returns ``{"rows", "total", "count_strategy"}`` with rows as QueryRows.
+        """
+        shape = SelectShape(self._admit(sql))
+        offset = (page - 1) * limit
+        strategy, cached_total = self._count_strategy(shape, count)
+
+        extra_column = f"COUNT(*) OVER() AS {TOTAL_COUNT_COLUMN}" if strategy == "window" else None
+        page_sql = shape.paginate(limit, offset, extra_column=extra_column)
+        rows = self._execute(page_sql, "preview.page_query") if page_sql else QueryRows([], [])
+
+        at_end = len(rows) < limit and (bool(rows) or offset == 0)
+        total = self._total(shape, strategy, rows, offset, cached_total, at_end)
+        return {"rows": rows, "total": total, "count_strategy": strategy}
+
+    def cursor_page(self, sql: str, cursor: Optional[str], limit: int, count: str = PREVIEW_COUNT_STRATEGY) -> Dict[str, Any]:
+        """Page that continues after ``cursor`` (None for the first page).
+
+        Uses keyset pagination when the ordering can be made unique, so deep
+        pages cost the same as the first; otherwise (or when a sort key of
+        the last row is NULL) the cursor carries an offset instead.
+        Returns ``{"rows", "total", "next_cursor", "paging", "count_strategy"}``
+        with rows as QueryRows.
+        """
+        shape = SelectShape(self._admit(sql))
+        fingerprint = hashlib.sha1(shape.sql.encode("utf-8")).hexdigest()[:16]
+        state = decode_cursor(cursor) if cursor else {"q": fingerprint, "o": 0}
+        if state.get("q") != fingerprint:
+            raise InvalidCursorError("Cursor belongs to a different query")
+        emitted = state.get("o", 0)
+
+        plan = KeysetPlan.build(shape, primary_key) if state.get("p", 1) else None
+        if cursor:
+            # Later pages take the total from the cache (or the client already has it)
+            strategy, cached_total = self._count_strategy(shape, "cached" if count == "cached" else "skip")
+            if strategy == "skip":
+                cached_total = count_cache.get(shape.sql)
+        else:
+            strategy, cached_total = self._count_strategy(shape, count)
+        extra_column = f"COUNT(*) OVER() AS {TOTAL_COUNT_COLUMN}" if strategy == "window" else None
+
+        remaining = limit if shape.limit is None else min(limit, shape.limit - emitted)
+        rows = QueryRows([], [])
+        if remaining > 0:
+            page_sql = None
+            if plan is not None:
+                after = state.get("k")
+                try:
+                    page_sql = plan.page_sql(
+                        remaining + 1,
+                        after=[decode_cursor_value(value) for value in after] if after is not None else None,
+                        offset=0 if after is not None else shape.offset + emitted,
+                        extra_column=extra_column,
+                    )
+                    rows = self._execute(page_sql, "preview.page_query")
+                except (ValueError, TypeError) as e:
+                    raise InvalidCursorError(f"Invalid cursor: {e}")
+                except Error as e:
+                    # e.g. duplicate column names behind SELECT *, page by offset instead
+                    print(f"Keyset pagination failed, using offset: {e}")
+                    metrics.incr("preview.keyset_fallback")
+                    plan = None
+            if plan is None:
+                page_sql = shape.paginate(remaining + 1, emitted, extra_column=extra_column)
+                rows = self._execute(page_sql, "preview.page_query") if page_sql else QueryRows([], [])
+        metrics.incr(f"preview.paging.{'keyset' if plan else 'offset'}")
+
+        # One extra row tells whether there is a next page (unless the original LIMIT ends here)
+        has_more = len(rows) > remaining and (shape.limit is None or emitted + remaining < shape.limit)
+        rows.rows = rows.rows[:remaining]
+        next_cursor = None
+        if has_more:
+            next_state = {"q": fingerprint, "o": emitted + len(rows)}
+            if plan is None:
+                next_state["p"] = 0
+            else:
+                try:
+                    values = [rows.value(-1, name) for name, _ in plan.keys]
+                    if any(value is None for value in values):
+                        raise ValueError("NULL sort key")
+                    next_state["k"] = [encode_cursor_value(value) for value in values]
+                except ValueError:
+                    # Carry on from the same position in the keyset order, by offset
+                    pass
+            next_cursor = encode_cursor(next_state)
+
+        if plan is not None:
+            rows.drop(plan.hidden)
+
+        total = self._total(shape, strategy, rows, emitted, cached_total, not has_more)
+        return {
+            "rows": rows,
+            "total": total,
+            "next_cursor": next_cursor,
+            "paging": "keyset" if plan else "offset",
+            "count_strategy": strategy,
+        }
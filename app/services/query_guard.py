@@ -0,0 +1,233 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.metrics import metrics
+from app.utils.sql_utils import SelectShape, normalize_sql, strip_statement
+
+# What happens to a query whose EXPLAIN estimate is over a threshold:
+# off (no EXPLAIN), allow (only record the plan), reject (422), limit (cap the result rows) or queue
+QUERY_GUARD_ACTION = os.getenv("QUERY_GUARD_ACTION", "off")
+# Thresholds on the estimated rows examined / the optimizer's query_cost, 0 disables one
+QUERY_GUARD_MAX_ROWS = int(os.getenv("QUERY_GUARD_MAX_ROWS", "5000000"))
+QUERY_GUARD_MAX_COST = float(os.getenv("QUERY_GUARD_MAX_COST", "1000000"))
+# Row cap applied by the "limit" action
+QUERY_GUARD_LIMIT_ROWS = int(os.getenv("QUERY_GUARD_LIMIT_ROWS", "10000"))
+# "queue": heavy queries running at once per process, and how long one waits for a slot before 503
+QUERY_GUARD_QUEUE_CONCURRENCY = int(os.getenv("QUERY_GUARD_QUEUE_CONCURRENCY", "2"))
+QUERY_GUARD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUERY_GUARD_QUEUE_TIMEOUT_SECONDS", "10"))
+QUERY_GUARD_PLAN_CACHE_TTL_SECONDS = float(os.getenv("QUERY_GUARD_PLAN_CACHE_TTL_SECONDS", "3600"))
+QUERY_GUARD_PLAN_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_GUARD_PLAN_CACHE_MAX_ENTRIES", "2000"))
+
+GUARD_ACTIONS = ("off", "allow", "reject", "limit", "queue")
+
+
+class QueryRejectedError(Exception):
+    """The query's estimated cost is over the admission thresholds"""
+
+    def __init__(self, summary: Dict[str, Any]):
+        self.summary = summary
+        super().__init__(
+            f"Query is too expensive to run (estimated rows: {summary.get('rows')}, cost: {summary.get('cost')})"
+        )
+
+
+class QueryQueueTimeoutError(Exception):
+    """No slot for an expensive query became free in time"""
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Estimated rows, cost and full scans from EXPLAIN FORMAT=JSON (MySQL or MariaDB).
+
+    ``rows`` is the largest product of per-table row estimates over a
+    nested loop, i.e. roughly the rows the worst join examines; ``cost`` is
+    MySQL's ``query_cost`` (MariaDB doesn't report one).
+    """
+    block = plan.get("query_block", {})
+    summary = {
+        "cost": _number(block.get("cost_info", {}).get("query_cost")),
+        "rows": 0,
+        "full_scans": [],
+        "tables": 0,
+    }
+
+    def table_rows(table: Dict[str, Any]) -> float:
+        summary["tables"] += 1
+        if table.get("access_type") == "ALL" and table.get("table_name"):
+            summary["full_scans"].append(table["table_name"])
+        rows = _number(table.get("rows_examined_per_scan"))
+        if rows is None:
+            rows = _number(table.get("rows"))
+        return rows or 1
+
+    def walk(node: Any):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        loop: List[Dict[str, Any]] = []
+        if isinstance(node.get("table"), dict):
+            loop.append(node["table"])
+        for step in node.get("nested_loop", []):
+            if isinstance(step, dict) and isinstance(step.get("table"), dict):
+                loop.append(step["table"])
+        if loop:
+            product = 1.0
+            for table in loop:
+                product *= table_rows(table)
+            summary["rows"] = max(summary["rows"], product)
+        for key, value in node.items():
+            if key == "nested_loop" and isinstance(value, list):
+                # Derived tables and subqueries hang off the table entries
+                for step in value:
+                    walk(step.get("table") if isinstance(step, dict) else None)
+            else:
+                walk(value)
+
+    walk(block)
+    summary["rows"] = int(summary["rows"])
+    return summary
+
+
+class Admission:
+    """Outcome of the guard for one statement: the SQL to run, the plan summary and the action taken"""
+
+    def __init__(self, sql: str, summary: Optional[Dict[str, Any]] = None, action: str = "allow", semaphore=None, timeout: float = 0):
+        self.sql = sql
+        self.summary = summary
+        self.action = action
+        self._semaphore = semaphore
+        self._timeout = timeout
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the heavy-query slots while the statement runs ("queue" action only)"""
+        if self._semaphore is None:
+            yield
+            return
+        start = time.perf_counter()
+        if not self._semaphore.acquire(timeout=self._timeout):
+            metrics.incr("query_guard.queue_timeout")
+            raise QueryQueueTimeoutError(
+                f"Expensive query waited {self._timeout:.0f}s for a free slot, try again later"
+            )
+        metrics.observe("query_guard.queue_wait", time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class QueryGuard:
+    """Admission control for generated SQL based on EXPLAIN FORMAT=JSON estimates.
+
+    Plans are cached by normalized SQL (per MySQL pool) so repeated
+    executions of the same statement don't run EXPLAIN again. When EXPLAIN
+    itself fails the query is let through and fails (or not) on its own.
+    """
+
+    def __init__(
+        self,
+        action: str = QUERY_GUARD_ACTION,
+        max_rows: int = QUERY_GUARD_MAX_ROWS,
+        max_cost: float = QUERY_GUARD_MAX_COST,
+        limit_rows: int = QUERY_GUARD_LIMIT_ROWS,
+        queue_concurrency: int = QUERY_GUARD_QUEUE_CONCURRENCY,
+        queue_timeout: float = QUERY_GUARD_QUEUE_TIMEOUT_SECONDS,
+        plan_ttl: float = QUERY_GUARD_PLAN_CACHE_TTL_SECONDS,
+        plan_max_entries: int = QUERY_GUARD_PLAN_CACHE_MAX_ENTRIES,
+    ):
+        self.action = action if action in GUARD_ACTIONS else "off"
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.limit_rows = limit_rows
+        self.queue_timeout = queue_timeout
+        self.plan_ttl = plan_ttl
+        self.plan_max_entries = plan_max_entries
+        self._semaphore = threading.BoundedSemaphore(max(queue_concurrency, 1))
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"plan_hits": 0, "plan_misses": 0, "explain_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.action != "off"
+
+    def plan_summary(self, db_conn, sql: str) -> Optional[Dict[str, Any]]:
+        """Summary of the statement's EXPLAIN, from the plan cache when possible"""
+        key = hashlib.sha1(f"{db_conn.pool.name}\n{normalize_sql(sql)}".encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._plans.get(key)
+            if cached is not None and cached[1] > time.time():
+                self._plans.move_to_end(key)
+                self._stats["plan_hits"] += 1
+                return cached[0]
+            self._stats["plan_misses"] += 1
+
+        start = time.perf_counter()
+        try:
+            _, rows = db_conn.execute_query_rows(f"EXPLAIN FORMAT=JSON {strip_statement(sql)}", raise_errors=True)
+            summary = summarize_plan(json.loads(rows[0][0]))
+        except Exception as e:
+            print(f"EXPLAIN failed, letting the query through: {e}")
+            with self._lock:
+                self._stats["explain_errors"] += 1
+            return None
+        finally:
+            metrics.observe("query_guard.explain", time.perf_counter() - start)
+
+        with self._lock:
+            self._plans[key] = (summary, time.time() + self.plan_ttl)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.plan_max_entries:
+                self._plans.popitem(last=False)
+        return summary
+
+    def is_heavy(self, summary: Dict[str, Any]) -> bool:
+        if self.max_rows and summary["rows"] > self.max_rows:
+            return True
+        return bool(self.max_cost and summary["cost"] is not None and summary["cost"] > self.max_cost)
+
+    def admit(self, db_conn, sql: str) -> Admission:
+        """Decide how ``sql`` may run; raises QueryRejectedError for the "reject" action"""
+        if not self.enabled:
+            return Admission(sql)
+        summary = self.plan_summary(db_conn, sql)
+        if summary is None or not self.is_heavy(summary):
+            metrics.incr("query_guard.allowed")
+            return Admission(sql, summary)
+
+        metrics.incr(f"query_guard.heavy.{self.action}")
+        if self.action == "reject":
+            raise QueryRejectedError(summary)
+        if self.action == "limit":
+            return Admission(SelectShape(sql).capped(self.limit_rows), summary, "limit")
+        if self.action == "queue":
+            return Admission(sql, summary, "queue", self._semaphore, self.queue_timeout)
+        return Admission(sql, summary)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "action": self.action, "plans": len(self._plans)}
+
+
+query_guard = QueryGuard()
+metrics.register("query_guard", query_guard.stats)
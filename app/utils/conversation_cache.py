@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Iterable, List, Tuple
+
+from app.core.metrics import metrics
+
+# Messages per user kept for the system prompt's RECENT CONVERSATION HISTORY
+CONVERSATION_WINDOW = int(os.getenv("CONVERSATION_WINDOW", "8"))
+# Users kept in memory (least recently used are dropped), 0 disables the cache
+CONVERSATION_CACHE_MAX_USERS = int(os.getenv("CONVERSATION_CACHE_MAX_USERS", "10000"))
+# Re-read the window from Postgres after this long, bounds staleness when several workers serve one user
+CONVERSATION_CACHE_TTL_SECONDS = float(os.getenv("CONVERSATION_CACHE_TTL_SECONDS", "600"))
+# Only this much of each message goes into the prompt
+CONVERSATION_CONTENT_CHARS = 150
+
+Message = Tuple[str, str]
+
+
+class ConversationCache:
+    """Last ``window`` (type, content) messages per user, oldest first.
+
+    The service appends what it saves, so steady-state turns never read
+    history back; a miss hydrates the window from the database. A
+    hydration only lands if no append or invalidation for that user
+    happened while it was reading, otherwise the next turn reads again.
+    """
+
+    def __init__(
+        self,
+        window: int = CONVERSATION_WINDOW,
+        max_users: int = CONVERSATION_CACHE_MAX_USERS,
+        ttl: float = CONVERSATION_CACHE_TTL_SECONDS,
+    ):
+        self.window = window
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # user_id -> (loaded_at, deque of messages)
+        self._windows: "OrderedDict[int, Tuple[float, deque]]" = OrderedDict()
+        # user_id -> token of the hydration in flight, dropped by writes that race it
+        self._hydrating = {}
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_users > 0 and self.window > 0
+
+    def get(self, user_id: int, load: Callable[[], Iterable[Message]]) -> List[Message]:
+        """Window for ``user_id``, ``load`` returns the last messages oldest first on a miss"""
+        if not self.enabled:
+            return list(load())[-self.window:] if self.window > 0 else []
+        with self._lock:
+            entry = self._windows.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._windows.move_to_end(user_id)
+                self._hits += 1
+                return list(entry[1])
+            self._misses += 1
+            token = object()
+            self._hydrating[user_id] = token
+
+        messages = deque((self._trim(m) for m in load()), maxlen=self.window)
+        with self._lock:
+            if self._hydrating.get(user_id) is token:
+                del self._hydrating[user_id]
+                self._store(user_id, messages)
+        metrics.incr("conversation_cache.hydrations")
+        return list(messages)
+
+    def append(self, user_id: int, chat_type: str, content: str):
+        """Record a message that was just saved; unknown users are left for the next hydration"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._hydrating.pop(user_id, None)
+            entry = self._windows.get(user_id)
+            if entry is not None:
+                entry[1].append(self._trim((chat_type, content)))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._hydrating.pop(user_id, None)
+            self._windows.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._hydrating.clear()
+            self._windows.clear()
+
+    def _trim(self, message: Message) -> Message:
+        chat_type, content = message
+        return chat_type, content[:CONVERSATION_CONTENT_CHARS]
+
+    def _store(self, user_id: int, messages: deque):
+        """Caller holds the lock"""
+        self._windows[user_id] = (time.monotonic(), messages)
+        self._windows.move_to_end(user_id)
+        while len(self._windows) > self.max_users:
+            self._windows.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._windows), "hits": self._hits, "misses": self._misses}
+
+
+conversation_cache = ConversationCache()
+metrics.register("conversation_cache", conversation_cache.stats)
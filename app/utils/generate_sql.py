@@ -1,23 +1,28 @@
-from app.utils.openai import get_openai_client
+from app.core.schema_cache import schema_cache
+from app.utils.openai import get_async_openai_client, get_openai_client
+from app.utils.sql_cache import SQL_CACHE_ENABLED, sql_cache
 import datetime
-from db_connection import DatabaseConnection
 import json
 
-def generate_sql_from_natural_language(question: str, user_id: int):
+SQL_SYSTEM_MESSAGE = "Kamu adalah asisten SQL yang selalu memberikan response dalam format JSON yang valid. Pastikan response-mu bisa di-parse oleh json.loads()."
+
+def build_sql_prompt(question: str, user_id: int) -> str:
     today = datetime.date.today()
-    
-    # Get database schema
-    db = DatabaseConnection()
-    schema_info = db.get_schema()
-    
+
+    # Get database schema (cached, refreshed in the background)
+    schema_info = schema_cache.get_schema()
+
     # Convert schema info to readable format for prompt
     schema_text = "Database Schema:\n"
     for table_name, columns in schema_info.items():
         schema_text += f"\nTable: {table_name}\n"
         for column in columns:
-            schema_text += f"  - {column['Field']} ({column['Type']})\n"
-    
-    prompt = f"""
+            schema_text += f"  - {column['Field']} ({column['Type']})"
+            if column.get("References"):
+                schema_text += f" -> {column['References']}"
+            schema_text += "\n"
+
+    return f"""
 Kamu adalah asisten AI yang mengubah pertanyaan pengguna menjadi query SQL.
 
 Berikut adalah skema database yang tersedia:
@@ -42,43 +47,80 @@ Berikan response untuk pertanyaan berikut dalam format JSON yang valid:
 "{question}"
 """
 
+def build_sql_request(question: str, user_id: int) -> dict:
+    """Keyword arguments for chat.completions.create"""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {
+                "role": "system",
+                "content": SQL_SYSTEM_MESSAGE
+            },
+            {"role": "user", "content": build_sql_prompt(question, user_id)}
+        ],
+        "temperature": 0.2
+    }
+
+def parse_sql_response(response_content: str) -> dict:
+    # Coba parse hasil sebagai JSON
+    try:
+        json_result = json.loads(response_content)
+
+        # Validasi struktur JSON
+        required_fields = ["generated_sql", "response_type", "answer_template"]
+        for field in required_fields:
+            if field not in json_result:
+                raise Exception(f"Missing required field: {field}")
+
+        # Validasi response_type
+        valid_response_types = ["sentence", "table", "bar_chart", "line_chart", "pie_chart"]
+        if json_result["response_type"] not in valid_response_types:
+            raise Exception(f"Invalid response_type. Must be one of: {', '.join(valid_response_types)}")
+
+        return json_result
+
+    except json.JSONDecodeError as e:
+        raise Exception(f"Invalid JSON format from GPT response: {response_content}")
+    except Exception as e:
+        raise Exception(f"Validation error: {str(e)}")
+
+def generate_sql_from_natural_language(question: str, user_id: int):
+    if SQL_CACHE_ENABLED:
+        cached = sql_cache.get(question, user_id)
+        if cached is not None:
+            return cached
+
     try:
         openai_client = get_openai_client()
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "Kamu adalah asisten SQL yang selalu memberikan response dalam format JSON yang valid. Pastikan response-mu bisa di-parse oleh json.loads()."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2
-        )
+        response = openai_client.chat.completions.create(**build_sql_request(question, user_id))
 
         response_content = response.choices[0].message.content.strip()
-        
-        # Coba parse hasil sebagai JSON
-        try:
-            json_result = json.loads(response_content)
-            
-            # Validasi struktur JSON
-            required_fields = ["generated_sql", "response_type", "answer_template"]
-            for field in required_fields:
-                if field not in json_result:
-                    raise Exception(f"Missing required field: {field}")
-            
-            # Validasi response_type
-            valid_response_types = ["sentence", "table", "bar_chart", "line_chart", "pie_chart"]
-            if json_result["response_type"] not in valid_response_types:
-                raise Exception(f"Invalid response_type. Must be one of: {', '.join(valid_response_types)}")
-            
-            return json_result
-            
-        except json.JSONDecodeError as e:
-            raise Exception(f"Invalid JSON format from GPT response: {response_content}")
-        except Exception as e:
-            raise Exception(f"Validation error: {str(e)}")
-            
+        json_result = parse_sql_response(response_content)
+
     except Exception as e:
         raise Exception(f"Error in GPT request: {str(e)}")
+
+    if SQL_CACHE_ENABLED:
+        sql_cache.put(question, user_id, json_result)
+    return json_result
+
+async def agenerate_sql_from_natural_language(question: str, user_id: int):
+    """Async variant; cancelling the caller aborts the in-flight OpenAI request"""
+    if SQL_CACHE_ENABLED:
+        cached = sql_cache.get(question, user_id)
+        if cached is not None:
+            return cached
+
+    try:
+        openai_client = get_async_openai_client()
+        response = await openai_client.chat.completions.create(**build_sql_request(question, user_id))
+
+        response_content = response.choices[0].message.content.strip()
+        json_result = parse_sql_response(response_content)
+
+    except Exception as e:
+        raise Exception(f"Error in GPT request: {str(e)}")
+
+    if SQL_CACHE_ENABLED:
+        sql_cache.put(question, user_id, json_result)
+    return json_result
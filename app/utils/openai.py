@@ -1,18 +1,169 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
+import asyncio
+import httpx
 import os
+import threading
+import time
+
+from app.core.config import ENV_PATH
+
+# Connection pool and timeouts shared by every OpenAI call in the process
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# How often the .env modification time is checked for a rotated key
+OPENAI_ENV_CHECK_SECONDS = float(os.getenv("OPENAI_ENV_CHECK_SECONDS", "2"))
+
+
+class OpenAIClientManager:
+    """Shared sync and async OpenAI clients with keep-alive connection pools.
+
+    Instead of re-parsing .env on every call, the file's mtime is checked at
+    most every OPENAI_ENV_CHECK_SECONDS; the clients are rebuilt only when
+    OPENAI_API_KEY actually changes, and the replaced clients are closed.
+    Async clients are kept per event loop because httpx connections can't be
+    shared across loops; a loop's client is closed once the loop is gone.
+    """
+
+    def __init__(self, env_path: str = None):
+        self.env_path = env_path if env_path is not None else ENV_PATH
+        self._lock = threading.Lock()
+        self._env_mtime = None
+        self._checked_at = 0.0
+        self._api_key = None
+        self._client = None
+        self._async_clients = {}
+        self._closing = set()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        )
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+    def _reload_env_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < OPENAI_ENV_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if not self.env_path:
+            return
+        try:
+            mtime = os.stat(self.env_path).st_mtime
+        except OSError:
+            return
+        if mtime != self._env_mtime:
+            self._env_mtime = mtime
+            load_dotenv(self.env_path, override=True)
+
+    def _current_key(self, stale: list) -> str:
+        """Return the API key, moving the cached clients to stale if it was rotated"""
+        self._reload_env_if_changed()
+        api_key = os.getenv("OPENAI_API_KEY")
+
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+        if api_key != self._api_key:
+            self._api_key = api_key
+            if self._client is not None:
+                stale.append((None, self._client))
+            stale.extend(self._async_clients.values())
+            self._client = None
+            self._async_clients = {}
+        return api_key
+
+    def _close(self, stale: list):
+        """Close replaced clients so their keep-alive connections don't leak"""
+        for loop, client in stale:
+            if isinstance(client, OpenAI):
+                try:
+                    client.close()
+                except Exception as e:
+                    print(f"Error closing OpenAI client: {e}")
+            elif loop is not None and loop.is_running():
+                # Connections belong to their loop, close them there
+                asyncio.run_coroutine_threadsafe(_close_async_client(client), loop)
+            else:
+                try:
+                    running = asyncio.get_running_loop()
+                except RuntimeError:
+                    asyncio.run(_close_async_client(client))
+                    continue
+                task = running.create_task(_close_async_client(client))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    def get_client(self) -> OpenAI:
+        stale = []
+        with self._lock:
+            api_key = self._current_key(stale)
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=api_key,
+                    timeout=self._timeout(),
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=httpx.Client(limits=self._limits(), timeout=self._timeout()),
+                )
+            client = self._client
+        self._close(stale)
+        return client
+
+    def get_async_client(self) -> AsyncOpenAI:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        stale = []
+        with self._lock:
+            api_key = self._current_key(stale)
+            # Drop clients of loops that are gone (e.g. asyncio.run in scripts)
+            for key, (owner, client) in list(self._async_clients.items()):
+                if owner is not None and owner.is_closed():
+                    stale.append(self._async_clients.pop(key))
+            # Outside a loop (sync callers, startup) one client is shared under None
+            entry = self._async_clients.get(id(loop) if loop is not None else None)
+            if entry is None:
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    timeout=self._timeout(),
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=httpx.AsyncClient(limits=self._limits(), timeout=self._timeout()),
+                )
+                entry = (loop, client)
+                self._async_clients[id(loop) if loop is not None else None] = entry
+        self._close(stale)
+        return entry[1]
+
+
+async def _close_async_client(client: AsyncOpenAI):
+    try:
+        await client.close()
+    except RuntimeError:
+        # "Event loop is closed": the owning loop is gone, the sockets are released anyway
+        pass
+    except Exception as e:
+        print(f"Error closing OpenAI client: {e}")
+
+
+client_manager = OpenAIClientManager()
 
 def get_openai_client():
-    """Get OpenAI client with fresh environment variables"""
-    # Reload environment variables to catch any updates
-    load_dotenv(override=True)
-    api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-    
-    return OpenAI(api_key=api_key)
+    """Get the shared OpenAI client (picks up a rotated key from .env)"""
+    return client_manager.get_client()
+
+def get_async_openai_client():
+    """Get the shared AsyncOpenAI client for the running event loop"""
+    return client_manager.get_async_client()
 
 # Initialize once for backward compatibility, but use get_openai_client() for fresh keys
-load_dotenv()
 openai_client = get_openai_client()
@@ -1,14 +1,6 @@
 import json
-import os
 
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
-
-def get_openai_client():
-    """Get OpenAI client with fresh environment variables"""
-    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from app.utils.openai import get_openai_client
 
 class PromptManager:
     def __init__(self, model="gpt-4o-mini", messages=[]):
@@ -0,0 +1,209 @@
+import datetime
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import metrics
+from app.utils.sql_utils import is_nondeterministic, normalize_sql, referenced_tables
+
+# Upper bound on how long a result is served, even when its tables look unchanged; 0 disables the cache
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+# Memory budget for cached rows (estimated), and the largest single result worth keeping
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESULT_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+# How often table UPDATE_TIMEs are re-read from information_schema (the staleness bound after a write)
+RESULT_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("RESULT_CACHE_VERSION_CHECK_SECONDS", "5"))
+
+# UPDATE_TIME has one second resolution: a table written this recently may change again unnoticed
+_WRITE_GRACE = datetime.timedelta(seconds=1)
+
+
+def estimate_size(description: List[tuple], rows: List[tuple], limit: int = 0) -> int:
+    """Approximate memory held by a result; stops counting once past ``limit``"""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(column[0]) for column in description)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        if limit and size > limit:
+            break
+    return size
+
+
+class ResultCache:
+    """Byte-bounded LRU of query results keyed by normalized SQL text.
+
+    The key is the SQL actually executed, so LIMIT/OFFSET, keyset predicates
+    and the window count column (i.e. the page parameters) are part of it.
+    Each entry remembers the CREATE_TIME/UPDATE_TIME of the tables it reads;
+    a hit is only served while those still match the versions last read from
+    information_schema.TABLES (re-read at most every ``version_check_interval``
+    seconds per database, on the caller's connection). Results reading views,
+    tables of other schemas or tables written within the last second are not
+    cached, nor are queries calling RAND(), NOW(), CURDATE() and the like:
+    their answer changes without any table changing.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_CACHE_TTL_SECONDS,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        max_entry_bytes: int = RESULT_CACHE_MAX_ENTRY_BYTES,
+        version_check_interval: float = RESULT_CACHE_VERSION_CHECK_SECONDS,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._versions: Dict[str, Dict[str, Any]] = {}
+        self._refreshing = set()
+        self._stats = {
+            "hits": 0, "misses": 0, "invalidations": 0, "expirations": 0, "evictions": 0,
+            "too_large": 0, "uncacheable": 0, "version_checks": 0, "version_errors": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def key(pool_name: str, sql: str) -> str:
+        return hashlib.sha1(f"{pool_name}\n{normalize_sql(sql)}".encode("utf-8")).hexdigest()
+
+    def table_versions(self, db_conn) -> Optional[Dict[str, Any]]:
+        """Latest table versions for the connection's database, refreshed when older than the interval"""
+        name = db_conn.pool.name
+        with self._lock:
+            snapshot = self._versions.get(name)
+            if snapshot is not None and time.monotonic() - snapshot["checked_at"] < self.version_check_interval:
+                return snapshot
+            if name in self._refreshing:
+                # Another request is re-reading them, the previous snapshot is still good enough
+                return snapshot
+            self._refreshing.add(name)
+
+        try:
+            versions = db_conn.get_table_versions()
+        except Exception as e:
+            print(f"Error reading table versions: {e}")
+            versions = None
+        with self._lock:
+            self._refreshing.discard(name)
+            self._stats["version_checks"] += 1
+            if versions is None:
+                self._stats["version_errors"] += 1
+                self._versions.pop(name, None)
+                return None
+            snapshot = {**versions, "checked_at": time.monotonic()}
+            self._versions[name] = snapshot
+            return snapshot
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry["size"]
+
+    def get(self, sql: str, db_conn) -> Tuple[Optional[Tuple[List[tuple], List[tuple]]], Optional[Dict[str, Any]]]:
+        """(description, rows) for a live entry or None, plus the versions snapshot to pass to put()"""
+        if not self.enabled:
+            return None, None
+        snapshot = self.table_versions(db_conn)
+        if snapshot is None:
+            return None, None
+
+        key = self.key(db_conn.pool.name, sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, snapshot
+            if entry["expires_at"] <= time.time():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None, snapshot
+            tables = snapshot["tables"]
+            if any(tables.get(name) != version for name, version in entry["tables"].items()):
+                self._remove(key)
+                self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+                return None, snapshot
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return (entry["description"], entry["rows"]), snapshot
+
+    def _table_versions_for(self, sql: str, snapshot: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Versions of the tables the query reads, None when the result can't be validated"""
+        if is_nondeterministic(sql):
+            return None
+        versions = {}
+        schema = (snapshot["schema"] or "").lower()
+        recent = snapshot["server_now"] - _WRITE_GRACE if snapshot["server_now"] else None
+        for table_schema, table in referenced_tables(sql):
+            if table_schema is not None and table_schema.lower() != schema:
+                return None
+            name = table.lower()
+            if name not in snapshot["tables"]:
+                # CTE name or derived table alias, its base tables are listed separately
+                continue
+            version = snapshot["tables"][name]
+            if version is None:
+                return None
+            updated = version[1]
+            if updated is not None and (recent is None or updated >= recent):
+                return None
+            versions[name] = version
+        return versions
+
+    def put(self, sql: str, db_conn, description: List[tuple], rows: List[tuple], snapshot: Optional[Dict[str, Any]]):
+        """Cache a result read after ``snapshot`` was taken (the snapshot returned by get())"""
+        if not self.enabled or snapshot is None:
+            return
+        tables = self._table_versions_for(sql, snapshot)
+        if tables is None:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return
+        size = estimate_size(description, rows, limit=self.max_entry_bytes)
+        if size > self.max_entry_bytes:
+            with self._lock:
+                self._stats["too_large"] += 1
+            return
+
+        key = self.key(db_conn.pool.name, sql)
+        entry = {
+            "description": list(description),
+            "rows": list(rows),
+            "tables": tables,
+            "size": size,
+            "expires_at": time.time() + self.ttl,
+        }
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {**self._stats, "entries": len(self._entries), "bytes": self._bytes}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+result_cache = ResultCache()
+metrics.register("result_cache", result_cache.stats)
@@ -0,0 +1,227 @@
+import datetime
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.metrics import metrics
+from app.core.schema_cache import schema_cache
+
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SQL_CACHE_TTL_SECONDS = float(os.getenv("SQL_CACHE_TTL_SECONDS", "3600"))
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "2000"))
+# Jaccard similarity of character 3-grams needed for an approximate (typo-tolerant) hit,
+# 0 (default) disables approximate matching
+SQL_CACHE_SIMILARITY = float(os.getenv("SQL_CACHE_SIMILARITY", "0"))
+# Two words count as the same word in an approximate hit (typos) at this 3-gram similarity
+TOKEN_SIMILARITY = 0.5
+
+# Politeness and filler words only; anything that can change the meaning
+# ("ini", "dari", "ke", "dengan", "yang", "saya"...) must stay in the question
+STOPWORDS = {
+    "tolong", "coba", "mohon", "dong", "deh", "sih", "nih", "ya", "yah", "kak", "gan",
+    "apakah", "kah", "bisakah", "minta", "please",
+}
+
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+MINHASH_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_HASH_PARAMS = [
+    (zlib.crc32(f"a{i}".encode()) | 1, zlib.crc32(f"b{i}".encode()))
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+
+def normalize_question(question: str) -> str:
+    text = unicodedata.normalize("NFKC", question).lower()
+    words = re.findall(r"[^\W_]+", text)
+    return " ".join(word for word in words if word not in STOPWORDS)
+
+
+def shingles(text: str, size: int = 3) -> frozenset:
+    padded = f" {text} "
+    return frozenset(padded[i:i + size] for i in range(max(len(padded) - size + 1, 1)))
+
+
+def minhash_bands(grams: frozenset) -> Tuple[Tuple[int, ...], ...]:
+    hashes = [zlib.crc32(gram.encode("utf-8")) for gram in grams]
+    signature = [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _HASH_PARAMS
+    ]
+    return tuple(
+        (band, *signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+        for band in range(MINHASH_BANDS)
+    )
+
+
+def depends_on_user(generated_sql: str, user_id: int) -> bool:
+    """True when the generated SQL may depend on who asked.
+
+    Deliberately broad: any ``user_id``/``username`` column, the ``users``
+    table, or the user's id as a literal anywhere (aliases, joins and
+    subqueries included) keeps the entry private to that user.
+    """
+    return re.search(
+        rf"\b(user_id|username|users?)\b|(?<![\w.]){user_id}(?![\w.])", generated_sql or "", flags=re.IGNORECASE
+    ) is not None
+
+
+def tokens_align(left: Tuple[str, ...], right: Tuple[str, ...]) -> bool:
+    """Same words on both sides, up to typos: every word has a close counterpart on the other side"""
+    if len(set(left)) != len(set(right)):
+        return False
+
+    def covered(words, others):
+        return all(
+            word in others or any(
+                len(shingles(word) & shingles(other)) / len(shingles(word) | shingles(other)) >= TOKEN_SIMILARITY
+                for other in others
+            )
+            for word in words
+        )
+
+    return covered(set(left), set(right)) and covered(set(right), set(left))
+
+
+class SemanticSQLCache:
+    """Cache of generate_sql_from_natural_language results keyed on normalized questions.
+
+    Entries are scoped by schema hash and date (prompts embed today's date),
+    and by user when the generated SQL filters on ``user_id``. Lookups try an
+    exact match on the normalized text first, then a MinHash/LSH lookup over
+    character 3-grams verified with the real Jaccard similarity, and only
+    when both questions have the same words up to typos ("tahun ini" is not
+    "tahun lalu", "gudang jakarta" is not "gudang jakarta timur"). Numbers
+    in the question must match exactly ("5 produk" is not "10 produk").
+    """
+
+    def __init__(
+        self,
+        ttl: float = SQL_CACHE_TTL_SECONDS,
+        max_entries: int = SQL_CACHE_MAX_ENTRIES,
+        similarity: float = SQL_CACHE_SIMILARITY,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._bands: Dict[tuple, set] = {}
+        self._stats = {"exact_hits": 0, "approximate_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _scopes(self, user_id: int, schema_hash: str):
+        day = datetime.date.today().isoformat()
+        return [(schema_hash, day, None), (schema_hash, day, user_id)]
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band in entry["bands"]:
+            keys = self._bands.get((key[:3], band))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[(key[:3], band)]
+
+    def _live(self, key: tuple, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= now:
+            self._remove(key)
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, question: str, user_id: int, schema_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        schema_hash = schema_hash or schema_cache.schema_hash
+        if schema_hash is None:
+            return None
+
+        normalized = normalize_question(question)
+        grams = shingles(normalized)
+        tokens = tuple(normalized.split())
+        numbers = re.findall(r"\d+", normalized)
+        bands = minhash_bands(grams) if self.similarity > 0 else ()
+        now = time.time()
+
+        with self._lock:
+            scopes = self._scopes(user_id, schema_hash)
+            for scope in scopes:
+                entry = self._live((*scope, normalized), now)
+                if entry is not None:
+                    self._stats["exact_hits"] += 1
+                    return dict(entry["result"])
+
+            best, best_score = None, 0.0
+            for scope in scopes:
+                candidates = set()
+                for band in bands:
+                    candidates |= self._bands.get((scope, band), set())
+                for key in candidates:
+                    entry = self._entries.get(key)
+                    if entry is None or entry["numbers"] != numbers:
+                        continue
+                    score = len(grams & entry["grams"]) / len(grams | entry["grams"])
+                    if score >= self.similarity and score > best_score and tokens_align(tokens, entry["tokens"]):
+                        best, best_score = key, score
+
+            if best is not None and self._live(best, now) is not None:
+                self._stats["approximate_hits"] += 1
+                return dict(self._entries[best]["result"])
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, question: str, user_id: int, result: Dict[str, Any], schema_hash: Optional[str] = None):
+        schema_hash = schema_hash or schema_cache.schema_hash
+        if schema_hash is None:
+            return
+
+        normalized = normalize_question(question)
+        grams = shingles(normalized)
+        user_scope = user_id if depends_on_user(result.get("generated_sql"), user_id) else None
+        scope = (schema_hash, datetime.date.today().isoformat(), user_scope)
+        key = (*scope, normalized)
+        entry = {
+            "result": dict(result),
+            "grams": grams,
+            "tokens": tuple(normalized.split()),
+            "numbers": re.findall(r"\d+", normalized),
+            "bands": minhash_bands(grams) if self.similarity > 0 else (),
+            "expires_at": time.time() + self.ttl,
+        }
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for band in entry["bands"]:
+                self._bands.setdefault((scope, band), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["approximate_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["approximate_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+sql_cache = SemanticSQLCache()
+metrics.register("sql_cache", sql_cache.stats)
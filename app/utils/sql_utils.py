@@ -0,0 +1,582 @@
+import datetime
+import math
+import re
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+_NUMBER = re.compile(r"[0-9][0-9A-Za-z_.$]*")
+_LIMIT_TAIL = re.compile(r"^\s*(\d+)\s*(?:,\s*(\d+)|OFFSET\s+(\d+))?\s*$", re.IGNORECASE)
+_AGGREGATE = re.compile(r"\b(COUNT|SUM|AVG|MIN|MAX|GROUP_CONCAT|JSON_ARRAYAGG|JSON_OBJECTAGG|STD|STDDEV|VARIANCE)\s*\(", re.IGNORECASE)
+
+# Keywords that start a clause of a query block (after the select list)
+CLAUSE_KEYWORDS = {"FROM", "WHERE", "GROUP", "HAVING", "WINDOW", "ORDER", "LIMIT", "INTO", "FOR", "LOCK"}
+SET_OPERATIONS = {"UNION", "INTERSECT", "EXCEPT"}
+SELECT_MODIFIERS = {
+    "ALL", "HIGH_PRIORITY", "STRAIGHT_JOIN", "SQL_SMALL_RESULT", "SQL_BIG_RESULT",
+    "SQL_BUFFER_RESULT", "SQL_NO_CACHE", "SQL_CACHE", "SQL_CALC_FOUND_ROWS",
+}
+# Words that end an expression rather than alias it ("a IS NULL", "CASE ... END")
+NON_ALIAS_WORDS = {
+    "END", "NULL", "TRUE", "FALSE", "IS", "NOT", "AND", "OR", "XOR", "DIV", "MOD", "LIKE",
+    "IN", "BETWEEN", "THEN", "ELSE", "WHEN", "CASE", "BINARY", "INTERVAL", "DISTINCT", "REGEXP",
+}
+KEYSET_COLUMN_PREFIX = "__keyset_"
+# Functions whose value changes between executions: a keyset on them repeats or skips rows,
+# a cached result of them goes stale
+_NONDETERMINISTIC = re.compile(
+    r"\b(?:(?:RAND|RANDOM|UUID|UUID_SHORT|NOW|SYSDATE|CURDATE|CURTIME|UTC_TIMESTAMP|UTC_DATE|UTC_TIME|"
+    r"UNIX_TIMESTAMP|CONNECTION_ID|LAST_INSERT_ID|ROW_COUNT|FOUND_ROWS)\s*\(|"
+    r"(?:CURRENT_TIMESTAMP|CURRENT_DATE|CURRENT_TIME|LOCALTIMESTAMP|LOCALTIME)\b)",
+    re.IGNORECASE,
+)
+
+
+def is_nondeterministic(sql: str) -> bool:
+    """True when the query calls RAND(), NOW(), CURDATE()... and may answer differently on every run"""
+    return bool(_NONDETERMINISTIC.search(sql))
+
+
+def strip_statement(sql: str) -> str:
+    """Remove surrounding whitespace and trailing semicolons"""
+    return (sql or "").strip().rstrip(";").strip()
+
+
+def _skip_quoted(sql: str, start: int) -> int:
+    quote = sql[start]
+    i = start + 1
+    while i < len(sql):
+        ch = sql[i]
+        if ch == "\\" and quote != "`":
+            i += 2
+            continue
+        if ch == quote:
+            # Doubled quote is an escaped quote
+            if i + 1 < len(sql) and sql[i + 1] == quote:
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return len(sql)
+
+
+def tokenize(sql: str) -> List[Tuple[str, str, int, int, int]]:
+    """Split SQL into (kind, text, start, end, depth) tokens, comments dropped.
+
+    kind is "word", "ident" (backticked), "string", "number" or "punct";
+    depth is the parenthesis nesting level.
+    """
+    tokens = []
+    depth = 0
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch.isspace():
+            i += 1
+            continue
+        if ch in "'\"`":
+            end = _skip_quoted(sql, i)
+            tokens.append(("ident" if ch == "`" else "string", sql[i:end], i, end, depth))
+            i = end
+            continue
+        if ch == "#" or sql.startswith("-- ", i) or sql.startswith("--\n", i):
+            end = sql.find("\n", i)
+            i = n if end == -1 else end + 1
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if ch.isalpha() or ch == "_":
+            match = _WORD.match(sql, i)
+            tokens.append(("word", match.group(0), i, match.end(), depth))
+            i = match.end()
+            continue
+        if ch.isdigit():
+            match = _NUMBER.match(sql, i)
+            tokens.append(("number", match.group(0), i, match.end(), depth))
+            i = match.end()
+            continue
+        if ch == ")":
+            depth = max(depth - 1, 0)
+        tokens.append(("punct", ch, i, i + 1, depth))
+        if ch == "(":
+            depth += 1
+        i += 1
+    return tokens
+
+
+def top_level_words(sql: str) -> List[Tuple[str, int, int]]:
+    """Keywords/identifiers outside parentheses, strings and comments as (WORD, start, end)"""
+    return [
+        (text.upper(), start, end)
+        for kind, text, start, end, depth in tokenize(sql)
+        if kind == "word" and depth == 0
+    ]
+
+
+def split_top_level(sql: str) -> List[str]:
+    """Split a list (select list, ORDER BY items) on commas outside parentheses"""
+    parts, start = [], 0
+    for kind, text, position, _, depth in tokenize(sql):
+        if kind == "punct" and text == "," and depth == 0:
+            parts.append(sql[start:position].strip())
+            start = position + 1
+    parts.append(sql[start:].strip())
+    return [part for part in parts if part]
+
+
+def _unquote(name: str) -> str:
+    if len(name) >= 2 and name[0] == name[-1] and name[0] in "`'\"":
+        return name[1:-1].replace(name[0] * 2, name[0])
+    return name
+
+
+def quote_identifier(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def column_reference(expression: str) -> Optional[List[str]]:
+    """["t", "col"] for ``t.col`` / ``col`` / backticked forms, None for anything else"""
+    tokens = tokenize(expression)
+    if not tokens or len(tokens) % 2 == 0:
+        return None
+    parts = []
+    for index, (kind, text, _, _, _) in enumerate(tokens):
+        if index % 2 == 0:
+            if kind not in ("word", "ident"):
+                return None
+            parts.append(_unquote(text))
+        elif text != ".":
+            return None
+    return parts
+
+
+def normalize_expression(expression: str) -> str:
+    return " ".join(text.upper() if kind == "word" else text for kind, text, *_ in tokenize(expression))
+
+
+def sql_literal(value: Any) -> str:
+    """Render a Python value as a MySQL literal (strings as hex, never interpolated)"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(int(value))
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("Non-finite float can't be used as a SQL literal")
+        return repr(value)
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            raise ValueError("Non-finite decimal can't be used as a SQL literal")
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return f"'{value.strftime('%Y-%m-%d %H:%M:%S.%f')}'"
+    if isinstance(value, datetime.date):
+        return f"'{value.isoformat()}'"
+    if isinstance(value, datetime.timedelta):
+        seconds = value.total_seconds()
+        sign = "-" if seconds < 0 else ""
+        seconds = abs(seconds)
+        return f"'{sign}{int(seconds // 3600)}:{int(seconds % 3600 // 60):02d}:{seconds % 60:09.6f}'"
+    if isinstance(value, (bytes, bytearray)):
+        return f"X'{bytes(value).hex()}'" if value else "''"
+    if isinstance(value, str):
+        # Introducer keeps the literal coercible to the column's collation
+        return f"_utf8mb4 X'{value.encode('utf-8').hex()}'" if value else "''"
+    raise ValueError(f"Unsupported SQL literal type: {type(value).__name__}")
+
+
+class SelectShape:
+    """Top-level structure of a SELECT statement, enough to rewrite it for paging.
+
+    Only the outermost query block is looked at: subqueries, strings and
+    comments are skipped, so ``COUNT(DISTINCT x)`` or a ``LIMIT`` inside a
+    subquery don't count. An existing top-level ``LIMIT`` is kept as the
+    outer bound of the result (``limit``/``offset``).
+    """
+
+    def __init__(self, sql: str):
+        self.sql = strip_statement(sql)
+        self._words = top_level_words(self.sql)
+        names = [word[0] for word in self._words]
+
+        self.set_operation = any(name in SET_OPERATIONS for name in names)
+        self.select_index = names.index("SELECT") if "SELECT" in names else None
+        self.distinct = (
+            self.select_index is not None
+            and self.select_index + 1 < len(names)
+            and names[self.select_index + 1] in ("DISTINCT", "DISTINCTROW")
+        )
+
+        # Clause name -> (keyword start, body start, body end) of the outer query block
+        self.clauses: Dict[str, Tuple[int, int, int]] = {}
+        self.select_list_end = len(self.sql)
+        if self.select_index is not None:
+            found = []
+            following = self._words[self.select_index + 1:]
+            for index, (name, start, end) in enumerate(following):
+                if name not in CLAUSE_KEYWORDS or any(name == clause[0] for clause in found):
+                    continue
+                if name in ("GROUP", "ORDER"):
+                    if index + 1 >= len(following) or following[index + 1][0] != "BY":
+                        continue
+                    end = following[index + 1][2]
+                found.append((name, start, end))
+            for index, (name, start, end) in enumerate(found):
+                body_end = found[index + 1][1] if index + 1 < len(found) else len(self.sql)
+                self.clauses[name] = (start, end, body_end)
+            if found:
+                self.select_list_end = found[0][1]
+
+        self.limit = None
+        self.offset = 0
+        self.limit_start = None
+        self.limit_parsed = True
+        limits = [word for word in self._words if word[0] == "LIMIT"]
+        if limits:
+            _, start, end = limits[-1]
+            match = _LIMIT_TAIL.match(self.sql[end:])
+            if match:
+                self.limit_start = start
+                if match.group(2) is not None:
+                    # LIMIT offset, count
+                    self.offset, self.limit = int(match.group(1)), int(match.group(2))
+                else:
+                    self.limit, self.offset = int(match.group(1)), int(match.group(3) or 0)
+            else:
+                self.limit_parsed = False
+
+        self.has_into = self.select_index is not None and "INTO" in names[self.select_index:]
+
+    @property
+    def body(self) -> str:
+        """The statement without its top-level LIMIT"""
+        if self.limit_start is None:
+            return self.sql
+        return self.sql[:self.limit_start].rstrip()
+
+    @property
+    def simple(self) -> bool:
+        """A single query block whose select list can take an extra column"""
+        return (
+            self.select_index is not None
+            and not self.set_operation
+            and not self.distinct
+            and not self.has_into
+            and self.limit_parsed
+        )
+
+    def clause(self, name: str) -> Optional[str]:
+        """Body of a top-level clause ("FROM", "ORDER", "GROUP", ...) without its keyword"""
+        if name not in self.clauses:
+            return None
+        _, start, end = self.clauses[name]
+        return self.sql[start:end].strip()
+
+    def select_items(self) -> List[Tuple[str, Optional[str]]]:
+        """(expression, output column name) per select-list item, name None when unknown"""
+        if self.select_index is None:
+            return []
+        start = self._words[self.select_index][2]
+        items = []
+        for item in split_top_level(self.sql[start:self.select_list_end]):
+            tokens = tokenize(item)
+            while tokens and tokens[0][0] == "word" and tokens[0][1].upper() in SELECT_MODIFIERS:
+                item = item[tokens[0][3]:].strip()
+                tokens = tokenize(item)
+            if item == "*" or item.endswith(".*"):
+                items.append((item, "*"))
+                continue
+            reference = column_reference(item)
+            if reference:
+                items.append((item, reference[-1]))
+                continue
+
+            name = None
+            if len(tokens) >= 2 and tokens[-1][0] in ("word", "ident", "string"):
+                last, previous = tokens[-1], tokens[-2]
+                if previous[0] == "word" and previous[1].upper() == "AS":
+                    name = last[1]
+                    item = item[:previous[2]].strip()
+                elif (
+                    last[0] != "string"
+                    and last[1].upper() not in NON_ALIAS_WORDS
+                    and not (previous[0] == "word" and previous[1].upper() in NON_ALIAS_WORDS)
+                    and (previous[0] in ("word", "ident", "string", "number") or previous[1] == ")")
+                ):
+                    name = last[1]
+                    item = item[:last[2]].strip()
+            items.append((item, _unquote(name) if name is not None else None))
+        return items
+
+    @property
+    def aggregated(self) -> bool:
+        if "GROUP" in self.clauses or "HAVING" in self.clauses:
+            return True
+        return any(_AGGREGATE.search(expression) for expression, _ in self.select_items())
+
+    def output_column(self, expression: str) -> Optional[str]:
+        """Name of the result column holding ``expression`` (alias, ordinal or column)"""
+        items = self.select_items()
+        if re.fullmatch(r"\d+", expression.strip()):
+            index = int(expression) - 1
+            return items[index][1] if 0 <= index < len(items) and items[index][1] != "*" else None
+
+        reference = [part.lower() for part in column_reference(expression) or []]
+        normalized = normalize_expression(expression)
+        for item_expression, name in items:
+            if name is None or name == "*":
+                continue
+            if len(reference) == 1 and name.lower() == reference[0]:
+                return name
+            item_reference = [part.lower() for part in column_reference(item_expression) or []]
+            if reference and item_reference:
+                size = min(len(reference), len(item_reference))
+                if reference[-size:] == item_reference[-size:]:
+                    return name
+            if normalize_expression(item_expression) == normalized:
+                return name
+        if reference and any(name == "*" for _, name in items):
+            return column_reference(expression)[-1]
+        return None
+
+    def single_table(self) -> Optional[Tuple[str, str]]:
+        """(table, qualifier) when FROM names exactly one base table"""
+        from_clause = self.clause("FROM")
+        if not from_clause:
+            return None
+        if any(depth == 0 and (text == "," or text.upper() == "JOIN") for _, text, _, _, depth in tokenize(from_clause)):
+            return None
+        match = re.fullmatch(
+            r"((?:`[^`]+`|[\w$]+)(?:\.(?:`[^`]+`|[\w$]+))?)(?:\s+(?:AS\s+)?(`[^`]+`|[\w$]+))?",
+            from_clause,
+            flags=re.IGNORECASE,
+        )
+        if not match:
+            return None
+        table = column_reference(match.group(1))[-1]
+        qualifier = _unquote(match.group(2)) if match.group(2) else table
+        return table, qualifier
+
+    def with_column(self, expression: str) -> str:
+        """Append ``expression`` to the select list of the outer query block"""
+        position = self.select_list_end if self.select_index is not None else len(self.sql)
+        return f"{self.sql[:position]}\n, {expression}\n{self.sql[position:]}".rstrip()
+
+    def paginate(self, limit: int, offset: int, extra_column: Optional[str] = None) -> Optional[str]:
+        """SQL for ``limit`` rows starting at ``offset`` within the original result.
+
+        Returns None when the requested window lies past the original LIMIT.
+        """
+        if not self.limit_parsed:
+            return f"SELECT * FROM ({self.sql}) AS preview_page\nLIMIT {limit} OFFSET {offset}"
+
+        if self.limit is not None:
+            limit = min(limit, self.limit - offset)
+            if limit <= 0:
+                return None
+        offset += self.offset
+
+        sql = SelectShape(self.body).with_column(extra_column) if extra_column else self.body
+        return f"{sql}\nLIMIT {limit} OFFSET {offset}"
+
+    def clamp_total(self, total: int) -> int:
+        """Row count before LIMIT -> row count of the original statement"""
+        total = max(total - self.offset, 0)
+        return min(total, self.limit) if self.limit is not None else total
+
+    def count_sql(self, alias: str = "total_count") -> str:
+        return f"SELECT COUNT(*) AS {alias} FROM ({self.sql}) AS count_subquery"
+
+    def capped(self, max_rows: int) -> str:
+        """The statement limited to ``max_rows`` rows (a smaller original LIMIT is kept)"""
+        if not self.limit_parsed:
+            return f"SELECT * FROM ({self.sql}) AS capped_result\nLIMIT {max_rows}"
+        if self.limit is not None and self.limit <= max_rows:
+            return self.sql
+        return f"{self.body}\nLIMIT {max_rows} OFFSET {self.offset}"
+
+
+class KeysetPlan:
+    """Keyset (seek) pagination for a SELECT whose ordering can be made unique.
+
+    The statement minus ORDER BY/LIMIT becomes a derived table; the outer
+    query orders by the result columns in ``keys`` and continues after the
+    last row with a ``WHERE`` on those columns instead of an OFFSET. Sort or
+    tie-breaker columns missing from the result (primary key of a
+    single-table query, or the GROUP BY columns) are added as hidden
+    ``__keyset_*`` columns.
+    """
+
+    def __init__(self, inner_sql: str, keys: List[Tuple[str, bool]], hidden: List[str]):
+        self.inner_sql = inner_sql
+        self.keys = keys
+        self.hidden = hidden
+
+    @classmethod
+    def build(cls, shape: SelectShape, primary_key: Callable[[str], List[str]]) -> Optional["KeysetPlan"]:
+        """Plan for ``shape`` or None when its ordering can't be keyed"""
+        if not shape.simple or "WINDOW" in shape.clauses:
+            return None
+        group_by = shape.clause("GROUP")
+        if group_by and re.search(r"\bWITH\s+ROLLUP\b", group_by, re.IGNORECASE):
+            return None
+        aggregated = shape.aggregated
+        if aggregated and not group_by:
+            # A single row, nothing to page through
+            return None
+        group_items = {normalize_expression(item) for item in split_top_level(group_by or "")}
+
+        keys: List[Tuple[str, bool]] = []
+        added: List[str] = []
+
+        def key_column(expression: str) -> Optional[str]:
+            name = shape.output_column(expression)
+            if name is not None:
+                return name
+            # Grouped queries can only select grouped or aggregated expressions
+            if aggregated and normalize_expression(expression) not in group_items and not _AGGREGATE.search(expression):
+                return None
+            name = f"{KEYSET_COLUMN_PREFIX}{len(added)}"
+            added.append((expression, name))
+            return name
+
+        select_items = shape.select_items()
+        select_expressions = {name: expression for expression, name in select_items if name}
+        for item in split_top_level(shape.clause("ORDER") or ""):
+            descending = False
+            direction = re.search(r"\s+(ASC|DESC)$", item, re.IGNORECASE)
+            if direction:
+                descending = direction.group(1).upper() == "DESC"
+                item = item[:direction.start()].strip()
+            # Also through an alias or ordinal: the derived column is recomputed for every page
+            if re.fullmatch(r"\d+", item) and 0 < int(item) <= len(select_items):
+                source = select_items[int(item) - 1][0]
+            else:
+                source = select_expressions.get(shape.output_column(item), "")
+            if _NONDETERMINISTIC.search(item) or _NONDETERMINISTIC.search(source):
+                return None
+            name = key_column(item)
+            if name is None:
+                return None
+            keys.append((name, descending))
+
+        if group_by:
+            tie_breakers = split_top_level(group_by)
+        else:
+            table = shape.single_table()
+            columns = primary_key(table[0]) if table else None
+            if not columns:
+                return None
+            tie_breakers = [f"{quote_identifier(table[1])}.{quote_identifier(column)}" for column in columns]
+
+        key_names = {name.lower() for name, _ in keys}
+        for expression in tie_breakers:
+            name = key_column(expression)
+            if name is None:
+                return None
+            if name.lower() not in key_names:
+                keys.append((name, False))
+                key_names.add(name.lower())
+
+        names = [name.lower() for _, name in shape.select_items() if name and name != "*"]
+        if len(names) != len(set(names)):
+            # The derived table would have duplicate column names
+            return None
+
+        body = SelectShape(shape.body)
+        inner_sql = body.sql[:body.clauses["ORDER"][0]].rstrip() if "ORDER" in body.clauses else body.sql
+        for expression, name in added:
+            inner_sql = SelectShape(inner_sql).with_column(f"{expression} AS {name}")
+        return cls(inner_sql, keys, [name for _, name in added])
+
+    def predicate(self, values: List[Any]) -> str:
+        """Rows strictly after ``values`` in key order (values must not be NULL)"""
+        conditions = []
+        for index, (name, descending) in enumerate(self.keys):
+            column = f"keyset_page.{quote_identifier(name)}"
+            literal = sql_literal(values[index])
+            # NULLs sort last in DESC order, keep them after every value
+            after = f"({column} < {literal} OR {column} IS NULL)" if descending else f"{column} > {literal}"
+            equal = [
+                f"keyset_page.{quote_identifier(previous)} = {sql_literal(values[i])}"
+                for i, (previous, _) in enumerate(self.keys[:index])
+            ]
+            conditions.append("(" + " AND ".join(equal + [after]) + ")")
+        return " OR ".join(conditions)
+
+    def page_sql(self, limit: int, after: Optional[List[Any]] = None, offset: int = 0, extra_column: Optional[str] = None) -> str:
+        columns = "keyset_page.*" + (f", {extra_column}" if extra_column else "")
+        where = f"\nWHERE {self.predicate(after)}" if after is not None else ""
+        order = ", ".join(
+            f"keyset_page.{quote_identifier(name)}{' DESC' if descending else ''}" for name, descending in self.keys
+        )
+        sql = f"SELECT {columns} FROM (\n{self.inner_sql}\n) AS keyset_page{where}\nORDER BY {order}\nLIMIT {limit}"
+        return f"{sql} OFFSET {offset}" if offset else sql
+
+
+# Keywords upper-cased by normalize_sql; identifiers keep their case (table names can be case sensitive)
+SQL_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "AND", "OR", "NOT", "GROUP", "BY", "ORDER", "HAVING", "LIMIT", "OFFSET",
+    "AS", "ON", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "ASC", "DESC", "DISTINCT", "IN",
+    "IS", "NULL", "LIKE", "BETWEEN", "CASE", "WHEN", "THEN", "ELSE", "END", "UNION", "ALL", "WITH",
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "EXISTS", "INTERVAL", "OVER", "USING",
+}
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical text of a statement: no comments, single spaces, keywords upper-cased"""
+    return " ".join(
+        text.upper() if kind == "word" and text.upper() in SQL_KEYWORDS else text
+        for kind, text, *_ in tokenize(strip_statement(sql))
+    )
+
+
+def referenced_tables(sql: str) -> List[Tuple[Optional[str], str]]:
+    """(schema, table) pairs named after FROM/JOIN anywhere in the statement, derived tables skipped"""
+    tokens = tokenize(sql)
+    tables = []
+    # Per parenthesis level: has a SELECT been seen? (EXTRACT(YEAR FROM d) is not a table)
+    selects = [False]
+    i = 0
+    while i < len(tokens):
+        kind, text, _, _, depth = tokens[i]
+        i += 1
+        if kind == "punct" and text in "()":
+            del selects[depth + 1:]
+            if text == "(":
+                selects.append(False)
+            continue
+        if kind == "word" and text.upper() == "SELECT":
+            selects[depth] = True
+        if kind != "word" or text.upper() not in ("FROM", "JOIN") or not selects[depth]:
+            continue
+        while i < len(tokens) and tokens[i][0] in ("word", "ident"):
+            parts = [_unquote(tokens[i][1])]
+            i += 1
+            if i + 1 < len(tokens) and tokens[i][1] == "." and tokens[i + 1][0] in ("word", "ident"):
+                parts.append(_unquote(tokens[i + 1][1]))
+                i += 2
+            tables.append((parts[0], parts[1]) if len(parts) == 2 else (None, parts[0]))
+            # Skip an alias, then continue through "FROM a, b" lists
+            if i < len(tokens) and tokens[i][0] == "word" and tokens[i][1].upper() == "AS":
+                i += 1
+            if i < len(tokens) and tokens[i][0] in ("word", "ident") and tokens[i][1].upper() not in SQL_KEYWORDS | CLAUSE_KEYWORDS | {"NATURAL", "STRAIGHT_JOIN"}:
+                i += 1
+            if i < len(tokens) and tokens[i][1] == "," and tokens[i][4] == depth:
+                i += 1
+                continue
+            break
+    return tables
+
+
+def with_optimizer_hint(sql: str, hint: str) -> str:
+    """Put ``/*+ hint */`` after the SELECT of the outermost query block (unchanged when there is none)"""
+    sql = strip_statement(sql)
+    for word, _, end in top_level_words(sql):
+        if word == "SELECT":
+            return f"{sql[:end]} /*+ {hint} */{sql[end:]}"
+    return sql
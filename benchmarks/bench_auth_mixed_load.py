@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /preview-style request latency during a login burst, bcrypt
+inline in the threadpool (previous /auth/login) vs. the password hashing
+process pool with admission control.
+
+Runs in-process over ASGI, no databases needed: the user lookup returns a
+fixed user with a real bcrypt hash, and the "preview" endpoint is a sync
+route holding a threadpool slot for --preview-ms, like /preview/data
+waiting on MySQL.
+
+    python benchmarks/bench_auth_mixed_load.py --logins 100 --previews 10 --seconds 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app import dependencies_auth
+from app.api.v1.endpoints import auth
+from app.core.database import get_db
+from app.core.password_hashing import PasswordHasher, pwd_context
+
+PASSWORD = "rahasia123"
+
+
+def build_app(preview_seconds: float) -> FastAPI:
+    hashed = pwd_context.hash(PASSWORD)
+    user = SimpleNamespace(username="budi", hashed_password=hashed)
+    auth.get_user_by_username = lambda db, username: user
+
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.dependency_overrides[get_db] = lambda: None
+
+    @app.post("/legacy/login")
+    def legacy_login(form_data: OAuth2PasswordRequestForm = Depends()):
+        if not dependencies_auth.verify_password(form_data.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"access_token": dependencies_auth.create_access_token({"sub": user.username})}
+
+    @app.get("/preview")
+    def preview():
+        time.sleep(preview_seconds)
+        return {"rows": []}
+
+    return app
+
+
+async def run_mode(app: FastAPI, login_path: str, logins: int, previews: int, seconds: float):
+    transport = httpx.ASGITransport(app=app)
+    deadline = time.perf_counter() + seconds
+    login_status = {}
+    preview_latency = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def login_worker():
+            while time.perf_counter() < deadline:
+                response = await client.post(login_path, data={"username": "budi", "password": PASSWORD})
+                login_status[response.status_code] = login_status.get(response.status_code, 0) + 1
+                if response.status_code == 503:
+                    await asyncio.sleep(0.05)
+
+        async def preview_worker():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/preview")
+                preview_latency.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*[login_worker() for _ in range(logins)], *[preview_worker() for _ in range(previews)])
+
+    preview_latency.sort()
+    return {
+        "preview_p50": statistics.median(preview_latency),
+        "preview_p95": preview_latency[min(len(preview_latency) - 1, int(len(preview_latency) * 0.95))],
+        "previews": len(preview_latency),
+        "logins_ok": login_status.get(200, 0),
+        "logins_503": login_status.get(503, 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--previews", type=int, default=10, help="concurrent preview clients")
+    parser.add_argument("--preview-ms", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--queue-timeout", type=float, default=2)
+    args = parser.parse_args()
+
+    app = build_app(args.preview_ms / 1000)
+    print(f"{args.logins} login clients, {args.previews} preview clients, {args.seconds:g}s per mode")
+    print(f"{'mode':>7} {'preview p50':>12} {'preview p95':>12} {'previews':>9} {'logins ok':>10} {'503':>6}")
+    for mode in ("inline", "pool"):
+        if mode == "pool":
+            hasher = PasswordHasher(
+                workers=args.workers,
+                max_concurrency=args.max_concurrency or args.workers * 2,
+                queue_timeout=args.queue_timeout,
+            )
+            auth.password_hasher = hasher
+        path = "/legacy/login" if mode == "inline" else "/auth/login"
+        result = asyncio.run(run_mode(app, path, args.logins, args.previews, args.seconds))
+        print(
+            f"{mode:>7} {result['preview_p50']:>10.1f}ms {result['preview_p95']:>10.1f}ms "
+            f"{result['previews']:>9} {result['logins_ok']:>10} {result['logins_503']:>6}"
+        )
+        if mode == "pool":
+            hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: get_current_user cost, JWT verification alone vs. with the
+Postgres user lookup (USER_CACHE_TTL_SECONDS=0) vs. with the user cache.
+
+Needs the app Postgres database (DB_* env vars) and an existing user:
+
+    python benchmarks/bench_auth_resolution.py --username budi --requests 5000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from app import dependencies_auth
+from app.core import user_cache as user_cache_module
+from app.core.database import SessionLocal
+from app.core.user_cache import UserCache
+
+
+def timed(fn, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    token = dependencies_auth.create_access_token({"sub": args.username})
+    unauthorized = HTTPException(status_code=401)
+    db = SessionLocal()
+
+    def resolve():
+        dependencies_auth.get_current_user(token, db)
+        db.expunge_all()
+
+    modes = {
+        "jwt only": (lambda: dependencies_auth.verify_token(token, unauthorized), None),
+        "postgres": (resolve, UserCache(ttl=0)),
+        "cached": (resolve, UserCache(ttl=3600)),
+    }
+    print(f"{args.requests} requests for {args.username!r}")
+    print(f"{'mode':>9} {'p50 (us)':>9} {'p99 (us)':>9}")
+    try:
+        for name, (fn, cache) in modes.items():
+            if cache is not None:
+                dependencies_auth.user_cache = cache
+                user_cache_module.user_cache = cache
+            p50, p99 = timed(fn, args.requests)
+            print(f"{name:>9} {p50:>9.1f} {p99:>9.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /chat/list, full history load vs. cursor pages, with and without
+the (user_id, created_at, id) index.
+
+Seeds a scratch schema on the app Postgres database (DB_* env vars, the user
+needs CREATE SCHEMA) with a chats table of --rows messages spread over
+--users users, plus one power user holding --power-user-rows of them. The
+repository functions run unchanged against it through schema_translate_map.
+"full" is the previous endpoint (every message of the user, ORM-hydrated and
+serialized), "first"/"deep" are newest-first pages at the start and after
+--deep-pages pages of history.
+
+    python benchmarks/bench_chat_list.py --rows 10000000 --users 20000 --power-user-rows 50000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.repositories.chat_repository import get_all_chats_by_user, get_chats_page_by_user
+from app.schemas.chat import ChatResponse
+
+BENCH_SCHEMA = "bench_chat_list"
+POWER_USER_ID = 1
+
+
+def seed(conn, rows: int, users: int, power_user_rows: int):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    # Same columns as chats, without the users foreign key so no users need seeding
+    conn.execute(text(
+        f"CREATE TABLE {BENCH_SCHEMA}.chats (id SERIAL PRIMARY KEY, type VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+        f"user_id INTEGER NOT NULL, created_at TIMESTAMPTZ DEFAULT now(), updated_at TIMESTAMPTZ)"
+    ))
+    conn.execute(text(f"CREATE INDEX ix_chats_id ON {BENCH_SCHEMA}.chats (id)"))
+    # Messages arrive in id order over the last year, alternating question and answer
+    conn.execute(text(
+        f"INSERT INTO {BENCH_SCHEMA}.chats (type, content, user_id, created_at) "
+        f"SELECT CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END, "
+        f"'message ' || g || ' ' || repeat('x', 200), "
+        f"CASE WHEN g % (:rows / :power) = 0 THEN :power_user ELSE 2 + (g % :users) END, "
+        f"now() - interval '365 days' + (g * interval '365 days' / :rows) "
+        f"FROM generate_series(1, :rows) AS g"
+    ), {"rows": rows, "power": power_user_rows, "users": users, "power_user": POWER_USER_ID})
+    conn.execute(text(f"ANALYZE {BENCH_SCHEMA}.chats"))
+    conn.commit()
+
+
+def time_call(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(db: Session, user_id: int, limit: int, deep_pages: int, runs: int):
+    def full():
+        chats = get_all_chats_by_user(db, user_id)
+        [ChatResponse.model_validate(chat, from_attributes=True).model_dump() for chat in chats]
+        db.expunge_all()
+
+    def page(before=None):
+        chats, next_before = get_chats_page_by_user(db, user_id, limit, before)
+        [ChatResponse.model_validate(chat, from_attributes=True).model_dump() for chat in chats]
+        db.expunge_all()
+        return next_before
+
+    deep_cursor = None
+    for _ in range(deep_pages):
+        deep_cursor = page(deep_cursor)
+        if deep_cursor is None:
+            break
+
+    return {
+        "full": time_call(full, runs),
+        "first": time_call(page, runs),
+        "deep": time_call(lambda: page(deep_cursor), runs) if deep_cursor else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--power-user-rows", type=int, default=50_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--deep-pages", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded schema")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        print(f"seeding {args.rows} chats...")
+        start = time.perf_counter()
+        seed(conn, args.rows, args.users, args.power_user_rows)
+        print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    bench_engine = engine.execution_options(schema_translate_map={None: BENCH_SCHEMA})
+    print(f"{'index':>6} {'user':>6} {'full (ms)':>10} {'first (ms)':>11} {'deep (ms)':>10}")
+    try:
+        for indexed in (False, True):
+            if indexed:
+                with engine.connect() as conn:
+                    conn.execute(text(
+                        f"CREATE INDEX ix_chats_user_id_created_at_id ON {BENCH_SCHEMA}.chats (user_id, created_at, id)"
+                    ))
+                    conn.execute(text(f"ANALYZE {BENCH_SCHEMA}.chats"))
+                    conn.commit()
+            for label, user_id in (("power", POWER_USER_ID), ("normal", 2)):
+                with Session(bench_engine) as db:
+                    result = run(db, user_id, args.limit, args.deep_pages, args.runs)
+                print(
+                    f"{'yes' if indexed else 'no':>6} {label:>6} {result['full']:>10.1f} "
+                    f"{result['first']:>11.1f} {result['deep']:>10.1f}"
+                )
+    finally:
+        if not args.keep:
+            with engine.connect() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+                conn.commit()
+
+
+if __name__ == "__main__":
+    main()
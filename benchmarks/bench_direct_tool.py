@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat latency with and without the direct-tool fast path (AGENT_DIRECT_TOOL_RESULT).
+
+Runs real agent turns (OpenAI, analytics MySQL and the app Postgres are
+required) for a set of data questions in both modes and reports time to the
+tool result and to the completion event.
+
+    python benchmarks/bench_direct_tool.py --username demo --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.repositories.user_repository import get_user_by_username
+from app.services import agent_service as agent_service_module
+from app.services.agent_service import AgentService
+
+QUESTIONS = [
+    "berapa total stock semua produk?",
+    "tampilkan 5 produk termahal",
+    "ada berapa produk?",
+]
+
+
+async def time_turn(service: AgentService, question: str):
+    start = time.perf_counter()
+    tool_result_at = None
+    completion_at = None
+    async for line in service.process_agent_streaming(question):
+        event = json.loads(line)
+        if event["type"] == "tool_call_result" and tool_result_at is None:
+            tool_result_at = time.perf_counter() - start
+        elif event["type"] == "completion":
+            completion_at = time.perf_counter() - start
+    return tool_result_at, completion_at
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = get_user_by_username(db, args.username)
+        if user is None:
+            sys.exit(f"User {args.username} not found")
+
+        print(f"{'mode':>8} {'tool result p50 (s)':>20} {'completion p50 (s)':>19} {'completion max (s)':>19}")
+        for direct in (False, True):
+            agent_service_module.AGENT_DIRECT_TOOL_RESULT = direct
+            tool_times, completion_times = [], []
+            for _ in range(args.runs):
+                for question in QUESTIONS:
+                    tool_at, completion_at = asyncio.run(time_turn(AgentService(db, user), question))
+                    if tool_at is not None:
+                        tool_times.append(tool_at)
+                    if completion_at is not None:
+                        completion_times.append(completion_at)
+            mode = "direct" if direct else "agent"
+            print(
+                f"{mode:>8} {statistics.median(tool_times):>20.2f} "
+                f"{statistics.median(completion_times):>19.2f} {max(completion_times):>19.2f}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
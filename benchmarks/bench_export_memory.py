@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak RSS of exporting a large result, buffered fetchall vs. streaming export.
+
+Seeds a scratch table on the analytics MySQL server (the user from
+db_connection.py needs CREATE/DROP privileges), then runs each mode in a fresh
+subprocess and reports its peak RSS (ru_maxrss) and wall time:
+
+  buffered  execute_query() (dict cursor + fetchall) then NDJSON encoding,
+            i.e. what paging through /preview/data amounts to for a full dump
+  ndjson    QueryExport on an unbuffered cursor, chunks written to /dev/null
+  csv       same as ndjson in CSV
+
+    python benchmarks/bench_export_memory.py --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.export_service import QueryExport, _json_default
+from db_connection import DatabaseConnection
+
+BENCH_DATABASE = "bench_export_memory"
+EXPORT_SQL = f"SELECT id, name, category, price, created_at FROM {BENCH_DATABASE}.products"
+
+
+def seed(rows: int, batch: int = 10000):
+    db = DatabaseConnection()
+    db.connect()
+    cursor = db.connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+    cursor.execute(f"CREATE DATABASE {BENCH_DATABASE}")
+    cursor.execute(
+        f"CREATE TABLE {BENCH_DATABASE}.products (id INT PRIMARY KEY AUTO_INCREMENT, name VARCHAR(64), "
+        f"category VARCHAR(32), price DECIMAL(10, 2), created_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    )
+    rng = random.Random(42)
+    for start in range(0, rows, batch):
+        values = [
+            (f"product {i}", f"category {rng.randrange(200)}", round(rng.uniform(1, 1000), 2))
+            for i in range(start, min(start + batch, rows))
+        ]
+        cursor.executemany(
+            f"INSERT INTO {BENCH_DATABASE}.products (name, category, price) VALUES (%s, %s, %s)", values
+        )
+    cursor.close()
+    db.close()
+
+
+def drop():
+    db = DatabaseConnection()
+    db.connect()
+    cursor = db.connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+    cursor.close()
+    db.close()
+
+
+def run_mode(mode: str, batch_size: int):
+    start = time.perf_counter()
+    written = 0
+    with open(os.devnull, "wb") as sink:
+        if mode == "buffered":
+            db = DatabaseConnection()
+            rows = db.execute_query(EXPORT_SQL)
+            for row in rows:
+                written += sink.write((json.dumps(row, default=_json_default) + "\n").encode("utf-8"))
+            db.close()
+        else:
+            for chunk in QueryExport(EXPORT_SQL, mode, batch_size=batch_size, max_rows=0, max_seconds=0):
+                written += sink.write(chunk)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_mb, "bytes": written}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--modes", nargs="+", default=["buffered", "ndjson", "csv"])
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.batch_size)
+        return
+
+    print(f"Seeding {args.rows} rows...")
+    seed(args.rows)
+    try:
+        print(f"{'mode':>9} {'wall (s)':>9} {'peak RSS (MB)':>14} {'output (MB)':>12}")
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--batch-size", str(args.batch_size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>9} {result['seconds']:>9.2f} {result['peak_rss_mb']:>14.1f} {result['bytes'] / 1e6:>12.1f}")
+    finally:
+        drop()
+
+
+if __name__ == "__main__":
+    main()
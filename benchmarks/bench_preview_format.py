@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /preview/data payload size and serialization time, row dicts vs. columnar.
+
+Runs without a database: synthetic result tuples shaped like typical
+bar/line/pie/table previews go through the same steps as the endpoint
+(QueryRows -> as_dicts()/as_columnar() -> jsonable_encoder -> JSON bytes).
+
+    python benchmarks/bench_preview_format.py --repeat 200
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from fastapi.encoders import jsonable_encoder
+from mysql.connector.constants import FieldType
+
+from app.services.preview_service import QueryRows
+
+
+def shapes():
+    start = datetime.date(2024, 1, 1)
+    return {
+        "bar_chart": QueryRows(
+            [("category_name", FieldType.VAR_STRING), ("total_products", FieldType.LONGLONG)],
+            [(f"Kategori {i}", i * 17) for i in range(50)],
+        ),
+        "line_chart": QueryRows(
+            [("tanggal", FieldType.DATE), ("total_penjualan", FieldType.NEWDECIMAL)],
+            [(start + datetime.timedelta(days=i), Decimal(f"{i * 1234.5:.2f}")) for i in range(365)],
+        ),
+        "pie_chart": QueryRows(
+            [("status", FieldType.VAR_STRING), ("jumlah", FieldType.LONGLONG)],
+            [(f"status_{i}", i * 100) for i in range(8)],
+        ),
+        "table": QueryRows(
+            [
+                ("product_id", FieldType.LONG), ("product_name", FieldType.VAR_STRING),
+                ("category_name", FieldType.VAR_STRING), ("price", FieldType.NEWDECIMAL),
+                ("stock_quantity", FieldType.LONG), ("supplier_name", FieldType.VAR_STRING),
+                ("created_at", FieldType.DATETIME), ("is_active", FieldType.TINY),
+            ],
+            [
+                (i, f"Produk {i}", f"Kategori {i % 20}", Decimal(f"{i * 3.75:.2f}"), i % 500,
+                 f"Supplier {i % 40}", datetime.datetime(2024, 1, 1, 8, 0) + datetime.timedelta(hours=i), i % 2)
+                for i in range(100)
+            ],
+        ),
+    }
+
+
+def serialize(rows: QueryRows, format: str) -> bytes:
+    # Same steps as FastAPI's default JSONResponse for the endpoint's return value
+    content = jsonable_encoder({"response_type": "table", "data": rows.formatted(format)})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def time_call(fn, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'type':>10} {'rows':>5} {'row bytes':>10} {'col bytes':>10} {'size':>6} {'row ms':>7} {'col ms':>7}")
+    for name, rows in shapes().items():
+        row_bytes = len(serialize(rows, "rows"))
+        col_bytes = len(serialize(rows, "columnar"))
+        row_time = time_call(lambda: serialize(rows, "rows"), args.repeat)
+        col_time = time_call(lambda: serialize(rows, "columnar"), args.repeat)
+        print(
+            f"{name:>10} {len(rows):>5} {row_bytes:>10} {col_bytes:>10} {col_bytes / row_bytes:>5.0%} "
+            f"{row_time * 1000:>7.2f} {col_time * 1000:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
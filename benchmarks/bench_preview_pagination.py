@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /preview/data paging, legacy three-query flow vs. PreviewService,
+and OFFSET vs. keyset (cursor) cost for deep pages.
+
+Creates a scratch database with a synthetic products table on the analytics
+MySQL server (the user from db_connection.py needs CREATE/DROP privileges),
+then times one page request for a few query shapes. "legacy" reproduces the
+previous endpoint: full fetchall of the generated SQL, the LIMIT/OFFSET
+variant and a COUNT(*) subquery.
+
+    python benchmarks/bench_preview_pagination.py --rows 1000000 --pages 1 2 50 --deep-pages 1 1000 50000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import preview_service
+from app.services.preview_service import PreviewService, count_cache, decode_cursor, encode_cursor
+from db_connection import DatabaseConnection
+
+BENCH_DATABASE = "bench_preview_pagination"
+
+QUERIES = {
+    "scan": f"SELECT id, name, category, price FROM {BENCH_DATABASE}.products ORDER BY id",
+    "filter": f"SELECT id, name, price FROM {BENCH_DATABASE}.products WHERE price > 500 ORDER BY price DESC",
+    "group": f"SELECT category, COUNT(*) AS total, AVG(price) AS avg_price FROM {BENCH_DATABASE}.products GROUP BY category ORDER BY total DESC",
+}
+
+
+def create_table(db: DatabaseConnection, rows: int, batch: int = 10000):
+    cursor = db.connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+    cursor.execute(f"CREATE DATABASE {BENCH_DATABASE}")
+    cursor.execute(
+        f"CREATE TABLE {BENCH_DATABASE}.products (id INT PRIMARY KEY AUTO_INCREMENT, "
+        f"name VARCHAR(64), category VARCHAR(32), price DECIMAL(10, 2), INDEX idx_price (price))"
+    )
+    rng = random.Random(42)
+    for start in range(0, rows, batch):
+        values = [
+            (f"product {i}", f"category {rng.randrange(200)}", round(rng.uniform(1, 1000), 2))
+            for i in range(start, min(start + batch, rows))
+        ]
+        cursor.executemany(
+            f"INSERT INTO {BENCH_DATABASE}.products (name, category, price) VALUES (%s, %s, %s)", values
+        )
+    cursor.close()
+
+
+def legacy_page(db: DatabaseConnection, sql: str, page: int, limit: int):
+    results = db.execute_query(sql)
+    if not results:
+        return
+    offset = (page - 1) * limit
+    db.execute_query(f"{sql} LIMIT {limit} OFFSET {offset}")
+    db.execute_query(f"SELECT COUNT(*) as total_count FROM ({sql}) as count_subquery")
+
+
+def cursor_for_page(previewer: PreviewService, sql: str, page: int, limit: int):
+    """Walk next_cursor up to ``page`` (keyset cursors are only reachable this way)"""
+    state = previewer.cursor_page(sql, None, limit, "skip")
+    # Jump close to the target by offset, then switch to keyset from that row
+    if page > 2:
+        offset_cursor = encode_cursor({"q": decode_cursor(state["next_cursor"])["q"], "o": (page - 2) * limit})
+        state = previewer.cursor_page(sql, offset_cursor, limit, "skip")
+    return state["next_cursor"] if page > 1 else None
+
+
+def time_call(fn, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 2, 50])
+    parser.add_argument("--deep-pages", type=int, nargs="+", default=[1, 1000, 50000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # The scratch table isn't in the schema cache's database
+    preview_service.primary_key = lambda table: ["id"]
+
+    db = DatabaseConnection()
+    db.connect()
+    previewer = PreviewService(db)
+    try:
+        print(f"Seeding {args.rows} rows...")
+        create_table(db, args.rows)
+
+        print(f"{'query':>7} {'page':>5} {'legacy (s)':>11} {'window (s)':>11} {'cached (s)':>11} {'auto (s)':>9}")
+        for name, sql in QUERIES.items():
+            for page in args.pages:
+                legacy = time_call(lambda: legacy_page(db, sql, page, args.limit), args.repeat)
+
+                def fresh(count):
+                    # Cold count every time, i.e. the first page a user opens
+                    count_cache.clear()
+                    previewer.page(sql, page, args.limit, count)
+
+                window = time_call(lambda: fresh("window"), args.repeat)
+                cached = time_call(lambda: fresh("cached"), args.repeat)
+                # Steady state: the total is already known from an earlier page
+                previewer.page(sql, 1, args.limit, "auto")
+                auto = time_call(lambda: previewer.page(sql, page, args.limit, "auto"), args.repeat)
+                print(f"{name:>7} {page:>5} {legacy:>11.3f} {window:>11.3f} {cached:>11.3f} {auto:>9.3f}")
+
+        print(f"\n{'query':>7} {'page':>7} {'offset (s)':>11} {'keyset (s)':>11}")
+        for name in ("scan", "filter"):
+            sql = QUERIES[name]
+            for page in args.deep_pages:
+                offset = time_call(lambda: previewer.page(sql, page, args.limit, "skip"), args.repeat)
+                page_cursor = cursor_for_page(previewer, sql, page, args.limit)
+                keyset = time_call(lambda: previewer.cursor_page(sql, page_cursor, args.limit, "skip"), args.repeat)
+                print(f"{name:>7} {page:>7} {offset:>11.3f} {keyset:>11.3f}")
+    finally:
+        cursor = db.connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+        cursor.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SHOW TABLES + DESCRIBE per table vs. bulk information_schema introspection.
+
+Creates a scratch database with 10/100/1000 tables on the analytics MySQL server
+(the user from db_connection.py needs CREATE/DROP privileges), times both
+introspection paths and drops the database afterwards.
+
+    python benchmarks/bench_schema_introspection.py --tables 10 100 1000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_connection import DatabaseConnection
+
+BENCH_DATABASE = "bench_schema_introspection"
+
+
+def create_tables(db: DatabaseConnection, count: int, columns: int):
+    cursor = db.connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+    cursor.execute(f"CREATE DATABASE {BENCH_DATABASE}")
+    cursor.execute(f"USE {BENCH_DATABASE}")
+    for i in range(count):
+        extra_columns = ", ".join(f"col_{c} VARCHAR(64) DEFAULT NULL" for c in range(columns))
+        cursor.execute(
+            f"CREATE TABLE table_{i} (id INT PRIMARY KEY AUTO_INCREMENT, "
+            f"parent_id INT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, {extra_columns}, "
+            f"INDEX idx_parent (parent_id))"
+        )
+    cursor.close()
+
+
+def time_call(fn, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db = DatabaseConnection()
+    db.connect()
+    original_database = db.database
+
+    print(f"{'tables':>8} {'describe (s)':>14} {'bulk (s)':>10} {'bulk+fk+idx (s)':>16} {'speedup':>8}")
+    try:
+        for count in args.tables:
+            create_tables(db, count, args.columns)
+            db.database = BENCH_DATABASE
+
+            describe_schema = db.get_schema_describe()
+            bulk_schema = db.get_schema_bulk()
+            assert describe_schema == bulk_schema, "bulk introspection differs from DESCRIBE"
+
+            describe = time_call(db.get_schema_describe, args.repeat)
+            bulk = time_call(db.get_schema_bulk, args.repeat)
+            bulk_full = time_call(
+                lambda: db.get_schema_bulk(include_foreign_keys=True, include_indexes=True), args.repeat
+            )
+            print(f"{count:>8} {describe:>14.3f} {bulk:>10.3f} {bulk_full:>16.3f} {describe / bulk:>7.1f}x")
+            db.database = original_database
+    finally:
+        cursor = db.connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE}")
+        cursor.close()
+        # The session default database was changed, don't hand it back to the pool
+        db.close(discard=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NDJSON chunks/sec and CPU per stream with text-delta coalescing on and off.
+
+Uses the fake Runner from bench_stream_concurrency.py, so only the streaming
+pipeline (framing + writes) is measured.
+
+    python benchmarks/bench_stream_coalescing.py --tokens 2000 --delay-ms 1
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from bench_stream_concurrency import FakeRunResult
+from app.services import agent_service as agent_service_module
+from app.services.agent_service import AgentService
+
+
+async def run_stream(coalesce: bool, window_ms: float, max_bytes: int):
+    service = AgentService(db=None, user=SimpleNamespace(id=1, full_name="Bench"))
+    chunks = 0
+    payload_bytes = 0
+    async for line in service.process_agent_streaming(
+        "bench", coalesce=coalesce, coalesce_window_ms=window_ms, coalesce_max_bytes=max_bytes
+    ):
+        chunks += 1
+        payload_bytes += len(line.encode("utf-8"))
+    return chunks, payload_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=1)
+    parser.add_argument("--window-ms", type=float, default=30)
+    parser.add_argument("--max-bytes", type=int, default=512)
+    args = parser.parse_args()
+
+    agent_service_module.Runner.run_streamed = staticmethod(
+        lambda agent, input, **kwargs: FakeRunResult(args.tokens, args.delay_ms / 1000)
+    )
+    AgentService.generate_system_prompt = lambda self: ""
+    AgentService.save_user_message = lambda self, content: None
+    AgentService.save_assistant_message = lambda self, content: None
+
+    print(f"{args.tokens} tokens every {args.delay_ms} ms, window {args.window_ms} ms / {args.max_bytes} bytes")
+    print(f"{'coalesce':>9} {'chunks':>7} {'bytes':>8} {'wall (s)':>9} {'chunks/s':>9} {'CPU (ms)':>9}")
+    for coalesce in (False, True):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        chunks, payload_bytes = asyncio.run(run_stream(coalesce, args.window_ms, args.max_bytes))
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        print(f"{str(coalesce):>9} {chunks:>7} {payload_bytes:>8} {wall:>9.2f} {chunks / wall:>9.0f} {cpu * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent /chat/stream capacity, legacy thread bridge vs. native asyncio.
+
+The agent is replaced by a fake Runner that emits text deltas at a fixed pace,
+so only the streaming pipeline is measured. "legacy" reproduces the previous
+design (ThreadPoolExecutor + private event loop + queue.Queue, consumed through
+Starlette's iterate_in_threadpool); "native" is AgentService.process_agent_streaming.
+
+    python benchmarks/bench_stream_concurrency.py --streams 10 40 100 200
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from openai.types.responses import ResponseTextDeltaEvent
+from starlette.concurrency import iterate_in_threadpool
+
+from app.services import agent_service as agent_service_module
+from app.services.agent_service import AgentService
+
+
+class FakeRunResult:
+    def __init__(self, tokens: int, delay: float):
+        self.tokens = tokens
+        self.delay = delay
+
+    async def stream_events(self):
+        for _ in range(self.tokens):
+            await asyncio.sleep(self.delay)
+            delta = ResponseTextDeltaEvent.model_construct(delta="tok ", type="response.output_text.delta")
+            yield SimpleNamespace(type="raw_response_event", data=delta)
+
+    def cancel(self):
+        pass
+
+
+def legacy_stream(tokens: int, delay: float):
+    """Condensed copy of the previous thread + private loop + queue.Queue bridge"""
+    result_queue = queue.Queue()
+
+    def async_stream_task():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async def do_streaming():
+            async for event in FakeRunResult(tokens, delay).stream_events():
+                result_queue.put({"type": "text_delta", "content": event.data.delta})
+            result_queue.put(None)
+
+        try:
+            loop.run_until_complete(do_streaming())
+        finally:
+            loop.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(async_stream_task)
+        while True:
+            chunk = result_queue.get(timeout=60)
+            if chunk is None:
+                break
+            yield chunk
+
+
+async def consume_legacy(tokens: int, delay: float):
+    async for _ in iterate_in_threadpool(legacy_stream(tokens, delay)):
+        pass
+
+
+async def consume_native(tokens: int, delay: float):
+    service = AgentService(db=None, user=SimpleNamespace(id=1, full_name="Bench"))
+    async for _ in service.process_agent_streaming("bench"):
+        pass
+
+
+async def run(mode: str, streams: int, tokens: int, delay: float):
+    consume = consume_legacy if mode == "legacy" else consume_native
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample_threads())
+    start = time.perf_counter()
+    await asyncio.gather(*(consume(tokens, delay) for _ in range(streams)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+    return elapsed, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, nargs="+", default=[10, 40, 100, 200])
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+    delay = args.delay_ms / 1000
+
+    # Only the pipeline is measured: no prompt building, no database writes
+    agent_service_module.Runner.run_streamed = staticmethod(lambda agent, input, **kwargs: FakeRunResult(args.tokens, delay))
+    AgentService.generate_system_prompt = lambda self: ""
+    AgentService.save_user_message = lambda self, content: None
+    AgentService.save_assistant_message = lambda self, content: None
+
+    ideal = args.tokens * delay
+    print(f"{args.tokens} tokens/stream every {args.delay_ms:.0f} ms (ideal stream time {ideal:.2f}s)")
+    print(f"{'streams':>8} {'mode':>7} {'wall (s)':>9} {'vs ideal':>9} {'peak threads':>13}")
+    for streams in args.streams:
+        for mode in ("legacy", "native"):
+            elapsed, peak_threads = asyncio.run(run(mode, streams, args.tokens, delay))
+            print(f"{streams:>8} {mode:>7} {elapsed:>9.2f} {elapsed / ideal:>8.1f}x {peak_threads:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time-to-first-chart with and without the preview prefetch (PREVIEW_PREFETCH_ENABLED).
+
+Measures from the moment the QueryStore row is inserted to the moment
+/preview/data has the first page ready. In between the tool result travels
+to the frontend, which then requests the page; that round trip is
+simulated with --client-delay-ms. The result cache is cleared before every
+run so each page starts cold.
+
+Against the analytics MySQL server (queries from --sql, default a few
+aggregate queries on caraba_products):
+
+    python benchmarks/bench_time_to_first_chart.py --runs 10
+
+Without MySQL, with a fake connection that takes --query-ms per query:
+
+    python benchmarks/bench_time_to_first_chart.py --simulate --query-ms 400
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.v1.endpoints import preview as preview_endpoint
+from app.services import prefetch_service
+from app.services.prefetch_service import PreviewPrefetcher
+from app.utils.result_cache import result_cache
+
+QUERIES = [
+    "SELECT category, COUNT(*) AS total FROM products GROUP BY category ORDER BY total DESC",
+    "SELECT name, price FROM products ORDER BY price DESC",
+    "SELECT DATE(created_at) AS day, COUNT(*) AS total FROM products GROUP BY DATE(created_at) ORDER BY day",
+]
+
+
+class SimulatedConnection:
+    """Stands in for DatabaseConnection: every query sleeps, results are tiny"""
+
+    query_seconds = 0.4
+
+    def __init__(self, use_replica=False):
+        self.pool = SimpleNamespace(name="simulated")
+        self.connection = SimpleNamespace(get_server_version=lambda: (8, 0, 36), get_server_info=lambda: "8.0.36")
+
+    def connect(self):
+        pass
+
+    def get_table_versions(self):
+        return None
+
+    def execute_query_rows(self, query, raise_errors=False, timeout=None):
+        time.sleep(self.query_seconds)
+        if "COUNT(*) OVER()" in query:
+            return [("label", 253), ("total", 3), ("__total_count", 8)], [("a", 1, 2), ("b", 2, 2)]
+        return [("label", 253), ("total", 3)], [("a", 1), ("b", 2)]
+
+    def close(self, discard=False):
+        pass
+
+
+class FakeSession:
+    """Just enough of a SQLAlchemy session for preview_data to find the stored query"""
+
+    def __init__(self, query_store):
+        self.query_store = query_store
+
+    def query(self, model):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return self.query_store
+
+
+def time_to_first_chart(query_id: int, sql: str, prefetch: bool, client_delay: float) -> float:
+    result_cache.clear()
+    query_store = SimpleNamespace(
+        id=query_id, generated_sql=sql, response_type="bar_chart", display_type="bar_chart", answer_template=""
+    )
+    start = time.perf_counter()
+    if prefetch:
+        preview_endpoint.preview_prefetcher.schedule(query_id, sql, "bar_chart")
+    time.sleep(client_delay)
+    preview_endpoint.preview_data(
+        query_id, page=1, limit=preview_endpoint.preview_prefetcher.limit,
+        count=preview_endpoint.preview_prefetcher.count, paging="offset", cursor=None, format="rows",
+        db=FakeSession(query_store),
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--client-delay-ms", type=float, default=150)
+    parser.add_argument("--sql", nargs="+", default=QUERIES)
+    parser.add_argument("--simulate", action="store_true", help="use a fake connection instead of MySQL")
+    parser.add_argument("--query-ms", type=float, default=400, help="per-query latency with --simulate")
+    args = parser.parse_args()
+
+    if args.simulate:
+        SimulatedConnection.query_seconds = args.query_ms / 1000
+        preview_endpoint.DatabaseConnection = SimulatedConnection
+        prefetch_service.DatabaseConnection = SimulatedConnection
+
+    prefetcher = PreviewPrefetcher(enabled=True)
+    preview_endpoint.preview_prefetcher = prefetcher
+    client_delay = args.client_delay_ms / 1000
+
+    print(f"client delay {args.client_delay_ms:.0f} ms, {len(args.sql)} queries x {args.runs} runs")
+    print(f"{'mode':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'max (ms)':>9}")
+    query_id = 0
+    for prefetch in (False, True):
+        samples = []
+        for _ in range(args.runs):
+            for sql in args.sql:
+                query_id += 1
+                samples.append(time_to_first_chart(query_id, sql, prefetch, client_delay) * 1000)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{'prefetch' if prefetch else 'cold':>9} {statistics.median(samples):>9.1f} {p95:>9.1f} {samples[-1]:>9.1f}")
+    prefetcher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,177 @@
+import hashlib
+import os
+import threading
 import mysql.connector
 from mysql.connector import Error
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+# Load .env before the MYSQL_* settings below
+from app.core import config  # noqa: F401
+from app.core.mysql_pool import PoolTimeoutError, get_pool
+from app.core.replica_router import get_router
+from app.utils.sql_utils import with_optimizer_hint
+
+MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
+MYSQL_USER = os.getenv("MYSQL_USER", "mendol")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "mendol123")
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "caraba_products")
+
+# "bulk" reads information_schema in one or two queries, "describe" runs SHOW TABLES + DESCRIBE per table
+SCHEMA_INTROSPECTION_MODE = os.getenv("SCHEMA_INTROSPECTION_MODE", "bulk")
+SCHEMA_INCLUDE_FOREIGN_KEYS = os.getenv("SCHEMA_INCLUDE_FOREIGN_KEYS", "false").lower() in ("1", "true", "yes")
+SCHEMA_INCLUDE_INDEXES = os.getenv("SCHEMA_INCLUDE_INDEXES", "false").lower() in ("1", "true", "yes")
+# Extra seconds the server-side limit gets before the query is killed from a side connection
+QUERY_KILL_GRACE_SECONDS = float(os.getenv("QUERY_KILL_GRACE_SECONDS", "2"))
+
+# ER_QUERY_TIMEOUT (MySQL MAX_EXECUTION_TIME), ER_QUERY_INTERRUPTED (KILL QUERY), ER_STATEMENT_TIMEOUT (MariaDB)
+TIMEOUT_ERRNOS = (3024, 1317, 1969)
+
+
+class QueryTimeoutError(Exception):
+    """A query ran past its time budget and was stopped"""
+
+    def __init__(self, timeout: float, killed: bool = False):
+        self.timeout = timeout
+        self.killed = killed
+        super().__init__(f"Query exceeded its {timeout:g}s time limit")
+
+
+class QueryKillTimer:
+    """KILL QUERY on the connection's running statement after ``seconds`` unless cancelled first"""
+
+    def __init__(self, db_conn: "DatabaseConnection", seconds: float):
+        self.killed = False
+        self._db_conn = db_conn
+        self._connection_id = db_conn.connection.connection_id
+        self._done = False
+        self._lock = threading.Lock()
+        self._timer = threading.Timer(seconds, self._kill)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _kill(self):
+        with self._lock:
+            if self._done:
+                return
+            self.killed = True
+            self._db_conn._killed = True
+            self._db_conn.kill_query(self._connection_id)
+
+    def cancel(self):
+        self._timer.cancel()
+        # Waits for a kill in progress so it can't hit the next statement
+        with self._lock:
+            self._done = True
+
+
+def _to_text(value):
+    """information_schema columns may come back as bytes depending on the server/charset"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8")
+    return value
+
+
+def format_schema_text(schema_info: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Render schema_info into the DATABASE SCHEMA block used by the system prompt"""
+    schema_sections = []
+
+    for table_name, columns in schema_info.items():
+        column_details = []
+        date_columns = []
+        numeric_columns = []
+        text_columns = []
+        
+        for col in columns:
+            col_info = f"{col['Field']} ({col['Type']}"
+            if col.get('Key') == 'PRI':
+                col_info += ", PRIMARY KEY"
+            if col.get('Key') == 'UNI':
+                col_info += ", UNIQUE"
+            if col.get('Null') == 'NO':
+                col_info += ", NOT NULL"
+            if col.get('Default'):
+                col_info += f", DEFAULT: {col['Default']}"
+            if col.get('References'):
+                col_info += f", REFERENCES {col['References']}"
+            col_info += ")"
+            column_details.append(f"    • {col_info}")
+            
+            # Categorize columns for smart suggestions
+            col_type = col['Type'].lower()
+            col_name = col['Field'].lower()
+            
+            if any(date_word in col_type for date_word in ['date', 'time', 'timestamp']):
+                date_columns.append(col['Field'])
+            elif any(num_word in col_type for num_word in ['int', 'decimal', 'float', 'double', 'numeric']):
+                numeric_columns.append(col['Field'])
+            elif any(text_word in col_type for text_word in ['varchar', 'text', 'char']):
+                text_columns.append(col['Field'])
+        
+        schema_sections.append(f"  {table_name}:\n" + "\n".join(column_details))
+    schema_text = "DATABASE SCHEMA:\n" + "\n\n".join(schema_sections)
+    return schema_text
 
 
 class DatabaseConnection:
-    def __init__(self):
+    """MySQL connection borrowed from the process-wide pool; close() returns it"""
+
+    def __init__(self, use_replica: bool = False):
         self.connection = None
-        self.host = "localhost"
-        self.port = 3306
-        self.user = "mendol"
-        self.password = "mendol123"
-        self.database = "caraba_products"
+        # Set when a statement on the current connection was killed, the connection is not reused
+        self._killed = False
+        # Kill pending for an unbuffered statement, cancelled by close()
+        self._kill_timer: Optional[QueryKillTimer] = None
+        self.host = MYSQL_HOST
+        self.port = MYSQL_PORT
+        self.user = MYSQL_USER
+        self.password = MYSQL_PASSWORD
+        self.database = MYSQL_DATABASE
+        self.primary_pool = get_pool(self.host, self.port, self.user, self.password, self.database)
+        # Read-only work (generated SELECTs, introspection) may run on a replica (MYSQL_REPLICAS)
+        self.router = get_router(self.primary_pool) if use_replica else None
+        self.pool = self.router.choose(self.primary_pool) if self.router else self.primary_pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def connect(self):
-        """Establish connection to MySQL database"""
+        """Check out a connection from the pool (raises PoolTimeoutError when exhausted)"""
+        if self.connection is not None:
+            return
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-            )
-            print("Successfully connected to MySQL database!")
-        except Error as e:
+            self.connection = self.pool.acquire()
+            if self.pool is not self.primary_pool:
+                self.router.report_success(self.pool)
+        except (Error, PoolTimeoutError) as e:
+            # A replica that is down or saturated must not fail the read
+            if self.pool is not self.primary_pool:
+                print(f"Error connecting to MySQL replica {self.pool.label}, using the primary: {e}")
+                self.router.report_failure(self.pool)
+                self.pool = self.primary_pool
+                self.connect()
+                return
+            if isinstance(e, PoolTimeoutError):
+                raise
             print(f"Error connecting to MySQL database: {e}")
 
     def get_schema(self):
         """Get database schema information"""
+        if SCHEMA_INTROSPECTION_MODE == "describe":
+            return self.get_schema_describe()
+        return self.get_schema_bulk(
+            include_foreign_keys=SCHEMA_INCLUDE_FOREIGN_KEYS,
+            include_indexes=SCHEMA_INCLUDE_INDEXES,
+        )
+
+    def get_schema_describe(self):
+        """Get database schema with SHOW TABLES + one DESCRIBE per table"""
+        cursor = None
         try:
-            if not self.connection or not self.connection.is_connected():
+            if not self.connection:
                 self.connect()
 
             cursor = self.connection.cursor()
@@ -65,48 +207,176 @@ class DatabaseConnection:
             if cursor:
                 cursor.close()
     
+    def get_schema_bulk(self, include_foreign_keys: bool = False, include_indexes: bool = False):
+        """Get database schema from information_schema in one query (two with indexes).
+
+        Returns the same shape as get_schema_describe. Foreign keys are added as
+        "References" ("table(column)") and indexes as "Indexes" on each column.
+        """
+        cursor = None
+        try:
+            if not self.connection:
+                self.connect()
+
+            cursor = self.connection.cursor()
+
+            if include_foreign_keys:
+                cursor.execute(
+                    """
+                    SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE,
+                           c.COLUMN_KEY, c.COLUMN_DEFAULT, c.EXTRA,
+                           k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME
+                    FROM information_schema.COLUMNS c
+                    LEFT JOIN information_schema.KEY_COLUMN_USAGE k
+                        ON k.TABLE_SCHEMA = c.TABLE_SCHEMA
+                        AND k.TABLE_NAME = c.TABLE_NAME
+                        AND k.COLUMN_NAME = c.COLUMN_NAME
+                        AND k.REFERENCED_TABLE_NAME IS NOT NULL
+                    WHERE c.TABLE_SCHEMA = %s
+                    ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+                    """,
+                    (self.database,),
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE,
+                           COLUMN_KEY, COLUMN_DEFAULT, EXTRA
+                    FROM information_schema.COLUMNS
+                    WHERE TABLE_SCHEMA = %s
+                    ORDER BY TABLE_NAME, ORDINAL_POSITION
+                    """,
+                    (self.database,),
+                )
+            rows = cursor.fetchall()
+
+            schema_info = {}
+            columns_by_key = {}
+            for row in rows:
+                table_name, field = _to_text(row[0]), _to_text(row[1])
+                column = columns_by_key.get((table_name, field))
+                if column is None:
+                    column = {
+                        "Field": field,
+                        "Type": _to_text(row[2]),
+                        "Null": _to_text(row[3]),
+                        "Key": _to_text(row[4]),
+                        "Default": _to_text(row[5]),
+                        "Extra": _to_text(row[6]),
+                    }
+                    columns_by_key[(table_name, field)] = column
+                    schema_info.setdefault(table_name, []).append(column)
+
+                # A column with several foreign keys shows up once per constraint
+                if include_foreign_keys and row[7]:
+                    reference = f"{_to_text(row[7])}({_to_text(row[8])})"
+                    if column.get("References"):
+                        column["References"] += f", {reference}"
+                    else:
+                        column["References"] = reference
+
+            if include_indexes:
+                cursor.execute(
+                    """
+                    SELECT TABLE_NAME, COLUMN_NAME, INDEX_NAME
+                    FROM information_schema.STATISTICS
+                    WHERE TABLE_SCHEMA = %s
+                    ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+                    """,
+                    (self.database,),
+                )
+                for table_name, field, index_name in cursor.fetchall():
+                    column = columns_by_key.get((_to_text(table_name), _to_text(field)))
+                    if column is not None:
+                        column.setdefault("Indexes", []).append(_to_text(index_name))
+
+            return schema_info
+
+        except Error as e:
+            print(f"Error getting schema: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+
     def get_schema_text(self):
-        schema_sections = []
-        schema_info = self.get_schema()
-
-        for table_name, columns in schema_info.items():
-            column_details = []
-            date_columns = []
-            numeric_columns = []
-            text_columns = []
-            
-            for col in columns:
-                col_info = f"{col['Field']} ({col['Type']}"
-                if col.get('Key') == 'PRI':
-                    col_info += ", PRIMARY KEY"
-                if col.get('Key') == 'UNI':
-                    col_info += ", UNIQUE"
-                if col.get('Null') == 'NO':
-                    col_info += ", NOT NULL"
-                if col.get('Default'):
-                    col_info += f", DEFAULT: {col['Default']}"
-                col_info += ")"
-                column_details.append(f"    • {col_info}")
-                
-                # Categorize columns for smart suggestions
-                col_type = col['Type'].lower()
-                col_name = col['Field'].lower()
-                
-                if any(date_word in col_type for date_word in ['date', 'time', 'timestamp']):
-                    date_columns.append(col['Field'])
-                elif any(num_word in col_type for num_word in ['int', 'decimal', 'float', 'double', 'numeric']):
-                    numeric_columns.append(col['Field'])
-                elif any(text_word in col_type for text_word in ['varchar', 'text', 'char']):
-                    text_columns.append(col['Field'])
-            
-            schema_sections.append(f"  {table_name}:\n" + "\n".join(column_details))
-        schema_text = "DATABASE SCHEMA:\n" + "\n\n".join(schema_sections)
-        return schema_text
+        return format_schema_text(self.get_schema())
 
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
-        """Execute a SELECT query and return results"""
+    def get_schema_fingerprint(self) -> Optional[str]:
+        """Cheap hash of table names and CREATE_TIME/UPDATE_TIME from information_schema"""
+        cursor = None
         try:
-            if not self.connection or not self.connection.is_connected():
+            if not self.connection:
+                self.connect()
+
+            cursor = self.connection.cursor()
+            try:
+                # MySQL 8 caches TABLES statistics for 24h by default, bypass it for this session
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            except Error:
+                pass
+
+            cursor.execute(
+                "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME",
+                (self.database,),
+            )
+            rows = cursor.fetchall()
+            return hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()
+
+        except Error as e:
+            print(f"Error getting schema fingerprint: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_table_versions(self) -> Optional[Dict[str, Any]]:
+        """Per-table (CREATE_TIME, UPDATE_TIME) plus the server clock, for result cache invalidation.
+
+        Returns {"schema", "server_now", "tables": {lower name: version}}; views
+        get version None since their UPDATE_TIME says nothing about the data.
+        """
+        cursor = None
+        try:
+            if not self.connection:
+                self.connect()
+
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            except Error:
+                pass
+
+            cursor.execute(
+                "SELECT TABLE_NAME, TABLE_TYPE, CREATE_TIME, UPDATE_TIME, NOW() FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = %s",
+                (self.database,),
+            )
+            rows = cursor.fetchall()
+            tables = {
+                _to_text(name).lower(): None if "VIEW" in _to_text(table_type) else (created, updated)
+                for name, table_type, created, updated, _ in rows
+            }
+            if rows:
+                server_now = rows[0][4]
+            else:
+                cursor.execute("SELECT NOW()")
+                server_now = cursor.fetchone()[0]
+            return {"schema": self.database, "server_now": server_now, "tables": tables}
+
+        except Error as e:
+            print(f"Error getting table versions: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+
+    def execute_query(self, query: str, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """Execute a SELECT query and return results (None on error unless raise_errors)"""
+        cursor = None
+        try:
+            if not self.connection:
                 self.connect()
 
             cursor = self.connection.cursor(dictionary=True)
@@ -116,16 +386,112 @@ class DatabaseConnection:
 
         except Error as e:
             print(f"Error executing query: {e}")
+            if raise_errors:
+                raise
             return None
         finally:
             if cursor:
                 cursor.close()
 
-    def close(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("Database connection closed.")
+    def with_time_limit(self, query: str, timeout: float) -> str:
+        """Add the server-side execution time limit to a SELECT (hint on MySQL, SET STATEMENT on MariaDB)"""
+        if "mariadb" in (self.connection.get_server_info() or "").lower():
+            return f"SET STATEMENT max_statement_time={timeout:g} FOR {query}"
+        return with_optimizer_hint(query, f"MAX_EXECUTION_TIME({max(int(timeout * 1000), 1)})")
+
+    def kill_query(self, connection_id: int):
+        """KILL QUERY on a separate connection (the pool may be exhausted, so not from the pool)"""
+        side = None
+        try:
+            side = mysql.connector.connect(**self.pool.connect_kwargs, connection_timeout=5)
+            cursor = side.cursor()
+            cursor.execute(f"KILL QUERY {int(connection_id)}")
+            cursor.close()
+        except Error as e:
+            print(f"Error killing query {connection_id}: {e}")
+        finally:
+            if side is not None:
+                side.close()
+
+    def execute_query_rows(
+        self, query: str, raise_errors: bool = False, timeout: Optional[float] = None
+    ) -> Optional[Tuple[List[tuple], List[tuple]]]:
+        """Execute a SELECT query and return (cursor.description, row tuples), no per-row dicts.
+
+        With ``timeout`` the server stops the statement after that many
+        seconds, and QUERY_KILL_GRACE_SECONDS later it is killed from a side
+        connection; both raise QueryTimeoutError (when raise_errors is set).
+        """
+        cursor = None
+        timer = None
+        try:
+            if not self.connection:
+                self.connect()
+
+            if timeout:
+                query = self.with_time_limit(query, timeout)
+                timer = QueryKillTimer(self, timeout + QUERY_KILL_GRACE_SECONDS)
+
+            cursor = self.connection.cursor()
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            return list(cursor.description or []), rows
+
+        except Error as e:
+            print(f"Error executing query: {e}")
+            killed = timer is not None and timer.killed
+            if timeout and (killed or e.errno in TIMEOUT_ERRNOS):
+                if raise_errors:
+                    raise QueryTimeoutError(timeout, killed=killed) from e
+                return None
+            if raise_errors:
+                raise
+            return None
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if cursor:
+                try:
+                    cursor.close()
+                except Error:
+                    pass
+
+    def execute_unbuffered(self, query: str, timeout: Optional[float] = None):
+        """Execute a SELECT on an unbuffered cursor and return the cursor (raises on error).
+
+        Rows stay on the server until fetched, so fetchmany keeps memory flat
+        regardless of result size. The caller closes the cursor; if it stops
+        before the last row the connection must be released with close(discard=True).
+        With ``timeout`` the statement, streaming included, gets the same
+        server-side limit and kill as execute_query_rows; a fetch past it
+        raises an Error with an errno in TIMEOUT_ERRNOS. close() cancels the kill.
+        """
+        if not self.connection:
+            self.connect()
+
+        if timeout:
+            query = self.with_time_limit(query, timeout)
+            self._kill_timer = QueryKillTimer(self, timeout + QUERY_KILL_GRACE_SECONDS)
+        cursor = self.connection.cursor(buffered=False)
+        try:
+            cursor.execute(query)
+        except Error:
+            try:
+                cursor.close()
+            except Error:
+                pass
+            raise
+        return cursor
+
+    def close(self, discard: bool = False):
+        """Return the connection to the pool (discard closes it instead)"""
+        if self._kill_timer is not None:
+            self._kill_timer.cancel()
+            self._kill_timer = None
+        if self.connection:
+            self.pool.release(self.connection, discard=discard or self._killed)
+            self.connection = None
+            self._killed = False
 
 
 # Example usage
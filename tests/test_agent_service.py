@@ -0,0 +1,74 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agents")
+
+from app.services import agent_service as agent_service_module
+from app.services.agent_service import AgentService, StoredQuery
+
+
+class FakeSession:
+    """Fails if two threads use it at the same time, like a real Session would corrupt its state"""
+
+    ids = iter(range(1, 100))
+
+    def __init__(self):
+        self.users = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.added = []
+
+    def _use(self):
+        with self.lock:
+            self.users += 1
+            assert self.users == 1, "session used by two threads at once"
+        time.sleep(0.05)
+        with self.lock:
+            self.users -= 1
+
+    def add(self, instance):
+        self.added.append(instance)
+
+    def commit(self):
+        self._use()
+
+    def refresh(self, instance):
+        self._use()
+        instance.id = next(self.ids)
+
+    def close(self):
+        self.closed = True
+
+
+def test_concurrent_store_query_calls_do_not_share_a_session(monkeypatch):
+    sessions = []
+
+    def session_factory():
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    async def fake_generate(question, user_id):
+        return {"generated_sql": f"SELECT '{question}'", "response_type": "table"}
+
+    request_db = SimpleNamespace()
+    monkeypatch.setattr(agent_service_module, "SessionLocal", session_factory)
+    monkeypatch.setattr(agent_service_module, "agenerate_sql_from_natural_language", fake_generate)
+    monkeypatch.setattr(agent_service_module.preview_prefetcher, "schedule", lambda *args: None)
+    service = AgentService(request_db, SimpleNamespace(id=7))
+
+    async def both():
+        return await asyncio.gather(service.store_query("produk"), service.store_query("stok"))
+
+    results = [json.loads(output) for output in asyncio.run(both())]
+
+    assert [result["status"] for result in results] == ["success", "success"]
+    assert len(sessions) == 2 and all(session.closed and len(session.added) == 1 for session in sessions)
+    assert vars(request_db) == {}
+    # Inline previews get plain values, not ORM instances bound to a session
+    assert sorted(stored.generated_sql for stored in service._stored_queries.values()) == ["SELECT 'produk'", "SELECT 'stok'"]
+    assert all(type(stored) is StoredQuery for stored in service._stored_queries.values())
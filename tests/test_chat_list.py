@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.chat import Chat
+from app.models.user import User
+from app.repositories.chat_repository import InvalidChatCursorError, get_chats_page_by_user
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Chat.__table__])
+    session = sessionmaker(bind=engine)()
+    for user_id in (1, 2):
+        session.add(User(id=user_id, full_name="u", email=f"u{user_id}@example.com", username=f"u{user_id}", hashed_password="x"))
+    start = datetime.datetime(2025, 1, 1, 12, 0, 0)
+    for i in range(23):
+        # Pairs of messages share a timestamp, like a question and an answer saved in one request
+        session.add(Chat(type="user", content=f"m{i}", user_id=1, created_at=start + datetime.timedelta(seconds=i // 2)))
+    session.add(Chat(type="user", content="other", user_id=2, created_at=start))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_pages_cover_history_newest_first(db):
+    seen, before = [], None
+    while True:
+        chats, before = get_chats_page_by_user(db, 1, limit=5, before=before)
+        seen.extend(chat.content for chat in chats)
+        if before is None:
+            break
+    assert seen == [f"m{i}" for i in reversed(range(23))]
+
+
+def test_exact_fit_has_no_next_page(db):
+    chats, before = get_chats_page_by_user(db, 2, limit=1)
+    assert [chat.content for chat in chats] == ["other"] and before is None
+
+
+def test_invalid_cursor(db):
+    with pytest.raises(InvalidChatCursorError):
+        get_chats_page_by_user(db, 1, limit=5, before="not-a-cursor")
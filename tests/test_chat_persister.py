@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.chat import Chat
+from app.models.user import User
+from app.repositories.chat_repository import get_last_chats_by_user
+from app.services.chat_persister import ChatPersister
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, Chat.__table__])
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(User(id=1, full_name="u", email="u@example.com", username="u", hashed_password="x"))
+        db.commit()
+    return factory
+
+
+def test_batched_messages_are_bulk_inserted_on_flush(session_factory):
+    writes = []
+    persister = ChatPersister(mode="batched", batch_size=50, flush_interval=60, session_factory=session_factory)
+    original_write = persister._write
+    persister._write = lambda batch: writes.append(len(batch)) or original_write(batch)
+
+    with session_factory() as db:
+        for i in range(5):
+            persister.save(db, 1, "user" if i % 2 == 0 else "assistant", f"m{i}")
+        assert db.query(Chat).count() == 0
+
+        assert persister.flush(timeout=5)
+        assert writes == [5]
+        assert [chat.content for chat in get_last_chats_by_user(db, 1, limit=3)] == ["m4", "m3", "m2"]
+    persister.shutdown()
+
+
+def test_size_threshold_and_shutdown_write_everything(session_factory):
+    persister = ChatPersister(mode="batched", batch_size=4, flush_interval=60, session_factory=session_factory)
+    with session_factory() as db:
+        for i in range(10):
+            persister.save(db, 1, "user", f"m{i}")
+        persister.shutdown()
+        assert db.query(Chat).count() == 10
+
+        # After shutdown messages are written inline
+        persister.save(db, 1, "user", "late")
+        assert db.query(Chat).count() == 11
+
+
+def test_full_queue_falls_back_to_sync_write(session_factory):
+    persister = ChatPersister(mode="batched", max_queue=1, flush_interval=60, session_factory=session_factory)
+    blocked = threading.Event()
+    persister._write = lambda batch: blocked.wait(5)
+    with session_factory() as db:
+        for i in range(4):
+            persister.save(db, 1, "user", f"m{i}")
+        # The worker holds one message and one is queued, the rest were saved synchronously
+        assert db.query(Chat).count() >= 2
+    blocked.set()
+    persister.shutdown(timeout=5)
@@ -0,0 +1,28 @@
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_settings_in_dotenv_reach_modules_imported_after_config(tmp_path):
+    (tmp_path / ".env").write_text("MYSQL_POOL_SIZE=7\nQUERY_KILL_GRACE_SECONDS=9\n")
+    env = {key: value for key, value in os.environ.items() if key not in ("MYSQL_POOL_SIZE", "QUERY_KILL_GRACE_SECONDS")}
+    env["PYTHONPATH"] = ROOT
+
+    output = subprocess.run(
+        [sys.executable, "-c", "import db_connection; from app.core import mysql_pool; "
+         "print(mysql_pool.MYSQL_POOL_SIZE, db_connection.QUERY_KILL_GRACE_SECONDS)"],
+        cwd=tmp_path, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+
+    assert output.split() == ["7", "9.0"]
+
+
+def test_main_loads_config_before_anything_else():
+    with open(os.path.join(ROOT, "app", "main.py"), encoding="utf-8") as main_file:
+        first_import = ast.parse(main_file.read()).body[0]
+
+    assert isinstance(first_import, ast.ImportFrom)
+    assert (first_import.module, first_import.names[0].name) == ("app.core", "config")
@@ -0,0 +1,45 @@
+from app.utils.conversation_cache import ConversationCache
+
+
+def test_window_is_hydrated_once_then_follows_appends():
+    cache = ConversationCache(window=3, max_users=10, ttl=60)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [("user", "q1"), ("assistant", "a1")]
+
+    assert cache.get(1, load) == [("user", "q1"), ("assistant", "a1")]
+    cache.append(1, "user", "q2")
+    cache.append(1, "assistant", "a2" + "x" * 500)
+    window = cache.get(1, load)
+    assert [content[:2] for _, content in window] == ["a1", "q2", "a2"]
+    assert len(window[-1][1]) == 150
+    assert len(loads) == 1
+
+    cache.invalidate(1)
+    cache.get(1, load)
+    assert len(loads) == 2
+
+
+def test_append_during_hydration_discards_the_stale_read():
+    cache = ConversationCache(window=8, max_users=10, ttl=60)
+
+    def load():
+        # A message is saved after the read started
+        cache.append(1, "user", "q2")
+        return [("user", "q1")]
+
+    assert cache.get(1, load) == [("user", "q1")]
+    assert cache.get(1, lambda: [("user", "q1"), ("user", "q2")]) == [("user", "q1"), ("user", "q2")]
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_users_are_dropped():
+    cache = ConversationCache(window=2, max_users=2, ttl=60)
+    for user_id in (1, 2):
+        cache.get(user_id, lambda: [("user", "hi")])
+    cache.get(1, lambda: [])
+    cache.get(3, lambda: [])
+    assert cache.stats()["users"] == 2
+    assert cache.get(2, lambda: [("user", "reloaded")]) == [("user", "reloaded")]
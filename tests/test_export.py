@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from mysql.connector import Error
+
+from app.services.export_service import QueryExport
+
+
+class FakeCursor:
+    description = [("id",), ("price",)]
+
+    def __init__(self, total: int):
+        self.remaining = [(i, Decimal("1.50")) for i in range(total)]
+        self.fetch_sizes = []
+        self.closed = False
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        batch, self.remaining = self.remaining[:size], self.remaining[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDatabaseConnection:
+    def __init__(self, total: int):
+        self.cursor = FakeCursor(total)
+        self.released = None
+        self.timeout = None
+
+    def execute_unbuffered(self, query, timeout=None):
+        self.timeout = timeout
+        return self.cursor
+
+    def close(self, discard=False):
+        self.released = "discarded" if discard else "returned"
+
+
+def test_ndjson_export_streams_in_batches():
+    db_conn = FakeDatabaseConnection(total=25)
+    lines = b"".join(QueryExport("SELECT 1", "ndjson", batch_size=10, db_conn=db_conn)).decode().splitlines()
+
+    assert json.loads(lines[0]) == {"id": 0, "price": 1.5}
+    assert len(lines) == 26
+    assert json.loads(lines[-1]) == {"__export__": {"rows": 25, "complete": True}}
+    assert max(db_conn.cursor.fetch_sizes) == 10
+    assert db_conn.released == "returned"
+
+
+def test_export_stops_at_max_rows_and_discards_connection():
+    db_conn = FakeDatabaseConnection(total=100)
+    lines = b"".join(QueryExport("SELECT 1", "ndjson", batch_size=10, max_rows=15, db_conn=db_conn)).decode().splitlines()
+
+    assert len(lines) == 16
+    assert json.loads(lines[-1])["__export__"] == {"rows": 15, "complete": False, "reason": "max_rows"}
+    assert db_conn.released == "discarded"
+
+
+def test_csv_export_has_header():
+    db_conn = FakeDatabaseConnection(total=3)
+    rows = list(csv.reader(io.StringIO(b"".join(QueryExport("SELECT 1", "csv", db_conn=db_conn)).decode())))
+
+    assert rows == [["id", "price"], ["0", "1.50"], ["1", "1.50"], ["2", "1.50"]]
+
+
+def test_abandoned_export_releases_connection():
+    db_conn = FakeDatabaseConnection(total=100)
+    export = QueryExport("SELECT 1", "ndjson", batch_size=10, db_conn=db_conn)
+    chunks = iter(export)
+    next(chunks)
+    export.close()
+
+    assert db_conn.cursor.closed
+    assert db_conn.released == "discarded"
+
+
+def test_export_stopped_by_the_server_time_limit():
+    db_conn = FakeDatabaseConnection(total=100)
+    fetchmany = db_conn.cursor.fetchmany
+
+    def slow_fetchmany(size):
+        if db_conn.cursor.fetch_sizes:
+            raise Error(msg="Query execution was interrupted", errno=1317)
+        return fetchmany(size)
+
+    db_conn.cursor.fetchmany = slow_fetchmany
+    lines = b"".join(QueryExport("SELECT 1", "ndjson", batch_size=10, max_seconds=30, db_conn=db_conn)).decode().splitlines()
+
+    assert db_conn.timeout == 30
+    assert json.loads(lines[-1])["__export__"] == {"rows": 10, "complete": False, "reason": "max_seconds"}
+    assert db_conn.released == "discarded"
@@ -0,0 +1,72 @@
+import threading
+
+from app.services import intent_router as intent_router_module
+from app.services.intent_router import IntentRouter, NaiveBayesClassifier
+
+
+def make_router(monkeypatch, mode="rules"):
+    monkeypatch.setattr(IntentRouter, "schema_terms", lambda self: {"brand", "warehouse"})
+    monkeypatch.setattr(intent_router_module, "INTENT_ROUTER_LOG_PATH", "")
+    return IntentRouter(mode=mode, threshold=0.85)
+
+
+def test_rules_route_obvious_data_questions_to_sql(monkeypatch):
+    router = make_router(monkeypatch)
+
+    assert router.route("berapa total stock semua produk?").route == "sql"
+    assert router.route("tampilkan 5 produk termahal").route == "sql"
+    assert router.route("list warehouse").route == "sql"
+
+
+def test_rules_keep_small_talk_and_follow_ups_on_the_agent(monkeypatch):
+    router = make_router(monkeypatch)
+
+    assert router.route("halo, selamat pagi").route == "agent"
+    assert router.route("saya bisa nanya apa aja?").route == "agent"
+    assert router.route("tampilkan produk yang kedua tadi").route == "agent"
+    # A verb without anything to count is not confident enough
+    decision = router.route("berapa umur kamu?")
+    assert decision.route == "agent"
+    assert decision.details["fallback"]
+
+
+def test_classifier_scores_questions_like_its_training_data():
+    classifier = NaiveBayesClassifier().fit([
+        ("berapa jumlah produk aktif", "sql"),
+        ("tampilkan penjualan bulan ini", "sql"),
+        ("halo apa kabar", "agent"),
+        ("terima kasih banyak", "agent"),
+    ])
+
+    assert classifier.predict_proba("berapa jumlah penjualan") > 0.5
+    assert classifier.predict_proba("halo terima kasih") < 0.5
+
+
+def test_follow_ups_and_small_talk_veto_every_mode(monkeypatch):
+    always_sql = NaiveBayesClassifier().fit([("yang kemarin bagaimana", "sql"), ("halo", "sql"), ("x", "agent")])
+    for mode, threshold in (("classifier", 0.85), ("hybrid", 0.95)):
+        router = make_router(monkeypatch, mode=mode)
+        router.threshold = threshold
+        monkeypatch.setattr(router, "classifier", lambda: always_sql)
+
+        for question in ("yang kemarin bagaimana?", "halo"):
+            decision = router.route(question)
+            assert (decision.route, decision.source) == ("agent", "rules"), (mode, question)
+
+
+def test_first_classifier_call_does_not_wait_for_training(monkeypatch):
+    release = threading.Event()
+
+    def slow_samples():
+        release.wait(5)
+        return [("berapa jumlah produk", "sql"), ("halo apa kabar", "agent")]
+
+    monkeypatch.setattr(intent_router_module, "load_training_samples", slow_samples)
+    router = make_router(monkeypatch, mode="classifier")
+
+    # Untrained: answered right away, on the agent
+    assert router.classifier() is None
+    assert router.route("rekap omzet minggu ini").source == "untrained"
+    release.set()
+    router._training_thread.join(5)
+    assert router.classifier() is not None
@@ -0,0 +1,26 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import dependencies_auth
+from app.api.v1.endpoints import metrics as metrics_endpoint
+from app.core.mysql_pool import MySQLConnectionPool
+
+
+def test_metrics_need_a_logged_in_user():
+    app = FastAPI()
+    app.include_router(metrics_endpoint.router)
+    client = TestClient(app)
+
+    assert client.get("/metrics").status_code == 401
+
+    app.dependency_overrides[dependencies_auth.get_current_user] = lambda: object()
+    assert client.get("/metrics").status_code == 200
+
+
+def test_pool_label_leaves_out_the_mysql_user():
+    pool = MySQLConnectionPool(
+        "reader@db.internal:3306/shop",
+        {"host": "db.internal", "port": 3306, "user": "reader", "password": "secret", "database": "shop"},
+    )
+
+    assert pool.label == "db.internal:3306/shop"
@@ -0,0 +1,48 @@
+import pytest
+
+from app.core import mysql_pool
+from app.core.mysql_pool import MySQLConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    unread_result = False
+
+    def __init__(self):
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(mysql_pool.mysql.connector, "connect", lambda **kwargs: FakeConnection())
+    return MySQLConnectionPool("test", {}, pool_size=1, max_overflow=1, timeout=0.05, recycle=0)
+
+
+def test_connections_are_reused(pool):
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.stats()["created"] == 1
+
+
+def test_overflow_connections_are_closed_on_release(pool):
+    first, second = pool.acquire(), pool.acquire()
+    assert pool.stats()["utilization"] == 1.0
+
+    pool.release(first)
+    pool.release(second)
+    assert second.closed
+    assert pool.stats()["open"] == 1
+
+
+def test_checkout_times_out_when_exhausted(pool):
+    pool.acquire()
+    pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
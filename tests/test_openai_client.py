@@ -0,0 +1,48 @@
+import asyncio
+import os
+
+from app.utils import openai as openai_module
+from app.utils.openai import OpenAIClientManager
+
+
+def make_manager(monkeypatch, tmp_path, key="sk-first"):
+    env_file = tmp_path / ".env"
+    env_file.write_text(f"OPENAI_API_KEY={key}\n")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-from-process")
+    monkeypatch.setattr(openai_module, "OPENAI_ENV_CHECK_SECONDS", 0)
+    return OpenAIClientManager(env_path=str(env_file)), env_file
+
+
+def test_rotated_key_in_env_file_rebuilds_and_closes_the_client(monkeypatch, tmp_path):
+    manager, env_file = make_manager(monkeypatch, tmp_path)
+
+    first = manager.get_client()
+    assert first.api_key == "sk-first"
+    assert manager.get_client() is first
+
+    env_file.write_text("OPENAI_API_KEY=sk-second\n")
+    mtime = os.stat(env_file).st_mtime + 10
+    os.utime(env_file, (mtime, mtime))
+
+    second = manager.get_client()
+    assert second.api_key == "sk-second"
+    assert first.is_closed()
+    assert not second.is_closed()
+
+
+def test_async_clients_are_reused_per_loop_and_closed_with_it(monkeypatch, tmp_path):
+    manager, _ = make_manager(monkeypatch, tmp_path)
+
+    async def get_twice():
+        return manager.get_async_client(), manager.get_async_client()
+
+    first, again = asyncio.run(get_twice())
+    assert first is again
+
+    second, _ = asyncio.run(get_twice())
+    assert second is not first
+    # The first loop is gone, its client was closed when the second one was created
+    assert first.is_closed()
+
+    outside = manager.get_async_client()
+    assert manager.get_async_client() is outside
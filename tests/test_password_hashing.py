@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.password_hashing import AuthBusyError, PasswordHasher, pwd_context
+
+
+def test_hash_and_verify_on_worker_process():
+    hasher = PasswordHasher(workers=1, max_concurrency=2, queue_timeout=30)
+
+    async def run():
+        hashed = await hasher.hash("rahasia")
+        return hashed, await hasher.verify("rahasia", hashed), await hasher.verify("salah", hashed)
+
+    try:
+        hashed, ok, wrong = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert ok and not wrong
+    assert pwd_context.verify("rahasia", hashed)
+
+
+def test_admission_rejects_after_queue_timeout():
+    hasher = PasswordHasher(workers=0, max_concurrency=1, queue_timeout=0.05)
+
+    async def run():
+        slow = asyncio.create_task(hasher._run("verify", time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AuthBusyError):
+            await hasher._run("verify", time.sleep, 0)
+        await slow
+        # Admitted again once the slot is free
+        await hasher._run("verify", time.sleep, 0)
+
+    asyncio.run(run())
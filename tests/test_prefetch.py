@@ -0,0 +1,105 @@
+import threading
+from types import SimpleNamespace
+
+from app.services import prefetch_service
+from app.services.prefetch_service import PreviewPrefetcher
+from app.services.preview_service import count_cache
+
+
+class FakeDatabaseConnection:
+    """First-page answers that block until the test releases them"""
+
+    queries = []
+    release = threading.Event()
+    fail = False
+
+    def __init__(self, use_replica=False):
+        self.pool = SimpleNamespace(name="fake-prefetch")
+        self.connection = SimpleNamespace(get_server_version=lambda: (5, 7, 44), get_server_info=lambda: "5.7.44")
+
+    def connect(self):
+        pass
+
+    def get_table_versions(self):
+        return None
+
+    def execute_query_rows(self, query, raise_errors=False, timeout=None):
+        self.queries.append(query)
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("boom")
+        if query.startswith("SELECT COUNT(*)"):
+            return [("total_count", 8)], [(42,)]
+        return [("name", 253), ("total", 3)], [("a", 1), ("b", 2)]
+
+    def close(self, discard=False):
+        pass
+
+
+def make_prefetcher(monkeypatch, fail=False):
+    monkeypatch.setattr(prefetch_service, "DatabaseConnection", FakeDatabaseConnection)
+    FakeDatabaseConnection.queries = []
+    FakeDatabaseConnection.release = threading.Event()
+    FakeDatabaseConnection.fail = fail
+    count_cache.clear()
+    return PreviewPrefetcher(enabled=True, limit=2, workers=1, count="cached", wait=5)
+
+
+def test_endpoint_joins_inflight_prefetch(monkeypatch):
+    prefetcher = make_prefetcher(monkeypatch)
+    assert prefetcher.schedule(7, "SELECT name, total FROM sales", "bar_chart")
+
+    # Another limit is a different request
+    assert prefetcher.join(7, "SELECT name, total FROM sales", prefetcher.kind("bar_chart", 10, "cached")) == (False, None)
+
+    FakeDatabaseConnection.release.set()
+    joined, result = prefetcher.join(7, "SELECT name, total FROM sales", prefetcher.kind("bar_chart", 2, "cached"))
+    assert joined
+    assert result["rows"].as_dicts() == [{"name": "a", "total": 1}, {"name": "b", "total": 2}]
+    assert result["total"] == 42
+    # Handed out once
+    assert prefetcher.join(7, "SELECT name, total FROM sales", prefetcher.kind("bar_chart", 2, "cached")) == (False, None)
+    prefetcher.shutdown()
+    assert prefetcher.stats()["pending"] == 0
+
+
+def test_failed_prefetch_falls_back(monkeypatch):
+    prefetcher = make_prefetcher(monkeypatch, fail=True)
+    prefetcher.schedule(8, "SELECT name FROM sales", "sentence")
+    FakeDatabaseConnection.release.set()
+
+    assert prefetcher.join(8, "SELECT name FROM sales", prefetcher.kind("sentence")) == (False, None)
+    prefetcher.shutdown()
+
+
+def test_schedule_respects_pending_limit(monkeypatch):
+    prefetcher = make_prefetcher(monkeypatch)
+    prefetcher.max_pending = 1
+
+    assert prefetcher.schedule(1, "SELECT name FROM sales", "table")
+    assert not prefetcher.schedule(2, "SELECT name FROM sales", "table")
+    assert not prefetcher.schedule(3, "SELECT name FROM sales", "unknown")
+    FakeDatabaseConnection.release.set()
+    prefetcher.shutdown()
+
+
+def test_inline_preview_uses_prefetch_and_size_cap(monkeypatch):
+    prefetcher = make_prefetcher(monkeypatch)
+    monkeypatch.setattr(prefetch_service, "preview_prefetcher", prefetcher)
+    FakeDatabaseConnection.release.set()
+    query_store = SimpleNamespace(
+        id=9, generated_sql="SELECT name, total FROM sales", response_type="pie_chart",
+        display_type="pie_chart", answer_template="",
+    )
+
+    prefetcher.schedule(query_store.id, query_store.generated_sql, query_store.response_type)
+    preview = prefetch_service.build_inline_preview(query_store, max_bytes=4096)
+    assert preview == {
+        "response_type": "pie_chart", "display_type": "pie_chart", "page": 1, "limit": 2, "total": 42,
+        "data": [{"name": "a", "total": 1}, {"name": "b", "total": 2}],
+    }
+    # Two queries (page + count) from the prefetch, none from the inline preview
+    assert len(FakeDatabaseConnection.queries) == 2
+
+    assert prefetch_service.build_inline_preview(query_store, max_bytes=64) is None
+    prefetcher.shutdown()
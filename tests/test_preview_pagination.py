@@ -0,0 +1,198 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import preview_service
+from app.services.preview_service import InvalidCursorError, PreviewService, QueryRows, count_cache
+from app.utils.result_cache import result_cache
+from app.utils.sql_utils import KeysetPlan, SelectShape
+
+
+class FakeDatabaseConnection:
+    """Answers page queries from an in-memory result, records every statement"""
+
+    def __init__(self, total: int, version=(8, 0, 36)):
+        self.rows = [{"id": i} for i in range(total)]
+        self.queries = []
+        self.connection = SimpleNamespace(get_server_version=lambda: version, get_server_info=lambda: "8.0.36")
+        self.pool = SimpleNamespace(name=f"fake-{version}")
+
+    def connect(self):
+        pass
+
+    def get_table_versions(self):
+        return None
+
+    def execute_query_rows(self, query, raise_errors=False, timeout=None):
+        self.queries.append(query)
+        if query.startswith("SELECT COUNT(*) AS total_count"):
+            return [("total_count", 8)], [(len(self.rows),)]
+        limit, offset = [int(part) for part in query.rsplit("LIMIT", 1)[1].split("OFFSET")]
+        rows = [(row["id"],) for row in self.rows[offset:offset + limit]]
+        if "COUNT(*) OVER()" in query:
+            return [("id", 3), ("__total_count", 8)], [row + (len(self.rows),) for row in rows]
+        return [("id", 3)], rows
+
+
+class SqliteDatabaseConnection:
+    """Runs the generated SQL for real (SQLite understands the keyset queries on integer keys)"""
+
+    def __init__(self, rows: int):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price INTEGER, category INTEGER)")
+        self.connection.executemany(
+            "INSERT INTO products VALUES (?, ?, ?, ?)",
+            [(i, f"product {i}", (i * 7) % 5, i % 3) for i in range(1, rows + 1)],
+        )
+        self.pool = SimpleNamespace(name="sqlite")
+        self.queries = []
+
+    def connect(self):
+        pass
+
+    def get_table_versions(self):
+        return None
+
+    def execute_query_rows(self, query, raise_errors=False, timeout=None):
+        self.queries.append(query)
+        cursor = self.connection.execute(query)
+        return [(column[0], 253) for column in cursor.description], [tuple(row) for row in cursor.fetchall()]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    count_cache.clear()
+    result_cache.clear()
+    preview_service._window_support.clear()
+
+
+def test_shape_ignores_nested_keywords():
+    shape = SelectShape("SELECT COUNT(DISTINCT a) FROM (SELECT a FROM t LIMIT 5) x WHERE b = 'union' ORDER BY 1;")
+    assert shape.simple
+    assert shape.limit is None
+    assert "COUNT(DISTINCT a) \n, 1 AS one\nFROM (SELECT" in shape.with_column("1 AS one")
+
+
+def test_shape_keeps_original_limit_as_bound():
+    shape = SelectShape("SELECT name FROM products ORDER BY price DESC LIMIT 5")
+    assert (shape.limit, shape.offset) == (5, 0)
+    assert shape.paginate(3, 3).endswith("ORDER BY price DESC\nLIMIT 2 OFFSET 3")
+    assert shape.paginate(3, 6) is None
+    assert shape.clamp_total(100) == 5
+
+
+def test_union_and_distinct_are_not_simple():
+    assert not SelectShape("SELECT a FROM t UNION SELECT a FROM u").simple
+    assert not SelectShape("SELECT DISTINCT a FROM t").simple
+
+
+def test_first_page_uses_one_query_with_window_count():
+    db_conn = FakeDatabaseConnection(total=25)
+    result = PreviewService(db_conn).page("SELECT id FROM t", page=1, limit=10)
+
+    assert result["total"] == 25
+    assert result["count_strategy"] == "window"
+    assert result["rows"].columns == ["id"]
+    assert len(db_conn.queries) == 1
+
+
+def test_later_pages_reuse_the_count():
+    db_conn = FakeDatabaseConnection(total=25)
+    service = PreviewService(db_conn)
+    service.page("SELECT id FROM t", page=1, limit=10)
+    result = service.page("SELECT id FROM t", page=2, limit=10)
+
+    assert result["total"] == 25
+    assert result["count_strategy"] == "cached"
+    assert "OVER()" not in db_conn.queries[-1]
+    assert len(db_conn.queries) == 2
+
+
+def test_old_servers_fall_back_to_count_query():
+    db_conn = FakeDatabaseConnection(total=25, version=(5, 7, 44))
+    result = PreviewService(db_conn).page("SELECT id FROM t", page=1, limit=10)
+
+    assert result["total"] == 25
+    assert result["count_strategy"] == "cached"
+    assert db_conn.queries[-1].startswith("SELECT COUNT(*) AS total_count")
+
+
+def test_short_page_needs_no_count():
+    db_conn = FakeDatabaseConnection(total=4, version=(5, 7, 44))
+    result = PreviewService(db_conn).page("SELECT id FROM t", page=1, limit=10, count="skip")
+
+    assert result["total"] == 4
+    assert len(db_conn.queries) == 1
+
+
+def test_keyset_plan_adds_primary_key_tiebreaker():
+    plan = KeysetPlan.build(SelectShape("SELECT name, price FROM products p ORDER BY price DESC"), lambda table: ["id"])
+
+    assert plan.keys == [("price", True), ("__keyset_0", False)]
+    assert "`p`.`id` AS __keyset_0" in plan.inner_sql
+    assert "ORDER BY" not in plan.inner_sql
+
+
+def test_keyset_plan_needs_a_unique_ordering():
+    joined = SelectShape("SELECT p.name FROM products p JOIN categories c ON c.id = p.category_id ORDER BY p.name")
+    assert KeysetPlan.build(joined, lambda table: ["id"]) is None
+    assert KeysetPlan.build(SelectShape("SELECT name FROM products"), lambda table: []) is None
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT name FROM products ORDER BY RAND()",
+    "SELECT name, RAND() AS r FROM products ORDER BY r",
+    "SELECT name, price FROM products ORDER BY DATEDIFF(NOW(), created_at), price",
+    "SELECT name, UUID() FROM products ORDER BY 2",
+    "SELECT name FROM products ORDER BY TIMESTAMPDIFF(SECOND, created_at, CURRENT_TIMESTAMP)",
+])
+def test_keyset_plan_rejects_nondeterministic_ordering(sql):
+    assert KeysetPlan.build(SelectShape(sql), lambda table: ["id"]) is None
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT name, price FROM products ORDER BY price DESC",
+    "SELECT * FROM products WHERE category > 0",
+    "SELECT category, COUNT(*) AS total FROM products GROUP BY category ORDER BY total DESC",
+    "SELECT name, price FROM products ORDER BY price LIMIT 17",
+])
+def test_cursor_pages_match_full_result(monkeypatch, sql):
+    monkeypatch.setattr(preview_service, "primary_key", lambda table: ["id"])
+    db_conn = SqliteDatabaseConnection(rows=53)
+    service = PreviewService(db_conn)
+
+    pages, cursor = [], None
+    while True:
+        result = service.cursor_page(sql, cursor, limit=10, count="skip")
+        assert result["paging"] == "keyset"
+        pages.extend(result["rows"].as_dicts())
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+        assert "OFFSET" not in db_conn.queries[-1]
+
+    plan = KeysetPlan.build(SelectShape(sql), lambda table: ["id"])
+    shape = SelectShape(sql)
+    expected = QueryRows(*db_conn.execute_query_rows(plan.page_sql(shape.limit or 1000)))
+    expected.drop(plan.hidden)
+    expected = expected.as_dicts()
+    assert pages == expected
+    assert result["total"] == len(expected)
+
+
+def test_cursor_from_another_query_is_rejected(monkeypatch):
+    monkeypatch.setattr(preview_service, "primary_key", lambda table: ["id"])
+    service = PreviewService(SqliteDatabaseConnection(rows=30))
+    cursor = service.cursor_page("SELECT * FROM products", None, limit=10, count="skip")["next_cursor"]
+
+    with pytest.raises(InvalidCursorError):
+        service.cursor_page("SELECT * FROM products WHERE price > 1", cursor, limit=10, count="skip")
+
+
+def test_columnar_format_matches_rows():
+    rows = QueryRows([("label", 253), ("total", 246)], [("a", 1), ("b", 2)])
+
+    assert rows.as_dicts() == [{"label": "a", "total": 1}, {"label": "b", "total": 2}]
+    assert rows.as_columnar() == {"columns": ["label", "total"], "dtypes": ["string", "decimal"], "values": [["a", "b"], [1, 2]]}
+    assert QueryRows([("label", 253)], []).as_columnar()["values"] == [[]]
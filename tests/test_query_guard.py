@@ -0,0 +1,79 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.query_guard import QueryGuard, QueryQueueTimeoutError, QueryRejectedError, summarize_plan
+
+CROSS_JOIN_PLAN = {
+    "query_block": {
+        "select_id": 1,
+        "cost_info": {"query_cost": "200401.00"},
+        "nested_loop": [
+            {"table": {"table_name": "orders", "access_type": "ALL", "rows_examined_per_scan": 2000}},
+            {"table": {"table_name": "products", "access_type": "ALL", "rows_examined_per_scan": 1000}},
+        ],
+    }
+}
+
+
+class FakeDatabaseConnection:
+    def __init__(self, plan):
+        self.pool = SimpleNamespace(name="fake-guard")
+        self.plan = plan
+        self.explains = 0
+
+    def execute_query_rows(self, query, raise_errors=False):
+        assert query.startswith("EXPLAIN FORMAT=JSON SELECT")
+        self.explains += 1
+        return [("EXPLAIN", 245)], [(json.dumps(self.plan),)]
+
+
+def test_summarize_plan_multiplies_nested_loop_rows():
+    subquery_plan = {
+        "query_block": {
+            "ordering_operation": {
+                "table": {
+                    "table_name": "t", "access_type": "ALL", "rows": 10,
+                    "materialized_from_subquery": {
+                        "query_block": {"table": {"table_name": "products", "access_type": "index", "rows": 50000}}
+                    },
+                }
+            }
+        }
+    }
+    assert summarize_plan(CROSS_JOIN_PLAN) == {
+        "cost": 200401.0, "rows": 2000000, "full_scans": ["orders", "products"], "tables": 2,
+    }
+    assert summarize_plan(subquery_plan)["rows"] == 50000
+    assert summarize_plan(subquery_plan)["cost"] is None
+
+
+def test_actions_over_threshold():
+    db_conn = FakeDatabaseConnection(CROSS_JOIN_PLAN)
+    sql = "SELECT * FROM orders, products"
+
+    with pytest.raises(QueryRejectedError):
+        QueryGuard(action="reject", max_rows=1000000).admit(db_conn, sql)
+
+    admission = QueryGuard(action="limit", max_rows=1000000, limit_rows=500).admit(db_conn, sql)
+    assert admission.sql == "SELECT * FROM orders, products\nLIMIT 500 OFFSET 0"
+
+    allowed = QueryGuard(action="reject", max_rows=0, max_cost=500000).admit(db_conn, sql)
+    assert allowed.sql == sql and allowed.summary["rows"] == 2000000
+
+
+def test_plan_cache_and_queue_timeout():
+    db_conn = FakeDatabaseConnection(CROSS_JOIN_PLAN)
+    guard = QueryGuard(action="queue", max_rows=1000, queue_concurrency=1, queue_timeout=0.05)
+
+    first = guard.admit(db_conn, "SELECT * FROM orders, products")
+    second = guard.admit(db_conn, "select *  from orders, products;")
+    assert db_conn.explains == 1
+
+    with first.slot():
+        with pytest.raises(QueryQueueTimeoutError):
+            with second.slot():
+                pass
+    with second.slot():
+        pass
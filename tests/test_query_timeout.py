@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+from mysql.connector import Error
+
+import db_connection
+from db_connection import DatabaseConnection, QueryTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = [("id", 3)]
+
+    def execute(self, query):
+        self.connection.queries.append(query)
+        if self.connection.server_timeout:
+            raise Error(msg="maximum statement execution time exceeded", errno=3024)
+        # Runs until killed
+        if not self.connection.killed.wait(5):
+            raise AssertionError("query was not killed")
+        raise Error(msg="Query execution was interrupted", errno=1317)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    connection_id = 42
+
+    def __init__(self, server_timeout=False, server_info="8.0.36"):
+        self.server_timeout = server_timeout
+        self.server_info = server_info
+        self.queries = []
+        self.killed = threading.Event()
+
+    def get_server_info(self):
+        return self.server_info
+
+    def cursor(self, buffered=None):
+        return FakeCursor(self)
+
+
+def make_connection(monkeypatch, connection):
+    db = DatabaseConnection()
+    db.connection = connection
+    released = {}
+    monkeypatch.setattr(db.pool, "release", lambda conn, discard=False: released.update(discard=discard))
+    return db, released
+
+
+def test_server_side_limit_hint_and_timeout_error(monkeypatch):
+    db, released = make_connection(monkeypatch, FakeConnection(server_timeout=True))
+
+    with pytest.raises(QueryTimeoutError) as excinfo:
+        db.execute_query_rows("SELECT id FROM products;", raise_errors=True, timeout=1.5)
+    assert db.connection.queries == ["SELECT /*+ MAX_EXECUTION_TIME(1500) */ id FROM products"]
+    assert not excinfo.value.killed
+    db.close()
+    assert released == {"discard": False}
+
+
+def test_mariadb_uses_set_statement(monkeypatch):
+    db, _ = make_connection(monkeypatch, FakeConnection(server_timeout=True, server_info="10.11.6-MariaDB"))
+    with pytest.raises(QueryTimeoutError):
+        db.execute_query_rows("SELECT id FROM products", raise_errors=True, timeout=2)
+    assert db.connection.queries == ["SET STATEMENT max_statement_time=2 FOR SELECT id FROM products"]
+
+
+def test_runaway_query_is_killed_from_side_connection(monkeypatch):
+    monkeypatch.setattr(db_connection, "QUERY_KILL_GRACE_SECONDS", 0)
+    connection = FakeConnection()
+    db, released = make_connection(monkeypatch, connection)
+    killed = []
+    monkeypatch.setattr(db, "kill_query", lambda connection_id: (killed.append(connection_id), connection.killed.set()))
+
+    start = time.monotonic()
+    with pytest.raises(QueryTimeoutError) as excinfo:
+        db.execute_query_rows("SELECT id FROM products", raise_errors=True, timeout=0.05)
+    assert time.monotonic() - start < 2
+    assert excinfo.value.killed and killed == [42]
+    # A killed connection is not handed out again
+    db.close()
+    assert released == {"discard": True}
+
+
+def test_unbuffered_statement_gets_the_limit_and_close_cancels_the_kill(monkeypatch):
+    monkeypatch.setattr(db_connection, "QUERY_KILL_GRACE_SECONDS", 0.05)
+    db, released = make_connection(monkeypatch, FakeConnection(server_timeout=True))
+    killed = []
+    monkeypatch.setattr(db, "kill_query", killed.append)
+
+    with pytest.raises(Error):
+        db.execute_unbuffered("SELECT id FROM products", timeout=0.05)
+    assert db.connection.queries == ["SELECT /*+ MAX_EXECUTION_TIME(50) */ id FROM products"]
+    db.close()
+    time.sleep(0.2)
+    assert killed == [] and released == {"discard": False}
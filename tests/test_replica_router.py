@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+from mysql.connector import Error
+
+import db_connection
+from app.core.mysql_pool import PoolTimeoutError
+from app.core.replica_router import ReplicaRouter, parse_endpoints
+from db_connection import DatabaseConnection
+
+
+class FakePool:
+    """Stand-in pool: acquire() fails while ``down`` is set"""
+
+    def __init__(self, name, in_use=0):
+        self.name = name
+        self.label = name
+        self.in_use = in_use
+        self.down = False
+        self.saturated = False
+        self.acquired = 0
+
+    def acquire(self):
+        if self.down:
+            raise Error(msg="Can't connect to MySQL server")
+        if self.saturated:
+            raise PoolTimeoutError(f"No MySQL connection available in pool '{self.name}'")
+        self.acquired += 1
+        return SimpleNamespace(pool=self)
+
+    def release(self, connection, discard=False):
+        pass
+
+
+def make_router(lags, **kwargs):
+    replicas = [FakePool(name) for name in lags]
+
+    def lag_fn(pool):
+        lag = lags[pool.name]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    return ReplicaRouter(replicas, lag_fn=lag_fn, **kwargs), replicas
+
+
+def test_round_robin_skips_lagging_and_stopped_replicas():
+    primary = FakePool("primary")
+    router, (r1, r2, r3, r4) = make_router({"r1": 0.0, "r2": 2.0, "r3": 120.0, "r4": None}, max_lag=30)
+
+    chosen = [router.choose(primary).name for _ in range(4)]
+    assert sorted(chosen) == ["r1", "r1", "r2", "r2"]
+    assert chosen[0] != chosen[1]
+
+
+def test_least_connections_prefers_idle_replica():
+    primary = FakePool("primary")
+    router, (r1, r2) = make_router({"r1": 0.0, "r2": 0.0}, balance="least_connections")
+    r1.in_use = 5
+    assert {router.choose(primary).name for _ in range(3)} == {"r2"}
+
+
+def test_lag_falls_back_to_primary_until_replica_catches_up():
+    primary = FakePool("primary")
+    lags = {"r1": 90.0}
+    router, _ = make_router(lags, max_lag=30, check_interval=60)
+    assert router.choose(primary) is primary
+
+    lags["r1"] = 1.0
+    router.check(router.replicas[0])  # what the periodic background check does
+    assert router.choose(primary).name == "r1"
+
+
+def test_failures_eject_replica_and_connect_falls_back(monkeypatch):
+    primary = FakePool("primary")
+    router, (r1, r2) = make_router({"r1": 0.0, "r2": 0.0}, max_failures=2, eject_seconds=60)
+    monkeypatch.setattr(db_connection, "get_pool", lambda *args: primary)
+    monkeypatch.setattr(db_connection, "get_router", lambda pool: router)
+    r1.down = True
+
+    used = []
+    for _ in range(6):
+        db = DatabaseConnection(use_replica=True)
+        db.connect()
+        used.append(db.connection.pool.name)
+    # r1 fails twice (served by the primary instead), then it is out of rotation
+    assert used.count("primary") == 2
+    assert used[-2:] == ["r2", "r2"]
+    assert router.stats()["r1"]["ejected"]
+
+    writer = DatabaseConnection()
+    assert writer.pool is primary
+
+
+def test_saturated_replica_pool_falls_back_to_the_primary(monkeypatch):
+    primary = FakePool("primary")
+    router, (r1,) = make_router({"r1": 0.0}, max_failures=1, eject_seconds=60)
+    monkeypatch.setattr(db_connection, "get_pool", lambda *args: primary)
+    monkeypatch.setattr(db_connection, "get_router", lambda pool: router)
+    r1.saturated = True
+
+    db = DatabaseConnection(use_replica=True)
+    db.connect()
+    assert db.connection.pool is primary
+    assert router.stats()["r1"]["failures"] == 1
+
+    # The primary's own pool timeout still reaches the caller (503)
+    primary.saturated = True
+    writer = DatabaseConnection()
+    with pytest.raises(PoolTimeoutError):
+        writer.connect()
+
+
+def test_parse_endpoints():
+    assert parse_endpoints(" replica-1:3307, replica-2 ,") == [("replica-1", 3307), ("replica-2", 3306)]
@@ -0,0 +1,114 @@
+import datetime
+from types import SimpleNamespace
+
+from app.services import preview_service
+from app.services.preview_service import PreviewService
+from app.utils.result_cache import ResultCache
+from app.utils.sql_utils import normalize_sql, referenced_tables
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+class FakeDatabaseConnection:
+    """Serves a fixed result and table versions that tests can bump"""
+
+    def __init__(self):
+        self.pool = SimpleNamespace(name="fake")
+        self.connection = SimpleNamespace(get_server_version=lambda: (5, 7, 44), get_server_info=lambda: "5.7.44")
+        self.tables = {"products": (NOW, NOW - datetime.timedelta(minutes=5)), "product_view": None}
+        self.queries = []
+
+    def connect(self):
+        pass
+
+    def get_table_versions(self):
+        return {"schema": "caraba_products", "server_now": NOW, "tables": dict(self.tables)}
+
+    def execute_query_rows(self, query, raise_errors=False, timeout=None):
+        self.queries.append(query)
+        if query.startswith("SELECT COUNT(*)"):
+            return [("total_count", 8)], [(3,)]
+        return [("id", 3), ("name", 253)], [(1, "a"), (2, "b"), (3, "c")]
+
+
+def test_normalized_sql_and_tables():
+    assert normalize_sql("select id  from products -- top\nwhere name = 'A  b';") == "SELECT id FROM products WHERE name = 'A  b'"
+    assert referenced_tables(
+        "SELECT EXTRACT(YEAR FROM o.created_at) FROM orders o JOIN caraba_products.products p ON p.id = o.product_id "
+        "WHERE p.id IN (SELECT product_id FROM stock)"
+    ) == [(None, "orders"), ("caraba_products", "products"), (None, "stock")]
+
+
+def test_repeated_page_is_served_until_table_changes(monkeypatch):
+    cache = ResultCache(ttl=60, version_check_interval=0)
+    monkeypatch.setattr(preview_service, "result_cache", cache)
+    db_conn = FakeDatabaseConnection()
+
+    first = PreviewService(db_conn).page("SELECT id, name FROM products", page=1, limit=10, count="cached")
+    second = PreviewService(db_conn).page("select id, name\nfrom products;", page=1, limit=10, count="cached")
+    assert len(db_conn.queries) == 1
+    assert second["rows"].as_dicts() == first["rows"].as_dicts()
+
+    # A different page is a different entry
+    PreviewService(db_conn).page("SELECT id, name FROM products", page=2, limit=2, count="skip")
+    assert len(db_conn.queries) == 2
+
+    db_conn.tables["products"] = (NOW, NOW - datetime.timedelta(seconds=30))
+    PreviewService(db_conn).page("SELECT id, name FROM products", page=1, limit=10, count="cached")
+    assert len(db_conn.queries) == 3
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_unverifiable_and_oversized_results_are_not_cached():
+    cache = ResultCache(ttl=60, max_entry_bytes=10_000, version_check_interval=0)
+    db_conn = FakeDatabaseConnection()
+    rows = [(i, "x" * 10) for i in range(3)]
+
+    for sql in ("SELECT * FROM product_view", "SELECT * FROM other_db.products"):
+        _, versions = cache.get(sql, db_conn)
+        cache.put(sql, db_conn, [("id",)], rows, versions)
+        assert cache.get(sql, db_conn)[0] is None
+
+    # Written within the last second: UPDATE_TIME can't tell a later write apart
+    db_conn.tables["products"] = (NOW, NOW)
+    _, versions = cache.get("SELECT * FROM products", db_conn)
+    cache.put("SELECT * FROM products", db_conn, [("id",)], rows, versions)
+    assert cache.get("SELECT * FROM products", db_conn)[0] is None
+
+    db_conn.tables["products"] = (NOW, None)
+    _, versions = cache.get("SELECT * FROM products", db_conn)
+    cache.put("SELECT * FROM products", db_conn, [("id",)], [(i, "x" * 100) for i in range(1000)], versions)
+    stats = cache.stats()
+    assert (stats["uncacheable"], stats["too_large"], stats["entries"]) == (3, 1, 0)
+
+
+def test_lru_stays_within_byte_budget():
+    cache = ResultCache(ttl=60, max_bytes=20_000, max_entry_bytes=20_000, version_check_interval=60)
+    db_conn = FakeDatabaseConnection()
+    rows = [(i, "x" * 50) for i in range(40)]
+
+    for page in range(10):
+        sql = f"SELECT id, name FROM products LIMIT 40 OFFSET {page * 40}"
+        _, versions = cache.get(sql, db_conn)
+        cache.put(sql, db_conn, [("id",), ("name",)], rows, versions)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 20_000
+    assert stats["evictions"] > 0
+    assert cache.get("SELECT id, name FROM products LIMIT 40 OFFSET 360", db_conn)[0] is not None
+    assert cache.get("SELECT id, name FROM products LIMIT 40 OFFSET 0", db_conn)[0] is None
+
+
+def test_nondeterministic_queries_are_not_cached():
+    cache = ResultCache(ttl=60, version_check_interval=0)
+    db_conn = FakeDatabaseConnection()
+
+    for sql in (
+        "SELECT * FROM products ORDER BY RAND() LIMIT 5",
+        "SELECT NOW()",
+        "SELECT COUNT(*) FROM products WHERE created_at >= CURDATE()",
+    ):
+        _, versions = cache.get(sql, db_conn)
+        cache.put(sql, db_conn, [("id",)], [(1,)], versions)
+        assert cache.get(sql, db_conn)[0] is None, sql
+    assert (cache.stats()["uncacheable"], cache.stats()["entries"]) == (3, 0)
@@ -0,0 +1,56 @@
+from app.core import schema_cache as schema_cache_module
+from app.core.schema_cache import SchemaCache
+
+
+class FakeDatabaseConnection:
+    schema = {"products": [{"Field": "id", "Type": "int", "Null": "NO", "Key": "PRI", "Default": None, "Extra": ""}]}
+    fingerprint = "v1"
+    schema_calls = 0
+
+    def __init__(self, use_replica=False):
+        pass
+
+    def get_schema(self):
+        FakeDatabaseConnection.schema_calls += 1
+        return FakeDatabaseConnection.schema
+
+    def get_schema_fingerprint(self):
+        return FakeDatabaseConnection.fingerprint
+
+    def close(self):
+        pass
+
+
+def make_cache(monkeypatch):
+    monkeypatch.setattr(schema_cache_module, "DatabaseConnection", FakeDatabaseConnection)
+    FakeDatabaseConnection.fingerprint = "v1"
+    FakeDatabaseConnection.schema_calls = 0
+    return SchemaCache(refresh_interval=0, max_age=0)
+
+
+def test_schema_is_loaded_once_and_served_from_memory(monkeypatch):
+    cache = make_cache(monkeypatch)
+
+    assert "products" in cache.get_schema()
+    assert cache.get_schema_text().startswith("DATABASE SCHEMA:")
+    assert FakeDatabaseConnection.schema_calls == 1
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["version"] == 1
+
+
+def test_check_reloads_only_when_fingerprint_changes(monkeypatch):
+    cache = make_cache(monkeypatch)
+    cache.get_schema()
+
+    cache.check()
+    assert FakeDatabaseConnection.schema_calls == 1
+
+    FakeDatabaseConnection.fingerprint = "v2"
+    cache.check()
+    assert FakeDatabaseConnection.schema_calls == 2
+    assert cache.stats()["refreshes"] == 2
+    # Same content behind a new fingerprint keeps the version
+    assert cache.version == 1
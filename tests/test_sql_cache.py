@@ -0,0 +1,69 @@
+from app.utils.sql_cache import SemanticSQLCache, depends_on_user, normalize_question
+
+SCHEMA = "schema-v1"
+PRODUCTS = {"generated_sql": "SELECT COUNT(*) AS total FROM products", "response_type": "sentence", "answer_template": "{total}"}
+TOP_FIVE = {"generated_sql": "SELECT name FROM products ORDER BY price DESC LIMIT 5", "response_type": "table", "answer_template": ""}
+MY_ORDERS = {"generated_sql": "SELECT COUNT(*) AS total FROM orders WHERE user_id = 7", "response_type": "sentence", "answer_template": "{total}"}
+
+
+def test_normalization_drops_case_punctuation_and_filler_words():
+    assert normalize_question("Tolong, tampilkan   PRODUK yang termahal dong!") == "tampilkan produk yang termahal"
+    assert normalize_question("berapa transaksi saya?") == "berapa transaksi saya"
+
+
+def test_exact_hit_on_normalized_question():
+    cache = SemanticSQLCache(ttl=60, max_entries=10, similarity=0.85)
+    cache.put("Ada berapa produk?", 1, PRODUCTS, schema_hash=SCHEMA)
+
+    assert cache.get("ada berapa produk", 2, schema_hash=SCHEMA) == PRODUCTS
+    assert cache.get("ada berapa produk", 2, schema_hash="schema-v2") is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_approximate_hit_requires_same_numbers():
+    cache = SemanticSQLCache(ttl=60, max_entries=10, similarity=0.7)
+    cache.put("tampilkan 5 produk termahal", 1, TOP_FIVE, schema_hash=SCHEMA)
+
+    assert cache.get("tampilkan 5 produk termahl", 1, schema_hash=SCHEMA) == TOP_FIVE
+    assert cache.get("tampilkan 10 produk termahal", 1, schema_hash=SCHEMA) is None
+    assert cache.stats()["approximate_hits"] == 1
+
+
+def test_approximate_hit_needs_the_same_words():
+    cache = SemanticSQLCache(ttl=60, max_entries=10, similarity=0.7)
+    cache.put("total penjualan kategori elektronik tahun lalu", 1, PRODUCTS, schema_hash=SCHEMA)
+    cache.put("stok gudang jakarta", 1, PRODUCTS, schema_hash=SCHEMA)
+
+    assert cache.get("total penjualan kategori elektronik tahun ini", 2, schema_hash=SCHEMA) is None
+    assert cache.get("stok gudang jakarta timur", 2, schema_hash=SCHEMA) is None
+    assert SemanticSQLCache(ttl=60, max_entries=10).similarity == 0
+
+
+def test_user_specific_sql_is_not_shared():
+    cache = SemanticSQLCache(ttl=60, max_entries=10, similarity=0.85)
+    cache.put("berapa order saya", 7, MY_ORDERS, schema_hash=SCHEMA)
+
+    assert cache.get("berapa order saya", 7, schema_hash=SCHEMA) == MY_ORDERS
+    assert cache.get("berapa order saya", 8, schema_hash=SCHEMA) is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = SemanticSQLCache(ttl=60, max_entries=1, similarity=0)
+    cache.put("ada berapa produk", 1, PRODUCTS, schema_hash=SCHEMA)
+    cache.put("tampilkan 5 produk termahal", 1, TOP_FIVE, schema_hash=SCHEMA)
+    assert cache.get("ada berapa produk", 1, schema_hash=SCHEMA) is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = SemanticSQLCache(ttl=0, max_entries=10, similarity=0)
+    expired.put("ada berapa produk", 1, PRODUCTS, schema_hash=SCHEMA)
+    assert expired.get("ada berapa produk", 1, schema_hash=SCHEMA) is None
+
+
+def test_any_user_reference_is_user_scoped():
+    for sql in (
+        "SELECT COUNT(*) FROM orders o WHERE o.user_id=7",
+        "SELECT COUNT(*) FROM orders o JOIN users u ON u.id = o.customer_id WHERE u.username = 'budi'",
+        "SELECT COUNT(*) FROM orders WHERE customer_id IN (SELECT id FROM customers WHERE owner_id = 7)",
+    ):
+        assert depends_on_user(sql, 7), sql
+    assert not depends_on_user("SELECT COUNT(*) FROM products WHERE price > 70", 7)
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import user_cache as user_cache_module
+from app.core.database import Base
+from app.core.user_cache import UserCache
+from app.models.user import User
+
+
+@pytest.fixture
+def db(monkeypatch):
+    cache = UserCache(ttl=60, negative_ttl=60)
+    monkeypatch.setattr(user_cache_module, "user_cache", cache)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add(User(full_name="Budi", email="budi@example.com", username="budi", hashed_password="x"))
+    session.commit()
+    yield session, cache
+    session.close()
+
+
+def lookup(session, cache, username, loads):
+    def load():
+        loads.append(username)
+        return session.query(User).filter(User.username == username).first()
+    return cache.get(username, load)
+
+
+def test_hits_skip_the_database_until_the_user_changes(db):
+    session, cache = db
+    loads = []
+    first = lookup(session, cache, "budi", loads)
+    second = lookup(session, cache, "budi", loads)
+    assert second is first and first.full_name == "Budi" and first.is_active
+    assert loads == ["budi"]
+
+    user = session.query(User).filter(User.username == "budi").first()
+    user.is_active = False
+    session.commit()
+    assert lookup(session, cache, "budi", loads).is_active is False
+    assert loads == ["budi", "budi"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_unknown_subject_is_negatively_cached_until_registered(db):
+    session, cache = db
+    loads = []
+    assert lookup(session, cache, "siti", loads) is None
+    assert lookup(session, cache, "siti", loads) is None
+    assert loads == ["siti"]
+
+    session.add(User(full_name="Siti", email="siti@example.com", username="siti", hashed_password="x"))
+    session.commit()
+    assert lookup(session, cache, "siti", loads).full_name == "Siti"
+
+
+def test_snapshot_is_read_only(db):
+    session, cache = db
+    snapshot = lookup(session, cache, "budi", [])
+    with pytest.raises(AttributeError):
+        snapshot.username = "other"